@@ -1,17 +1,127 @@
-from fastapi import FastAPI
+import logging
+import math
+from typing import Annotated, Optional
 
-from .db.database import init_db
+from fastapi import FastAPI, Header, HTTPException, Request, status
+from fastapi.responses import JSONResponse
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from .cache.cache import get_cache
+from .db import database
+from .db.database import bind_models, init_db
+from .config import config
+from .dependencies import get_change_stream_relay, get_job_queue, get_recommendation_engine
+from .middlewares.deadline import DeadlineMiddleware
+from .middlewares.profiling import ProfilingMiddleware, is_profiling_token
+from .profiling.spans import span_stats
+from .resilience.circuit_breaker import CircuitOpenError
+from .resilience.deadline import DeadlineExceeded
+from .resilience.guard import database_breaker, is_request_error
 from .routes.users import router as user_router
 from .routes.books import router as book_router
+from .routes.timeline import router as timeline_router
+from .routes.events import router as events_router
+from .routes.jobs import router as jobs_router
+from .routes.batch import router as batch_router
 
 app = FastAPI()
+if config.PROFILING_TOKEN or config.PROFILING_SAMPLE_RATE or config.PROFILING_SPANS_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+app.add_middleware(DeadlineMiddleware)
 app.include_router(user_router, tags=["Users"], prefix="/users")
 app.include_router(book_router, tags=["Books"], prefix="/books")
+app.include_router(events_router, tags=["Events"], prefix="/events")
+if config.REPOSITORY_BACKEND != "memory":
+    # these query MongoDB directly and have no in-memory implementation
+    app.include_router(timeline_router, tags=["Timeline"], prefix="/timeline")
+    app.include_router(jobs_router, tags=["Jobs"], prefix="/jobs")
+    app.include_router(batch_router, tags=["Batch"], prefix="/batch")
+
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request: Request, exc: CircuitOpenError):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceeded):
+    return JSONResponse(status_code=status.HTTP_504_GATEWAY_TIMEOUT, content={"detail": str(exc)})
+
+@app.exception_handler(DuplicateKeyError)
+async def duplicate_key_handler(request: Request, exc: DuplicateKeyError):
+    # e.g. two concurrent requests creating the same entry, the second one losing on a unique index
+    return JSONResponse(status_code=status.HTTP_409_CONFLICT, content={"detail": "Conflicts with existing data"})
+
+@app.exception_handler(PyMongoError)
+async def database_error_handler(request: Request, exc: PyMongoError):
+    # operations outside the guarded repositories time out with the request deadline as well
+    if exc.timeout:
+        return await deadline_exceeded_handler(request, DeadlineExceeded("Request deadline exceeded"))
+    if is_request_error(exc):
+        logging.warning("Database rejected the operation: %s", exc)
+        return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": "Invalid operation"})
+    logging.error("Database error: %s", exc)
+    return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content={"detail": "Database unavailable"})
 
 @app.on_event("startup")
 async def startup():
+    if config.REPOSITORY_BACKEND == "memory":
+        # no database: the models are only bound, and nothing that reads MongoDB in the background starts
+        await bind_models()
+        return
     await init_db()
+    if config.EVENTS_SOURCE == "auto":
+        await get_change_stream_relay().start()
+    await get_job_queue().start()
+    await get_recommendation_engine().start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await get_recommendation_engine().stop()
+    await get_job_queue().stop()
+    await get_change_stream_relay().stop()
+    if database.state.index_task and not database.state.index_task.done():
+        database.state.index_task.cancel()
 
 @app.get("/", tags=["Root"])
 async def read_root() -> dict:
-    return {"message": "Welcome to your beanie powered app!"}
\ No newline at end of file
+    return {"message": "Welcome to your beanie powered app!"}
+
+@app.get("/healthz", tags=["Root"])
+async def healthz() -> dict:
+    return {"status": "ok"}
+
+@app.get("/readyz", tags=["Root"])
+async def readyz():
+    if config.REPOSITORY_BACKEND == "memory":
+        return {"backend": "memory"}
+    db_state = database.state
+    connected = db_state.connected and await database.ping()
+    body = {
+        "database": connected,
+        "indexes": db_state.indexes_verified,
+        "circuit": database_breaker.state.value,
+    }
+    if db_state.index_error:
+        body["index_error"] = db_state.index_error
+    if not (connected and db_state.indexes_verified):
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content=body)
+    return body
+
+@app.get("/cache/stats", tags=["Root"])
+async def cache_stats() -> dict:
+    cache = get_cache()
+    return {"backend": type(cache).__name__, "size": await cache.size(), **cache.stats.as_dict()}
+
+@app.get("/circuit", tags=["Root"])
+async def circuit() -> dict:
+    return database_breaker.as_dict()
+
+#span statistics, for clients holding the profiling token
+@app.get("/profiling/spans", tags=["Root"])
+async def profiling_spans(x_profile: Annotated[Optional[str], Header()] = None) -> dict:
+    if not is_profiling_token(x_profile):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Profiling token required")
+    return span_stats.as_dict()
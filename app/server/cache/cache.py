@@ -0,0 +1,20 @@
+from functools import lru_cache
+
+from app.server.cache.cache_backend import ICacheBackend, LRUCacheBackend, NullCacheBackend, RedisCacheBackend
+from app.server.config import config
+
+
+@lru_cache(maxsize=1)
+def get_cache() -> ICacheBackend:
+    """
+    Build the repository cache selected by ``config.CACHE_BACKEND``.
+
+    :return: The process-wide cache backend.
+    """
+    if config.CACHE_BACKEND == "memory":
+        return LRUCacheBackend(max_entries=config.CACHE_MAX_ENTRIES, ttl_seconds=config.CACHE_TTL_SECONDS)
+    if config.CACHE_BACKEND == "redis":
+        return RedisCacheBackend(url=config.CACHE_REDIS_URL, ttl_seconds=config.CACHE_TTL_SECONDS)
+    if config.CACHE_BACKEND == "none":
+        return NullCacheBackend()
+    raise ValueError(f"Unknown cache backend {config.CACHE_BACKEND!r}")
@@ -0,0 +1,337 @@
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Optional, Set, Tuple
+
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+
+
+class CacheStats:
+    """
+    Hit and miss counters of a cache backend.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hit_rate,
+        }
+
+
+class ICacheBackend(ABC):
+    """
+    Interface for a key-value cache whose entries are grouped per user.
+    """
+
+    def __init__(self):
+        self.stats = CacheStats()
+
+    @abstractmethod
+    async def get(self, user_id: str, key: str, value_type: Any) -> Optional[Any]:
+        """
+        Retrieve a cached value.
+
+        :param user_id: The ID of the user owning the entry.
+        :param key: The key of the entry within the user's namespace.
+        :param value_type: The type of the value, e.g. ``List[Book]``, used by backends that store it serialized.
+        :return: The cached value, or None on a miss.
+        """
+        pass
+
+    @abstractmethod
+    async def generation(self, user_id: str) -> int:
+        """
+        Token to take before reading a value from the database that will then be cached.
+
+        :param user_id: The ID of the user owning the entry.
+        :return: The token to pass to ``set``.
+        """
+        pass
+
+    @abstractmethod
+    async def set(self, user_id: str, key: str, value: Any, generation: int) -> None:
+        """
+        Store a value, unless the user's entries were invalidated since ``generation`` was taken.
+
+        A read that started before a write and finishes after the write's invalidation would otherwise put
+        the value it read, already stale, back into the cache.
+
+        :param user_id: The ID of the user owning the entry.
+        :param key: The key of the entry within the user's namespace.
+        :param value: The value to cache. None values are not cached.
+        :param generation: The token returned by ``generation`` before the value was read.
+        """
+        pass
+
+    @abstractmethod
+    async def delete(self, user_id: str, *keys: str) -> None:
+        """
+        Remove the given entries of a user.
+
+        :param user_id: The ID of the user owning the entries.
+        :param keys: The keys to remove.
+        """
+        pass
+
+    @abstractmethod
+    async def delete_prefix(self, user_id: str, prefix: str) -> None:
+        """
+        Remove every entry of a user whose key starts with the prefix.
+
+        :param user_id: The ID of the user owning the entries.
+        :param prefix: The key prefix to match.
+        """
+        pass
+
+    @abstractmethod
+    async def invalidate_user(self, user_id: str) -> None:
+        """
+        Remove every entry of a user.
+
+        :param user_id: The ID of the user.
+        """
+        pass
+
+    @abstractmethod
+    async def size(self) -> int:
+        """
+        :return: The number of entries held by this backend.
+        """
+        pass
+
+
+class NullCacheBackend(ICacheBackend):
+    """
+    Backend that never stores anything, used when caching is disabled.
+    """
+
+    async def get(self, user_id: str, key: str, value_type: Any) -> Optional[Any]:
+        self.stats.misses += 1
+        return None
+
+    async def generation(self, user_id: str) -> int:
+        return 0
+
+    async def set(self, user_id: str, key: str, value: Any, generation: int) -> None:
+        pass
+
+    async def delete(self, user_id: str, *keys: str) -> None:
+        pass
+
+    async def delete_prefix(self, user_id: str, prefix: str) -> None:
+        pass
+
+    async def invalidate_user(self, user_id: str) -> None:
+        pass
+
+    async def size(self) -> int:
+        return 0
+
+
+class LRUCacheBackend(ICacheBackend):
+    """
+    In-process LRU cache with a per-entry time to live.
+
+    Values are stored and handed out as they are, without copying, so a hit costs no decoding. They are
+    shared between every reader and must be treated as read-only, both by the code that caches them and by
+    the code that gets them.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        super().__init__()
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[Tuple[str, str], Tuple[float, Any]] = OrderedDict()
+        self._keys_by_user: Dict[str, Set[str]] = {}
+        # invalidations are numbered; the latest one of each recently invalidated user is kept, older ones
+        # are forgotten beyond max_entries users and only raise the floor assumed for every other user
+        self._clock = 0
+        self._invalidated: OrderedDict[str, int] = OrderedDict()
+        self._invalidated_floor = 0
+
+    async def get(self, user_id: str, key: str, value_type: Any) -> Optional[Any]:
+        entry_key = (user_id, key)
+        entry = self._entries.get(entry_key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._remove(entry_key)
+            self.stats.misses += 1
+            return None
+        self._entries.move_to_end(entry_key)
+        self.stats.hits += 1
+        return value
+
+    async def generation(self, user_id: str) -> int:
+        return self._clock
+
+    async def set(self, user_id: str, key: str, value: Any, generation: int) -> None:
+        if value is None or self._invalidated.get(user_id, self._invalidated_floor) > generation:
+            return
+        entry_key = (user_id, key)
+        self._entries[entry_key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(entry_key)
+        self._keys_by_user.setdefault(user_id, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats.evictions += 1
+
+    async def delete(self, user_id: str, *keys: str) -> None:
+        self._invalidate(user_id)
+        for key in keys:
+            if self._remove((user_id, key)):
+                self.stats.invalidations += 1
+
+    async def delete_prefix(self, user_id: str, prefix: str) -> None:
+        keys = [key for key in self._keys_by_user.get(user_id, ()) if key.startswith(prefix)]
+        await self.delete(user_id, *keys)
+
+    async def invalidate_user(self, user_id: str) -> None:
+        await self.delete(user_id, *list(self._keys_by_user.get(user_id, ())))
+
+    async def size(self) -> int:
+        return len(self._entries)
+
+    def _invalidate(self, user_id: str) -> None:
+        self._clock += 1
+        self._invalidated[user_id] = self._clock
+        self._invalidated.move_to_end(user_id)
+        while len(self._invalidated) > self.max_entries:
+            _, forgotten = self._invalidated.popitem(last=False)
+            self._invalidated_floor = max(self._invalidated_floor, forgotten)
+
+    def _remove(self, entry_key: Tuple[str, str]) -> bool:
+        if self._entries.pop(entry_key, None) is None:
+            return False
+        user_id, key = entry_key
+        user_keys = self._keys_by_user.get(user_id)
+        if user_keys is not None:
+            user_keys.discard(key)
+            if not user_keys:
+                del self._keys_by_user[user_id]
+        return True
+
+
+@lru_cache(maxsize=None)
+def _entry_adapter(value_type: Any) -> TypeAdapter:
+    # a Redis entry is [expires_at, value]
+    return TypeAdapter(Tuple[float, value_type])
+
+
+class RedisCacheBackend(ICacheBackend):
+    """
+    Cache shared between workers, backed by one Redis hash per user.
+
+    Each field holds its expiry next to the value, as JSON, since Redis expires whole hashes only. Values
+    are validated against their type when read back, so data written to Redis cannot run code in the API,
+    and every hit pays for decoding the value. Invalidations are
+    numbered by a shared counter and the latest one of each user is kept for the TTL, so ``set`` can refuse
+    values read before it.
+
+    Requires the optional ``redis`` package.
+    """
+
+    # HSET the value unless the user was invalidated after the reader's generation
+    _SET_SCRIPT = """
+    local invalidated = tonumber(redis.call("GET", KEYS[2]) or "0")
+    if invalidated > tonumber(ARGV[1]) then
+        return 0
+    end
+    redis.call("HSET", KEYS[1], ARGV[2], ARGV[3])
+    redis.call("EXPIRE", KEYS[1], ARGV[4])
+    return 1
+    """
+
+    def __init__(self, url: str, ttl_seconds: float, namespace: str = "book14:cache"):
+        super().__init__()
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError as e:
+            raise RuntimeError("The redis cache backend requires the 'redis' package") from e
+        self._redis = redis_asyncio.from_url(url)
+        self._set_script = self._redis.register_script(self._SET_SCRIPT)
+        self.ttl_seconds = int(ttl_seconds)
+        self.namespace = namespace
+
+    def _user_key(self, user_id: str) -> str:
+        return f"{self.namespace}:{user_id}"
+
+    def _invalidated_key(self, user_id: str) -> str:
+        return f"{self.namespace}:invalidated:{user_id}"
+
+    def _clock_key(self) -> str:
+        return f"{self.namespace}:invalidations"
+
+    async def get(self, user_id: str, key: str, value_type: Any) -> Optional[Any]:
+        raw = await self._redis.hget(self._user_key(user_id), key)
+        if raw is None:
+            self.stats.misses += 1
+            return None
+        expires_at, value = _entry_adapter(value_type).validate_json(raw)
+        if expires_at < time.time():
+            await self._redis.hdel(self._user_key(user_id), key)
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return value
+
+    async def generation(self, user_id: str) -> int:
+        return int(await self._redis.get(self._clock_key()) or 0)
+
+    async def set(self, user_id: str, key: str, value: Any, generation: int) -> None:
+        if value is None:
+            return
+        raw = to_json((time.time() + self.ttl_seconds, value))
+        await self._set_script(
+            keys=[self._user_key(user_id), self._invalidated_key(user_id)],
+            args=[generation, key, raw, self.ttl_seconds],
+        )
+
+    async def delete(self, user_id: str, *keys: str) -> None:
+        await self._invalidate(user_id, keys)
+
+    async def delete_prefix(self, user_id: str, prefix: str) -> None:
+        keys = [key.decode() for key in await self._redis.hkeys(self._user_key(user_id))]
+        await self.delete(user_id, *[key for key in keys if key.startswith(prefix)])
+
+    async def invalidate_user(self, user_id: str) -> None:
+        await self._invalidate(user_id, None)
+
+    async def size(self) -> int:
+        count = 0
+        async for user_key in self._redis.scan_iter(match=f"{self.namespace}:*"):
+            if await self._redis.type(user_key) == b"hash":
+                count += await self._redis.hlen(user_key)
+        return count
+
+    async def _invalidate(self, user_id: str, keys: Optional[Tuple[str, ...]]) -> None:
+        # the invalidation is recorded before the entries go, so no stale value is stored in between
+        stamp = await self._redis.incr(self._clock_key())
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.set(self._invalidated_key(user_id), stamp, ex=self.ttl_seconds)
+            if keys is None:
+                pipe.delete(self._user_key(user_id))
+            elif keys:
+                pipe.hdel(self._user_key(user_id), *keys)
+            results = await pipe.execute()
+        if keys is None or keys:
+            self.stats.invalidations += results[1]
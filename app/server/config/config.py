@@ -2,3 +2,90 @@ DATABASE_URL = "mongodb://localhost:27017/"
 DATABASE_NAME = "testDB"
 SECRET_KEY = "HAHA"
 
+# lifetime of access tokens and of the rotating refresh tokens that renew them
+ACCESS_TOKEN_EXPIRE_MINUTES = 15
+REFRESH_TOKEN_EXPIRE_DAYS = 30
+
+# storage behind the user, book, quote, collection, favourite and refresh token repositories: "mongo", or
+# "memory" to keep everything in process memory, e.g. to benchmark the API without a database. Timeline,
+# batch and jobs always need MongoDB and are not mounted with "memory"; similar books answers 503
+REPOSITORY_BACKEND = "mongo"
+
+# seconds the /readyz probe waits for a database ping
+READINESS_PING_TIMEOUT = 1.0
+
+# repository read cache: "memory", "redis" or "none"
+CACHE_BACKEND = "memory"
+CACHE_MAX_ENTRIES = 10_000
+CACHE_TTL_SECONDS = 300
+CACHE_REDIS_URL = "redis://localhost:6379/0"
+
+# autocomplete: total prefix entries kept in memory across all users before evicting
+AUTOCOMPLETE_MAX_ENTRIES = 2_000_000
+# age at which a user's index is rebuilt, so writes made by other processes show up
+AUTOCOMPLETE_TTL_SECONDS = 300
+AUTOCOMPLETE_MAX_LIMIT = 50
+
+TIMELINE_MAX_LIMIT = 200
+
+# live library events: "auto" uses MongoDB change streams when the server supports them and falls back to
+# events published from repository writes; "bus" always uses the latter
+EVENTS_SOURCE = "auto"
+EVENTS_HISTORY_SIZE = 256
+# users whose event history is kept for resuming streams, least recently active dropped first
+EVENTS_HISTORY_USERS = 1000
+EVENTS_MAX_QUEUE = 100
+EVENTS_HEARTBEAT_SECONDS = 15
+EVENTS_RETRY_MILLISECONDS = 3000
+
+# background jobs
+JOBS_WORKERS = 4
+JOBS_PROCESS_WORKERS = 2
+JOBS_MAX_ATTEMPTS = 3
+JOBS_RETRY_BASE_DELAY = 2.0
+# a running job is renewed every third of its lease and queued again once the lease expires
+JOBS_LEASE_SECONDS = 60.0
+# how often each process looks for jobs queued elsewhere and for expired leases
+JOBS_POLL_SECONDS = 10.0
+JOBS_EXPORT_DIR = "exports"
+
+# profiling: requests carrying "X-Profile: <PROFILING_TOKEN>" or picked with PROFILING_SAMPLE_RATE are
+# sampled every PROFILING_INTERVAL seconds; spans add per-repository/route timings
+PROFILING_TOKEN = None
+PROFILING_SAMPLE_RATE = 0.0
+PROFILING_INTERVAL = 0.005
+PROFILING_OUTPUT_DIR = "profiles"
+PROFILING_SPANS_ENABLED = False
+
+BATCH_MAX_OPERATIONS = 1000
+
+# "similar books": neighbours kept per book, refresh period of the changed libraries and the number of
+# incremental refreshes between two full rebuilds
+RECOMMENDATIONS_TOP_K = 50
+RECOMMENDATIONS_REFRESH_SECONDS = 300
+RECOMMENDATIONS_FULL_REBUILD_EVERY = 12
+RECOMMENDATIONS_BLOCK_SIZE = 2048
+# only the process holding the lease builds the index and writes it to RECOMMENDATIONS_INDEX_PATH, which the
+# other processes load; the path has to be shared by all of them. The lease is renewed every refresh, so it
+# has to outlast RECOMMENDATIONS_REFRESH_SECONDS plus a full rebuild
+RECOMMENDATIONS_LEASE_SECONDS = 900
+RECOMMENDATIONS_INDEX_PATH = "indexes/similar_books.npz"
+
+# request deadlines in milliseconds, propagated to MongoDB operations; clients may ask for another one with
+# "X-Request-Timeout-Ms", up to REQUEST_TIMEOUT_MAX_MS. Routes are matched by path prefix, None disables
+# the deadline (long-lived event streams)
+REQUEST_TIMEOUT_MS = 5000
+REQUEST_TIMEOUT_MAX_MS = 30_000
+REQUEST_TIMEOUT_ROUTES = {
+    "/events": None,
+    "/batch": 15_000,
+}
+
+# database circuit breaker over the last CIRCUIT_WINDOW repository calls
+CIRCUIT_WINDOW = 50
+CIRCUIT_MIN_CALLS = 20
+CIRCUIT_FAILURE_RATE = 0.5
+CIRCUIT_SLOW_CALL_SECONDS = 1.0
+CIRCUIT_SLOW_RATE = 0.8
+CIRCUIT_OPEN_SECONDS = 10.0
+CIRCUIT_HALF_OPEN_PROBES = 3
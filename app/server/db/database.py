@@ -1,16 +1,99 @@
-from beanie import init_beanie
-from motor.motor_asyncio import AsyncIOMotorClient
+import asyncio
+import logging
+
 from app.server.config import config
-from app.server.models.book import Book
-from app.server.models.collection import Collection
-from app.server.models.description import Description
-from app.server.models.quote import Quote
-from beanie import init_beanie
-from motor.motor_asyncio import AsyncIOMotorClient
 
-from app.server.models.user import User
+
+class DatabaseState:
+    """
+    Readiness state of the database connection shared by the startup hook and the probe endpoints.
+    """
+
+    def __init__(self):
+        self.client = None
+        self.connected = False
+        self.indexes_verified = False
+        self.index_error: str | None = None
+        self.index_task: asyncio.Task | None = None
+
+
+state = DatabaseState()
+
+
+def document_models() -> list:
+    """
+    Import the beanie document models on demand so that importing this module stays cheap.
+
+    :return: The list of document models registered with beanie.
+    """
+    from app.server.models.job import Job
+    from app.server.models.lease import Lease
+    from app.server.models.refresh_token import RefreshToken
+    from app.server.models.user import User
+
+    return [User, Job, RefreshToken, Lease]
 
 
 async def init_db():
+    """
+    Connect to MongoDB and register the document models.
+
+    Index creation is skipped here and performed by a background task, so the worker starts serving
+    requests as soon as the models are bound. Readiness is reported by ``/readyz``.
+    """
+    from beanie import init_beanie
+    from motor.motor_asyncio import AsyncIOMotorClient
+
     client = AsyncIOMotorClient(config.DATABASE_URL)
-    await init_beanie(database=client[config.DATABASE_NAME], document_models=[Book, Quote, Collection, Description, User])
+    await init_beanie(database=client[config.DATABASE_NAME], document_models=document_models(), skip_indexes=True)
+    state.client = client
+    state.connected = True
+    state.index_task = asyncio.create_task(verify_indexes())
+
+
+async def bind_models():
+    """
+    Register the document models without connecting to MongoDB, for the in-memory repositories.
+
+    beanie asks the server for its version while binding the models, so that command is answered locally;
+    the client is never connected as long as no MongoDB repository is used.
+    """
+    from beanie import init_beanie
+    from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+
+    class UnconnectedDatabase(AsyncIOMotorDatabase):
+        async def command(self, command, *args, **kwargs):
+            return {"version": "7.0.0"}
+
+    client = AsyncIOMotorClient(config.DATABASE_URL)
+    await init_beanie(database=UnconnectedDatabase(client, config.DATABASE_NAME), document_models=document_models(), skip_indexes=True)
+
+
+async def verify_indexes():
+    """
+    Create the indexes declared in the models' ``Settings`` off the startup critical path.
+    """
+    try:
+        for model in document_models():
+            indexes = [getattr(index, "index", index) for index in model.get_settings().indexes]
+            if indexes:
+                await model.get_motor_collection().create_indexes(indexes)
+        state.indexes_verified = True
+    except Exception as e:
+        state.index_error = str(e)
+        logging.exception("Index verification failed")
+
+
+async def ping() -> bool:
+    """
+    Check that the database answers within the readiness probe timeout.
+
+    :return: True if the server responded, otherwise False.
+    """
+    if state.client is None:
+        return False
+    try:
+        await asyncio.wait_for(state.client.admin.command("ping"), config.READINESS_PING_TIMEOUT)
+        return True
+    except Exception:
+        return False
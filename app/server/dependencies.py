@@ -0,0 +1,173 @@
+from datetime import timedelta
+from functools import lru_cache
+
+from app.server.cache.cache import get_cache
+from app.server.config import config
+from app.server.events.change_stream import ChangeStreamRelay
+from app.server.events.event_bus import EventBus, EventPublisher
+from app.server.jobs.job_handlers import register_handlers
+from app.server.jobs.job_queue import JobQueue
+from app.server.repositories.autocomplete_book_repository import AutocompleteBatchRepository, AutocompleteBookRepository
+from app.server.repositories.batch_repository import IBatchRepository, BatchRepository
+from app.server.repositories.book_repository import IBookRepository, BookRepository
+from app.server.repositories.cached_repositories import (
+    CachedBatchRepository,
+    CachedBookRepository,
+    CachedCollectionRepository,
+    CachedQuoteRepository,
+    CachedUserRepository,
+)
+from app.server.repositories.collection_repository import ICollectionRepository, CollectionRepository
+from app.server.repositories.favourite_repository import IFavouriteRepository, FavouriteRepository
+from app.server.repositories.job_repository import IJobRepository, JobRepository
+from app.server.repositories.lease_repository import LeaseRepository
+from app.server.repositories.library_items_repository import LibraryItemsRepository
+from app.server.repositories.memory_repositories import (
+    MemoryBookRepository,
+    MemoryCollectionRepository,
+    MemoryFavouriteRepository,
+    MemoryQuoteRepository,
+    MemoryRefreshTokenRepository,
+    MemoryStore,
+    MemoryUserRepository,
+)
+from app.server.repositories.publishing_repositories import (
+    PublishingBatchRepository,
+    PublishingBookRepository,
+    PublishingCollectionRepository,
+    PublishingFavouriteRepository,
+    PublishingQuoteRepository,
+    PublishingUserRepository,
+)
+from app.server.repositories.quote_repository import IQuoteRepository, QuoteRepository
+from app.server.repositories.refresh_token_repository import IRefreshTokenRepository, RefreshTokenRepository
+from app.server.repositories.timeline_repository import ITimelineRepository, TimelineRepository
+from app.server.repositories.user_repository import IUserRepository, UserRepository
+from app.server.recommendations.engine import RecommendationEngine
+from app.server.search.autocomplete import AutocompleteIndex
+
+# Process-wide repository singletons, usable as FastAPI dependencies.
+
+
+@lru_cache(maxsize=1)
+def get_event_bus() -> EventBus:
+    return EventBus(history_size=config.EVENTS_HISTORY_SIZE, max_queue=config.EVENTS_MAX_QUEUE,
+                    history_users=config.EVENTS_HISTORY_USERS)
+
+
+@lru_cache(maxsize=1)
+def get_event_publisher() -> EventPublisher:
+    return EventPublisher(get_event_bus())
+
+
+@lru_cache(maxsize=1)
+def get_change_stream_relay() -> ChangeStreamRelay:
+    return ChangeStreamRelay(get_event_bus(), get_event_publisher(), retry_delay=config.EVENTS_RETRY_MILLISECONDS / 1000)
+
+
+def _in_memory() -> bool:
+    return config.REPOSITORY_BACKEND == "memory"
+
+
+@lru_cache(maxsize=1)
+def get_memory_store() -> MemoryStore:
+    return MemoryStore()
+
+
+@lru_cache(maxsize=1)
+def _cached_book_repository() -> IBookRepository:
+    books = MemoryBookRepository(get_memory_store()) if _in_memory() else BookRepository()
+    return CachedBookRepository(books, get_cache())
+
+
+@lru_cache(maxsize=1)
+def get_autocomplete_index() -> AutocompleteIndex:
+    return AutocompleteIndex(
+        _cached_book_repository(), max_entries=config.AUTOCOMPLETE_MAX_ENTRIES, ttl_seconds=config.AUTOCOMPLETE_TTL_SECONDS
+    )
+
+
+@lru_cache(maxsize=1)
+def get_book_repository() -> IBookRepository:
+    return PublishingBookRepository(
+        AutocompleteBookRepository(_cached_book_repository(), get_autocomplete_index()), get_event_publisher()
+    )
+
+
+@lru_cache(maxsize=1)
+def get_quote_repository() -> IQuoteRepository:
+    quotes = MemoryQuoteRepository(get_memory_store()) if _in_memory() else QuoteRepository()
+    return PublishingQuoteRepository(CachedQuoteRepository(quotes, get_cache()), get_event_publisher())
+
+
+@lru_cache(maxsize=1)
+def get_collection_repository() -> ICollectionRepository:
+    collections = MemoryCollectionRepository(get_memory_store()) if _in_memory() else CollectionRepository()
+    return PublishingCollectionRepository(CachedCollectionRepository(collections, get_cache()), get_event_publisher())
+
+
+@lru_cache(maxsize=1)
+def get_favourite_repository() -> IFavouriteRepository:
+    favourites = MemoryFavouriteRepository(get_memory_store()) if _in_memory() else FavouriteRepository()
+    return PublishingFavouriteRepository(favourites, get_event_publisher())
+
+
+@lru_cache(maxsize=1)
+def get_user_repository() -> IUserRepository:
+    users = MemoryUserRepository(get_memory_store()) if _in_memory() else UserRepository()
+    return PublishingUserRepository(CachedUserRepository(users, get_cache()), get_event_publisher())
+
+
+@lru_cache(maxsize=1)
+def get_batch_repository() -> IBatchRepository:
+    return PublishingBatchRepository(
+        AutocompleteBatchRepository(CachedBatchRepository(BatchRepository(), get_cache()), get_autocomplete_index()),
+        get_event_publisher(),
+    )
+
+
+@lru_cache(maxsize=1)
+def get_refresh_token_repository() -> IRefreshTokenRepository:
+    lifetime = timedelta(days=config.REFRESH_TOKEN_EXPIRE_DAYS)
+    return MemoryRefreshTokenRepository(lifetime) if _in_memory() else RefreshTokenRepository(lifetime)
+
+
+@lru_cache(maxsize=1)
+def get_timeline_repository() -> ITimelineRepository:
+    return TimelineRepository()
+
+
+@lru_cache(maxsize=1)
+def get_job_repository() -> IJobRepository:
+    return JobRepository()
+
+
+@lru_cache(maxsize=1)
+def get_job_queue() -> JobQueue:
+    queue = JobQueue(
+        get_job_repository(),
+        workers=config.JOBS_WORKERS,
+        process_workers=config.JOBS_PROCESS_WORKERS,
+        max_attempts=config.JOBS_MAX_ATTEMPTS,
+        retry_base_delay=config.JOBS_RETRY_BASE_DELAY,
+        lease_seconds=config.JOBS_LEASE_SECONDS,
+        poll_interval=config.JOBS_POLL_SECONDS,
+    )
+    register_handlers(queue, get_book_repository(), get_user_repository(), export_dir=config.JOBS_EXPORT_DIR)
+    return queue
+
+
+@lru_cache(maxsize=1)
+def get_recommendation_engine() -> RecommendationEngine:
+    engine = RecommendationEngine(
+        LibraryItemsRepository(),
+        top_k=config.RECOMMENDATIONS_TOP_K,
+        block_size=config.RECOMMENDATIONS_BLOCK_SIZE,
+        refresh_interval=config.RECOMMENDATIONS_REFRESH_SECONDS,
+        full_rebuild_every=config.RECOMMENDATIONS_FULL_REBUILD_EVERY,
+        leases=LeaseRepository(),
+        lease_duration=config.RECOMMENDATIONS_LEASE_SECONDS,
+        index_path=config.RECOMMENDATIONS_INDEX_PATH,
+    )
+    get_event_bus().add_listener(engine.on_event)
+    return engine
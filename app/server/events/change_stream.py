@@ -0,0 +1,109 @@
+import asyncio
+import logging
+from typing import Optional
+
+from app.server.events.event_bus import EventBus, EventPublisher
+
+# top-level user fields and the event type their changes are reported as
+FIELD_EVENTS = {
+    "userBooks": "books.changed",
+    "quotes": "quotes.changed",
+    "collections": "collections.changed",
+    "favourites": "favourites.changed",
+}
+LIBRARY_CHANGED = "library.changed"
+USER_DELETED = "user.deleted"
+
+_PIPELINE = [
+    {"$match": {"operationType": {"$in": ["insert", "update", "replace", "delete"]}}},
+    # only the names of updated fields are needed, not the (possibly large) new values
+    {"$project": {
+        "operationType": 1,
+        "documentKey": 1,
+        "updatedFields": {"$map": {
+            "input": {"$objectToArray": {"$ifNull": ["$updateDescription.updatedFields", {}]}},
+            "as": "field",
+            "in": "$$field.k",
+        }},
+    }},
+]
+
+
+def change_to_events(change: dict) -> list[tuple[str, dict]]:
+    """
+    Translate a change stream document into ``(type, data)`` events.
+    """
+    operation = change["operationType"]
+    if operation == "delete":
+        return [(USER_DELETED, {})]
+    if operation == "update":
+        fields = {name.split(".", 1)[0] for name in change.get("updatedFields") or []}
+        types = sorted({FIELD_EVENTS[field] for field in fields if field in FIELD_EVENTS})
+        if types:
+            return [(type, {"source": "change_stream"}) for type in types]
+    return [(LIBRARY_CHANGED, {"source": "change_stream"})]
+
+
+class ChangeStreamRelay:
+    """
+    Feeds the event bus from a MongoDB change stream on the users collection.
+
+    Change streams need a replica set. When the server does not support them, ``start`` returns False and
+    events keep coming from repository writes through the EventPublisher.
+    """
+
+    def __init__(self, bus: EventBus, publisher: EventPublisher, retry_delay: float):
+        self.bus = bus
+        self.publisher = publisher
+        self.retry_delay = retry_delay
+        self.resume_token: Optional[dict] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> bool:
+        from pymongo.errors import PyMongoError
+
+        try:
+            stream = self._open()
+            first_change = await stream.try_next()
+        except PyMongoError as e:
+            logging.info("Change streams unavailable, publishing events from repository writes: %s", e)
+            return False
+        self.publisher.enabled = False
+        self._task = asyncio.create_task(self._run(stream, first_change))
+        return True
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.publisher.enabled = True
+
+    def _open(self):
+        from app.server.models.user import User
+
+        return User.get_motor_collection().watch(_PIPELINE, resume_after=self.resume_token)
+
+    async def _run(self, stream, first_change: Optional[dict]) -> None:
+        from pymongo.errors import PyMongoError
+
+        if first_change is not None:
+            self._relay(first_change)
+        while True:
+            try:
+                async for change in stream:
+                    self._relay(change)
+            except asyncio.CancelledError:
+                await stream.close()
+                raise
+            except PyMongoError:
+                logging.exception("Change stream interrupted, resuming")
+                await stream.close()
+                await asyncio.sleep(self.retry_delay)
+                stream = self._open()
+
+    def _relay(self, change: dict) -> None:
+        self.resume_token = change["_id"]
+        user_id = change["documentKey"]["_id"]
+        for type, data in change_to_events(change):
+            # the resume token doubles as the SSE event id
+            self.bus.publish(user_id, type, data, id=f"{self.resume_token['_data']}:{type}")
@@ -0,0 +1,144 @@
+import asyncio
+import itertools
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, List, Optional, Set
+
+from pydantic import BaseModel
+
+
+class LibraryEvent(BaseModel):
+    id: str
+    user_id: str
+    type: str
+    data: dict = {}
+    at: float
+
+
+class Subscription:
+    """
+    Bounded event queue of one connected client.
+
+    When the client falls behind and the queue fills up, the subscription is marked as overflowed and
+    stops receiving events; the stream then tells the client to resynchronise instead of buffering
+    without limit.
+    """
+
+    def __init__(self, user_id: str, max_queue: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue[LibraryEvent] = asyncio.Queue(maxsize=max_queue)
+        self.overflowed = False
+
+    def offer(self, event: LibraryEvent) -> None:
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class EventBus:
+    """
+    In-process publish/subscribe of library changes, keyed by user.
+
+    A short history per user allows clients to resume from the last event id they received. Histories
+    are kept for at most ``history_users`` users; the least recently active user without a subscription
+    loses theirs first, and their clients resynchronise on reconnect.
+    """
+
+    def __init__(self, history_size: int, max_queue: int, history_users: int):
+        self.history_size = history_size
+        self.history_users = history_users
+        self.max_queue = max_queue
+        self._subscriptions: Dict[str, Set[Subscription]] = {}
+        self._history: OrderedDict[str, Deque[LibraryEvent]] = OrderedDict()
+        self._listeners: List[Callable[[LibraryEvent], None]] = []
+        # ids are "<boot>-<sequence>" so ids from a previous process never match the current history
+        self._boot = format(int(time.time()), "x")
+        self._sequence = itertools.count(1)
+
+    def publish(self, user_id, type: str, data: Optional[dict] = None, id: Optional[str] = None) -> LibraryEvent:
+        """
+        Deliver an event to every subscription of the user.
+
+        :param user_id: The ID of the user whose library changed.
+        :param type: The event type, e.g. ``books.changed``.
+        :param data: Event payload.
+        :param id: Event id to use instead of a generated one, e.g. a change stream resume token.
+        :return: The published event.
+        """
+        user_key = str(user_id)
+        event = LibraryEvent(
+            id=id or f"{self._boot}-{next(self._sequence)}",
+            user_id=user_key,
+            type=type,
+            data=data or {},
+            at=time.time(),
+        )
+        self._history_of(user_key).append(event)
+        for subscription in self._subscriptions.get(user_key, ()):
+            subscription.offer(event)
+        for listener in self._listeners:
+            listener(event)
+        return event
+
+    def _history_of(self, user_key: str) -> Deque[LibraryEvent]:
+        history = self._history.get(user_key)
+        if history is not None:
+            self._history.move_to_end(user_key)
+            return history
+        history = self._history[user_key] = deque(maxlen=self.history_size)
+        if len(self._history) > self.history_users:
+            evicted = next((key for key in self._history if key != user_key and key not in self._subscriptions), None)
+            if evicted is not None:
+                del self._history[evicted]
+        return history
+
+    def add_listener(self, listener: Callable[[LibraryEvent], None]) -> None:
+        """
+        Call ``listener`` with every published event, whatever the user.
+        """
+        self._listeners.append(listener)
+
+    def subscribe(self, user_id) -> Subscription:
+        subscription = Subscription(str(user_id), self.max_queue)
+        self._subscriptions.setdefault(subscription.user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscriptions.get(subscription.user_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.user_id]
+
+    def replay(self, user_id, last_event_id: str) -> Optional[List[LibraryEvent]]:
+        """
+        Events published after ``last_event_id``.
+
+        :return: The missed events, or None if the id is no longer in the history and the client has to
+            resynchronise.
+        """
+        history = list(self._history.get(str(user_id), ()))
+        for position, event in enumerate(history):
+            if event.id == last_event_id:
+                return history[position + 1:]
+        return None
+
+
+class EventPublisher:
+    """
+    Publishes events from repository writes.
+
+    Disabled while the change stream relay is running, because the relay then reports the same writes
+    straight from MongoDB.
+    """
+
+    def __init__(self, bus: EventBus):
+        self.bus = bus
+        self.enabled = True
+
+    def publish(self, user_id, type: str, data: Optional[dict] = None) -> None:
+        if self.enabled:
+            self.bus.publish(user_id, type, data)
@@ -0,0 +1,42 @@
+import json
+from collections import Counter
+from pathlib import Path
+
+# Functions run in the job process pool. They take and return plain data so they can be pickled.
+
+
+def write_export(path: str, library: dict) -> int:
+    """
+    Write a user's library as JSON.
+
+    :param path: Destination file.
+    :param library: The user's data, already converted to JSON-compatible types.
+    :return: The number of bytes written.
+    """
+    encoded = json.dumps(library, ensure_ascii=False, separators=(",", ":")).encode()
+    destination = Path(path)
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    destination.write_bytes(encoded)
+    return len(encoded)
+
+
+def compute_statistics(library: dict) -> dict:
+    """
+    Reading statistics of a user's library.
+
+    :param library: The user's data, already converted to JSON-compatible types.
+    :return: Counts, average rating and books finished per year.
+    """
+    books = library.get("userBooks") or []
+    ratings = [book["rating"] for book in books if book.get("rating") is not None]
+    finished_per_year = Counter(str(book["end_read_date"])[:4] for book in books if book.get("end_read_date"))
+    authors = Counter(book["description"]["author_name"] for book in books if book.get("description"))
+    return {
+        "books": len(books),
+        "quotes": len(library.get("quotes") or []),
+        "collections": len(library.get("collections") or []),
+        "favourites": len(library.get("favourites") or []),
+        "average_rating": sum(ratings) / len(ratings) if ratings else None,
+        "finished_per_year": dict(sorted(finished_per_year.items())),
+        "top_authors": [{"author_name": name, "books": count} for name, count in authors.most_common(10)],
+    }
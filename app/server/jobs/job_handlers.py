@@ -0,0 +1,73 @@
+from pathlib import Path
+
+from beanie import PydanticObjectId
+from pydantic import ValidationError
+
+from app.server.jobs.cpu_tasks import compute_statistics, write_export
+from app.server.jobs.job_queue import JobContext, JobFailed, JobQueue
+from app.server.models.book import Book
+from app.server.repositories.book_repository import IBookRepository
+from app.server.repositories.user_repository import IUserRepository
+from app.server.repositories.repository_error import RepositoryError
+
+# how many imported books between two progress updates
+IMPORT_PROGRESS_EVERY = 50
+
+
+def _user_id(context: JobContext) -> PydanticObjectId:
+    if not context.job.user_id:
+        raise JobFailed("The job requires a user")
+    return PydanticObjectId(context.job.user_id)
+
+
+async def _library(context: JobContext, users: IUserRepository) -> dict:
+    user = await users.get_user_by_id(_user_id(context))
+    if not user or isinstance(user, RepositoryError):
+        raise JobFailed(f"User with id {context.job.user_id} not found")
+    return user.model_dump(mode="json", exclude={"password"})
+
+
+def register_handlers(queue: JobQueue, books: IBookRepository, users: IUserRepository, export_dir: str) -> None:
+    """
+    Register the built-in job types on the queue.
+    """
+
+    async def import_books(context: JobContext) -> dict:
+        user_id = _user_id(context)
+        raw_books = context.job.params.get("books") or []
+        added, errors = 0, []
+        for position, raw_book in enumerate(raw_books, start=1):
+            try:
+                error = await books.add_book_to_user(user_id, Book.model_validate(raw_book))
+            except ValidationError as e:
+                error = RepositoryError(message=str(e))
+            if error:
+                errors.append({"index": position - 1, "message": error.message})
+            else:
+                added += 1
+            if position % IMPORT_PROGRESS_EVERY == 0:
+                await context.progress(position / len(raw_books), f"Imported {position} of {len(raw_books)} books")
+        return {"added": added, "errors": errors}
+
+    async def export_library(context: JobContext) -> dict:
+        library = await _library(context, users)
+        await context.progress(0.5, "Writing export")
+        path = str(Path(export_dir) / f"{context.job.user_id}-{context.job.id}.json")
+        size = await context.run_cpu(write_export, path, library)
+        return {"path": path, "bytes": size}
+
+    async def rebuild_statistics(context: JobContext) -> dict:
+        library = await _library(context, users)
+        return await context.run_cpu(compute_statistics, library)
+
+    async def delete_user(context: JobContext) -> dict:
+        user_id = _user_id(context)
+        error = await users.delete_user(user_id)
+        if error:
+            raise JobFailed(error.message)
+        return {"deleted": str(user_id)}
+
+    queue.register("import_books", import_books)
+    queue.register("export_library", export_library)
+    queue.register("rebuild_statistics", rebuild_statistics)
+    queue.register("delete_user", delete_user)
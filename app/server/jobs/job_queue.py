@@ -0,0 +1,238 @@
+import asyncio
+import itertools
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from beanie import PydanticObjectId
+
+from app.server.models.job import Job, JobRequest, JobStatus
+from app.server.repositories.job_repository import IJobRepository
+from app.server.repositories.repository_error import RepositoryError
+
+
+class JobFailed(Exception):
+    """
+    Raised by a handler for errors that retrying cannot fix.
+    """
+
+
+class JobLeaseLost(Exception):
+    """
+    Raised in a handler whose job was queued again or claimed by another worker after its lease expired.
+    """
+
+
+class JobContext:
+    """
+    What a job handler gets to work with: the job itself, progress reporting and the process pool.
+    """
+
+    def __init__(self, job: Job, queue: "JobQueue"):
+        self.job = job
+        self._queue = queue
+
+    async def progress(self, fraction: float, message: Optional[str] = None) -> None:
+        """
+        Record how far the job has got.
+
+        :param fraction: Completed part of the work, between 0 and 1.
+        :param message: Optional human-readable status.
+        """
+        self.job.progress = max(0.0, min(1.0, fraction))
+        self.job.message = message
+        error = await self._queue.repository.update_claimed_job(
+            self.job.id, self.job.attempts, {"progress": self.job.progress, "message": message}
+        )
+        if error:
+            raise JobLeaseLost(error.message)
+
+    async def run_cpu(self, function: Callable, *args) -> Any:
+        """
+        Run a CPU-bound, picklable function in the process pool without blocking the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._queue.process_pool, function, *args)
+
+
+JobHandler = Callable[[JobContext], Awaitable[Any]]
+
+
+class JobQueue:
+    """
+    In-process priority queue of persistent jobs, executed by a pool of asyncio worker tasks.
+
+    Several processes can share the jobs collection. A worker claims a job atomically before running it, so
+    every job runs in one process only, and renews a lease on it while it runs. Every ``poll_interval`` each
+    process queues the jobs submitted elsewhere and requeues running jobs whose lease expired because their
+    process stopped. Every update of a running job only applies while the worker still holds its claim; a
+    worker that lost it, e.g. after stalling past its lease, stops the handler and leaves the job to the
+    worker that took it over. Failed jobs are retried with exponential backoff until ``max_attempts`` is
+    reached.
+    """
+
+    def __init__(self, repository: IJobRepository, workers: int, process_workers: int, max_attempts: int,
+                 retry_base_delay: float, lease_seconds: float, poll_interval: float):
+        self.repository = repository
+        self.workers = workers
+        self.process_workers = process_workers
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.process_pool: Optional[ProcessPoolExecutor] = None
+        self._handlers: Dict[str, JobHandler] = {}
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        # jobs waiting in the local queue, so that polling does not queue them twice
+        self._pending: Set[PydanticObjectId] = set()
+        self._tasks: List[asyncio.Task] = []
+        # tie-breaker keeping FIFO order between jobs of equal priority
+        self._sequence = itertools.count()
+
+    def register(self, type: str, handler: JobHandler) -> None:
+        self._handlers[type] = handler
+
+    def handles(self, type: str) -> bool:
+        return type in self._handlers
+
+    async def submit(self, request: JobRequest, user_id: Optional[PydanticObjectId] = None) -> RepositoryError | Job:
+        """
+        Persist a job and queue it for execution.
+
+        :param request: The job type, parameters and priority.
+        :param user_id: The ID of the user the job acts on, if any.
+        :return: The stored job or a RepositoryError if an error occurs.
+        """
+        if not self.handles(request.type):
+            return RepositoryError(message=f"Unknown job type {request.type}")
+        job = Job(
+            type=request.type,
+            user_id=str(user_id) if user_id else None,
+            params=request.params,
+            priority=request.priority,
+            max_attempts=self.max_attempts,
+            created_at=datetime.utcnow(),
+        )
+        result = await self.repository.create_job(job)
+        if isinstance(result, RepositoryError):
+            return result
+        self._enqueue(result)
+        return result
+
+    async def start(self) -> None:
+        self._queue = asyncio.PriorityQueue()
+        self.process_pool = ProcessPoolExecutor(max_workers=self.process_workers)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._poll()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._pending.clear()
+        if self.process_pool is not None:
+            self.process_pool.shutdown(wait=False, cancel_futures=True)
+            self.process_pool = None
+
+    def _enqueue(self, job: Job) -> None:
+        if self._queue is not None and job.id not in self._pending:
+            self._pending.add(job.id)
+            self._queue.put_nowait((-job.priority, next(self._sequence), job.id))
+
+    async def _poll(self) -> None:
+        while True:
+            try:
+                now = datetime.utcnow()
+                await self.repository.requeue_expired_jobs(now)
+                for job in await self.repository.get_queued_jobs(now):
+                    self._enqueue(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logging.exception("Polling for jobs failed")
+            await asyncio.sleep(self.poll_interval)
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, job_id = await self._queue.get()
+            self._pending.discard(job_id)
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logging.exception("Job worker failed on job %s", job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: PydanticObjectId) -> None:
+        now = datetime.utcnow()
+        job = await self.repository.claim_job(job_id, now, now + timedelta(seconds=self.lease_seconds))
+        if job is None:
+            # claimed by another worker, not queued any more or not due yet
+            return
+        handler = asyncio.create_task(self._handlers[job.type](JobContext(job, self)))
+        heartbeat = asyncio.create_task(self._heartbeat(job, handler))
+        try:
+            result = await handler
+        except asyncio.CancelledError:
+            if heartbeat.done() and not heartbeat.cancelled():
+                # cancelled by the heartbeat, which found the claim lost
+                return
+            # the worker is stopping; the job is left as running and queued again once its lease expires
+            raise
+        except JobLeaseLost as e:
+            logging.warning("Job %s stopped: %s", job.id, e)
+            return
+        except Exception as e:
+            await self._failed(job, e)
+            return
+        finally:
+            heartbeat.cancel()
+        await self._update(job, {
+            "status": JobStatus.succeeded.value,
+            "progress": 1.0,
+            "result": result,
+            "finished_at": datetime.utcnow(),
+            "lease_expires_at": None,
+        })
+
+    async def _heartbeat(self, job: Job, handler: asyncio.Task) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                lease_until = datetime.utcnow() + timedelta(seconds=self.lease_seconds)
+                error = await self.repository.update_claimed_job(job.id, job.attempts, {"lease_expires_at": lease_until})
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logging.exception("Renewing the lease of job %s failed", job.id)
+                continue
+            if error:
+                logging.warning("Job %s stopped: %s", job.id, error.message)
+                handler.cancel()
+                return
+
+    async def _update(self, job: Job, changes: dict) -> bool:
+        error = await self.repository.update_claimed_job(job.id, job.attempts, changes)
+        if error:
+            logging.warning("Outcome of job %s discarded: %s", job.id, error.message)
+        return not error
+
+    async def _failed(self, job: Job, error: Exception) -> None:
+        message = f"{type(error).__name__}: {error}"
+        if isinstance(error, JobFailed) or job.attempts >= job.max_attempts:
+            await self._update(job, {
+                "status": JobStatus.failed.value, "error": message, "finished_at": datetime.utcnow(),
+                "lease_expires_at": None,
+            })
+            return
+        delay = self.retry_base_delay * 2 ** (job.attempts - 1)
+        retrying = await self._update(job, {
+            "status": JobStatus.queued.value, "error": message, "message": f"Retrying in {delay:g}s",
+            "run_after": datetime.utcnow() + timedelta(seconds=delay), "lease_expires_at": None,
+        })
+        if retrying:
+            asyncio.get_running_loop().call_later(delay, self._enqueue, job)
@@ -0,0 +1,62 @@
+from typing import Optional
+
+import pymongo
+
+from app.server.config import config
+from app.server.resilience.deadline import finish_deadline, start_deadline
+
+TIMEOUT_HEADER = b"x-request-timeout-ms"
+
+
+def route_timeout_ms(path: str) -> Optional[int]:
+    """
+    The configured timeout of the longest ``config.REQUEST_TIMEOUT_ROUTES`` prefix matching the path.
+    """
+    matches = [prefix for prefix in config.REQUEST_TIMEOUT_ROUTES if path.startswith(prefix)]
+    if not matches:
+        return config.REQUEST_TIMEOUT_MS
+    return config.REQUEST_TIMEOUT_ROUTES[max(matches, key=len)]
+
+
+class DeadlineMiddleware:
+    """
+    Gives every request a deadline: the route's configured timeout, or ``X-Request-Timeout-Ms`` capped at
+    ``config.REQUEST_TIMEOUT_MAX_MS``.
+
+    The request runs inside ``pymongo.timeout``, so every MongoDB operation it issues, including those run
+    by motor's executor threads, gets the time left as its operation timeout and the server its
+    ``maxTimeMS``.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timeout_ms = self._requested_timeout_ms(scope)
+        if timeout_ms is None:
+            timeout_ms = route_timeout_ms(scope["path"])
+        if timeout_ms is None:
+            await self.app(scope, receive, send)
+            return
+
+        token = start_deadline(timeout_ms / 1000)
+        try:
+            with pymongo.timeout(timeout_ms / 1000):
+                await self.app(scope, receive, send)
+        finally:
+            finish_deadline(token)
+
+    @staticmethod
+    def _requested_timeout_ms(scope) -> Optional[int]:
+        for name, value in scope["headers"]:
+            if name == TIMEOUT_HEADER:
+                try:
+                    timeout_ms = int(value)
+                except ValueError:
+                    return None
+                return min(max(timeout_ms, 1), config.REQUEST_TIMEOUT_MAX_MS)
+        return None
@@ -0,0 +1,82 @@
+import asyncio
+import random
+import secrets
+import time
+from typing import Optional
+
+from starlette.datastructures import MutableHeaders
+
+from app.server.config import config
+from app.server.profiling.sampler import StackSampler, profile_path
+from app.server.profiling.spans import current_request_spans, finish_request_spans, start_request_spans
+
+PROFILE_HEADER = b"x-profile"
+
+
+def is_profiling_token(value: Optional[str]) -> bool:
+    """
+    Check a client-supplied token against ``config.PROFILING_TOKEN`` in constant time.
+
+    :return: False when no token is configured.
+    """
+    if not config.PROFILING_TOKEN or value is None:
+        return False
+    return secrets.compare_digest(value.encode(), config.PROFILING_TOKEN.encode())
+
+
+class ProfilingMiddleware:
+    """
+    Opt-in request profiling.
+
+    A request is profiled when it carries ``X-Profile: <config.PROFILING_TOKEN>`` or is picked by
+    ``config.PROFILING_SAMPLE_RATE``; its folded stack samples are written to
+    ``config.PROFILING_OUTPUT_DIR``. With spans enabled, the spans recorded for a request carrying the
+    token are returned in a ``Server-Timing`` header. The middleware is only installed when one of these
+    is configured.
+
+    The sampler watches the event loop thread, so concurrent requests show up in the same profile.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        authorized = self._has_token(scope)
+        sampled = config.PROFILING_SAMPLE_RATE > 0 and random.random() < config.PROFILING_SAMPLE_RATE
+        sampler = StackSampler.try_start(config.PROFILING_INTERVAL) if authorized or sampled else None
+        spans_token = start_request_spans() if config.PROFILING_SPANS_ENABLED else None
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            # span names and timings describe the internals, so only token holders get them
+            if message["type"] == "http.response.start" and spans_token is not None and authorized:
+                headers = MutableHeaders(scope=message)
+                total = (time.perf_counter() - start) * 1000
+                entries = [f"total;dur={total:.2f}"]
+                entries += [f'span{index};desc="{name}";dur={duration * 1000:.2f}'
+                            for index, (name, duration) in enumerate(current_request_spans())]
+                headers.append("Server-Timing", ", ".join(entries))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            if spans_token is not None:
+                finish_request_spans(spans_token)
+            if sampler is not None:
+                sampler.stop()
+                path = profile_path(config.PROFILING_OUTPUT_DIR, scope["method"], scope["path"])
+                await asyncio.to_thread(sampler.write, path)
+
+    @staticmethod
+    def _has_token(scope) -> bool:
+        if config.PROFILING_TOKEN:
+            for name, value in scope["headers"]:
+                if name == PROFILE_HEADER and is_profiling_token(value.decode("latin-1")):
+                    return True
+        return False
+
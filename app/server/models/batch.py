@@ -0,0 +1,58 @@
+from typing import Annotated, List, Literal, Optional, Union
+
+from beanie import PydanticObjectId
+from pydantic import BaseModel, Field
+
+
+class AddToCollection(BaseModel):
+    op: Literal["add_to_collection"]
+    collection_id: PydanticObjectId
+    book_id: str
+
+class RemoveFromCollection(BaseModel):
+    op: Literal["remove_from_collection"]
+    collection_id: PydanticObjectId
+    book_id: str
+
+class MoveToCollection(BaseModel):
+    op: Literal["move_to_collection"]
+    from_collection_id: PydanticObjectId
+    to_collection_id: PydanticObjectId
+    book_id: str
+
+class DeleteBook(BaseModel):
+    op: Literal["delete_book"]
+    book_id: PydanticObjectId
+
+class RateBook(BaseModel):
+    op: Literal["rate_book"]
+    book_id: PydanticObjectId
+    rating: int
+
+class AddFavourite(BaseModel):
+    op: Literal["add_favourite"]
+    book_id: str
+
+class RemoveFavourite(BaseModel):
+    op: Literal["remove_favourite"]
+    book_id: str
+
+BatchOperation = Annotated[
+    Union[AddToCollection, RemoveFromCollection, MoveToCollection, DeleteBook, RateBook, AddFavourite, RemoveFavourite],
+    Field(discriminator="op"),
+]
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation] = Field(..., min_length=1)
+    transactional: bool = False
+
+class OperationResult(BaseModel):
+    index: int
+    op: str
+    ok: bool
+    message: Optional[str] = None
+
+class BatchResult(BaseModel):
+    applied: bool
+    statements: int = 0
+    results: List[OperationResult]
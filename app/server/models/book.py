@@ -1,7 +1,8 @@
 from typing import Optional, Annotated
 from pydantic import BaseModel, PlainSerializer
 from app.server.models.description import Description
-from beanie import Document, PydanticObjectId
+from app.server.models.embedded import EmbeddedModel
+from beanie import PydanticObjectId
 from datetime import datetime
 
 SerializedObjectId = Annotated[
@@ -9,7 +10,7 @@ SerializedObjectId = Annotated[
     PlainSerializer(lambda x: str(x), return_type=str, when_used='json')
 ]
 
-class Book(Document):
+class Book(EmbeddedModel):
     isnb: str
     start_read_date: datetime
     end_read_date: datetime
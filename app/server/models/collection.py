@@ -1,13 +1,15 @@
 from typing import List, Optional, Annotated
-from beanie import Document, PydanticObjectId
+from beanie import PydanticObjectId
 from pydantic import BaseModel, Field, PlainSerializer
 
+from app.server.models.embedded import EmbeddedModel
+
 SerializedObjectId = Annotated[
     PydanticObjectId,
     PlainSerializer(lambda x: str(x), return_type=str, when_used='json')
 ]
 
-class Collection(Document):
+class Collection(EmbeddedModel):
     collection_name: str = Field(..., min_length=1)
     books: List[str]
 class UpdateCollection(BaseModel):
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Optional, Annotated
 
-from beanie import Document, PydanticObjectId
+from beanie import PydanticObjectId
 from pydantic import BaseModel, Field, PlainSerializer
 
 SerializedObjectId = Annotated[
@@ -9,7 +9,7 @@ SerializedObjectId = Annotated[
     PlainSerializer(lambda x: str(x), return_type=str, when_used='json')
 ]
 
-class Description(Document):
+class Description(BaseModel):
     title: str = Field(..., min_length=1)
     description: str
     author_name: str
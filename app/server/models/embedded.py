@@ -0,0 +1,27 @@
+from typing import Annotated, Optional
+
+from beanie import PydanticObjectId
+from bson import ObjectId
+from pydantic import BaseModel, ConfigDict, Field, WrapValidator
+
+
+def _keep_stored_object_id(value, handler):
+    # ObjectId instances only come out of BSON decoding, i.e. from our own database; they are trusted
+    # as is instead of being parsed again. Ids from request bodies are strings and still validated.
+    return value if type(value) is ObjectId else handler(value)
+
+
+StoredObjectId = Annotated[PydanticObjectId, WrapValidator(_keep_stored_object_id)]
+
+
+class EmbeddedModel(BaseModel):
+    """
+    Base of the sub-documents stored inside a user.
+
+    A plain pydantic model rather than a beanie Document, so loading a user with thousands of books,
+    quotes and collections only runs pydantic-core validation, without building beanie documents.
+    Each item gets its own id when created, stored as ``_id`` like a document's.
+    """
+    model_config = ConfigDict(populate_by_name=True)
+
+    id: Optional[StoredObjectId] = Field(default_factory=PydanticObjectId, alias="_id")
@@ -0,0 +1,113 @@
+import typing
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, Field, create_model
+
+FieldSet = Tuple[str, ...]
+
+
+class FieldSetError(ValueError):
+    pass
+
+
+def _nested_model(annotation) -> Optional[Type[BaseModel]]:
+    # unwraps Optional[...] / List[...] down to a model class, if there is one
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    for argument in typing.get_args(annotation):
+        model = _nested_model(argument)
+        if model is not None:
+            return model
+    return None
+
+
+def parse_fieldset(model: Type[BaseModel], fields: str, hidden: FrozenSet[str] = frozenset()) -> FieldSet:
+    """
+    Parse and validate a ``fields=`` query parameter such as ``isnb,rating,description.title``.
+
+    :param model: The model the fields belong to.
+    :param fields: Comma separated field paths, nested fields separated by dots.
+    :param hidden: Top-level fields that must never be selected.
+    :return: The sorted, de-duplicated field paths, always including ``id`` when the model has one.
+    :raises FieldSetError: If a path does not exist on the model.
+    """
+    paths = {path.strip() for path in fields.split(",") if path.strip()}
+    if not paths:
+        raise FieldSetError("No fields selected")
+    for path in paths:
+        current = model
+        for part in path.split("."):
+            if current is None or part not in current.model_fields or (current is model and part in hidden):
+                raise FieldSetError(f"Unknown field {path}")
+            current = _nested_model(current.model_fields[part].annotation)
+    if "id" in model.model_fields:
+        paths.add("id")
+    return tuple(sorted(paths))
+
+
+def _split(fieldset: FieldSet) -> Dict[str, Optional[List[str]]]:
+    # {"description": ["title"], "rating": None} - None means the whole field
+    selection: Dict[str, Optional[List[str]]] = {}
+    for path in fieldset:
+        head, _, rest = path.partition(".")
+        if not rest or selection.get(head, []) is None:
+            selection[head] = None
+        else:
+            selection.setdefault(head, []).append(rest)
+    return selection
+
+
+def mongo_projection(model: Type[BaseModel], fieldset: FieldSet, prefix: str = "") -> dict:
+    """
+    Translate a field set into a MongoDB projection.
+
+    :param model: The model the fields belong to.
+    :param fieldset: Field paths returned by ``parse_fieldset``.
+    :param prefix: Path of the model inside the stored document, e.g. ``userBooks.``.
+    :return: The projection document.
+    """
+    projection = {}
+    for name, nested in _split(fieldset).items():
+        field = model.model_fields[name]
+        stored_name = field.alias or name
+        if nested is None:
+            projection[f"{prefix}{stored_name}"] = 1
+        else:
+            projection.update(mongo_projection(_nested_model(field.annotation), tuple(nested), f"{prefix}{stored_name}."))
+    return projection
+
+
+def _replace_model(annotation, model: Type[BaseModel], lean: Type[BaseModel]):
+    if annotation is model:
+        return lean
+    origin = typing.get_origin(annotation)
+    if origin is None:
+        return annotation
+    arguments = tuple(_replace_model(argument, model, lean) for argument in typing.get_args(annotation))
+    if origin is typing.Union:
+        return typing.Union[arguments]
+    return origin[arguments] if len(arguments) > 1 else origin[arguments[0]]
+
+
+@lru_cache(maxsize=256)
+def lean_model(model: Type[BaseModel], fieldset: FieldSet) -> Type[BaseModel]:
+    """
+    Build (once per field set) a model holding only the selected fields.
+
+    Selected fields keep their type, alias and constraints, but are optional, so documents written before
+    a field existed still load.
+    """
+    definitions = {}
+    for name, nested in _split(fieldset).items():
+        field = model.model_fields[name]
+        annotation = field.annotation
+        if nested is not None:
+            nested_model = _nested_model(annotation)
+            annotation = _replace_model(annotation, nested_model, lean_model(nested_model, tuple(sorted(nested))))
+        definitions[name] = (Optional[annotation], Field(None, alias=field.alias))
+    return create_model(
+        f"{model.__name__}Fields",
+        __config__={"populate_by_name": True},
+        **definitions,
+    )
@@ -0,0 +1,51 @@
+from datetime import datetime
+from enum import Enum
+from typing import Optional, Any
+
+from beanie import Document
+from pydantic import BaseModel, Field
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+
+class JobStatus(str, Enum):
+    queued = "queued"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+
+
+class Job(Document):
+    type: str
+    user_id: Optional[str] = None
+    params: dict = Field(default_factory=dict)
+    priority: int = 0
+    status: JobStatus = JobStatus.queued
+    attempts: int = 0
+    max_attempts: int
+    progress: float = 0.0
+    message: Optional[str] = None
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    # a queued job is not claimed before this time, e.g. while waiting to be retried
+    run_after: Optional[datetime] = None
+    # a running job whose lease expired was abandoned by its process and is queued again
+    lease_expires_at: Optional[datetime] = None
+    class Settings:
+        name = "jobs"
+        indexes = [
+            IndexModel([("status", ASCENDING), ("priority", DESCENDING), ("created_at", ASCENDING)]),
+            IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)]),
+        ]
+
+class JobRequest(BaseModel):
+    type: str
+    params: dict = Field(default_factory=dict)
+    priority: int = Field(0, ge=-10, le=10)
+
+class JobProgress(BaseModel):
+    status: JobStatus
+    progress: float
+    message: Optional[str]
@@ -0,0 +1,19 @@
+from datetime import datetime
+from typing import List, Optional
+
+from beanie import Document
+
+
+class Lease(Document):
+    """
+    Exclusive right of one process to do some background work, stored under the name of that work as ``_id``.
+
+    The holder renews it while it works; once it expires any other process may take it over. Other
+    processes leave work they noticed for the holder in ``pending``.
+    """
+    id: Optional[str] = None
+    holder: str
+    expires_at: datetime
+    pending: List[str] = []
+    class Settings:
+        name = "leases"
@@ -1,10 +1,11 @@
 from datetime import datetime
 from typing import Optional
 
-from beanie import Document
 from pydantic import BaseModel, Field
 
-class Quote(Document):
+from app.server.models.embedded import EmbeddedModel
+
+class Quote(EmbeddedModel):
     book_id: str = Field()
     text: str = Field(..., min_length=1)
     created_at: datetime
@@ -0,0 +1,23 @@
+from typing import List
+
+from pydantic import BaseModel
+
+
+class LibraryItems(BaseModel):
+    """
+    The books a user interacted with, by ISNB.
+    """
+    user_id: str
+    books: List[str] = []
+    favourites: List[str] = []
+    collected: List[str] = []
+
+
+class SimilarBook(BaseModel):
+    isnb: str
+    score: float
+
+
+class SimilarBooks(BaseModel):
+    isnb: str
+    similar: List[SimilarBook]
@@ -0,0 +1,37 @@
+from datetime import datetime
+from typing import Optional
+
+from beanie import Document
+from pydantic import BaseModel
+from pymongo import ASCENDING, IndexModel
+
+
+class RefreshToken(Document):
+    """
+    A refresh token, stored only as the SHA-256 of the token handed to the client.
+
+    Every login starts a family; each refresh marks the presented token used and issues the next one in
+    the same family.
+    """
+    token_hash: str
+    family_id: str
+    username: str
+    created_at: datetime
+    expires_at: datetime
+    used_at: Optional[datetime] = None
+    revoked: bool = False
+    class Settings:
+        name = "refresh_tokens"
+        indexes = [
+            IndexModel([("token_hash", ASCENDING)], unique=True),
+            IndexModel([("family_id", ASCENDING)]),
+            # MongoDB deletes tokens once they expire
+            IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+        ]
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class IssuedRefreshToken(BaseModel):
+    username: str
+    refresh_token: str
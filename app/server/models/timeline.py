@@ -0,0 +1,60 @@
+import base64
+import json
+from datetime import datetime
+from enum import Enum
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class TimelineEventKind(str, Enum):
+    book_started = "book_started"
+    book_finished = "book_finished"
+    quote_added = "quote_added"
+
+
+# tie-break order of events sharing a timestamp
+KIND_ORDER = {
+    TimelineEventKind.book_started: 0,
+    TimelineEventKind.book_finished: 1,
+    TimelineEventKind.quote_added: 2,
+}
+
+
+class TimelineEvent(BaseModel):
+    kind: TimelineEventKind
+    at: datetime
+    id: str
+    book_id: str
+    isnb: Optional[str] = None
+    title: Optional[str] = None
+    text: Optional[str] = None
+
+    def sort_key(self) -> tuple:
+        return self.at, KIND_ORDER[self.kind], self.id
+
+
+class TimelineCursor(BaseModel):
+    at: datetime
+    kind: TimelineEventKind
+    id: str
+    # events of this kind stored without an id at this timestamp that were already returned
+    skip: int = 0
+
+    @classmethod
+    def after(cls, event: TimelineEvent, skip: int = 0) -> "TimelineCursor":
+        return cls(at=event.at, kind=event.kind, id=event.id, skip=skip)
+
+    def encode(self) -> str:
+        raw = json.dumps([self.at.isoformat(), self.kind.value, self.id, self.skip]).encode()
+        return base64.urlsafe_b64encode(raw).decode()
+
+    @classmethod
+    def decode(cls, token: str) -> "TimelineCursor":
+        at, kind, id, *skip = json.loads(base64.urlsafe_b64decode(token.encode()))
+        return cls(at=datetime.fromisoformat(at), kind=kind, id=id, skip=skip[0] if skip else 0)
+
+
+class TimelinePage(BaseModel):
+    events: List[TimelineEvent]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,67 @@
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+
+
+class StackSampler:
+    """
+    Statistical profiler that periodically samples the stack of one thread from a helper thread.
+
+    Samples are written in the folded format (``frame;frame;frame count`` per line) understood by
+    flamegraph.pl, speedscope and inferno. Only one sampler runs at a time, so profiling never stacks up.
+    """
+
+    _active_lock = threading.Lock()
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    @classmethod
+    def try_start(cls, interval: float) -> Optional["StackSampler"]:
+        """
+        Start sampling the calling thread unless another sampler is already running.
+
+        :param interval: Seconds between two samples.
+        :return: The running sampler, or None if one is already active.
+        """
+        if not cls._active_lock.acquire(blocking=False):
+            return None
+        sampler = cls(threading.get_ident(), interval)
+        sampler._thread.start()
+        return sampler
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        StackSampler._active_lock.release()
+
+    def write(self, path: Path) -> Path:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("w") as output:
+            for stack, count in self.samples.most_common():
+                output.write(f"{stack} {count}\n")
+        return path
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}:{code.co_firstlineno}")
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
+
+
+def profile_path(directory: str, method: str, path: str) -> Path:
+    safe_path = path.strip("/").replace("/", "_") or "root"
+    return Path(directory) / f"{time.strftime('%Y%m%d-%H%M%S')}-{int(time.time() * 1000) % 1000:03d}-{method}-{safe_path}.folded"
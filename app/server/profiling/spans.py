@@ -0,0 +1,101 @@
+import functools
+import inspect
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from app.server.config import config
+
+# spans recorded during the current request, set by the profiling middleware
+_request_spans: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_spans", default=None)
+
+
+class SpanStats:
+    """
+    Aggregated durations per span name since process start.
+    """
+
+    def __init__(self):
+        self._stats: Dict[str, List[float]] = {}
+
+    def record(self, name: str, duration: float) -> None:
+        stats = self._stats.get(name)
+        if stats is None:
+            self._stats[name] = [1, duration, duration]
+        else:
+            stats[0] += 1
+            stats[1] += duration
+            stats[2] = max(stats[2], duration)
+
+    def as_dict(self) -> dict:
+        return {
+            name: {"count": count, "total_ms": total * 1000, "mean_ms": total / count * 1000, "max_ms": longest * 1000}
+            for name, (count, total, longest) in sorted(self._stats.items())
+        }
+
+
+span_stats = SpanStats()
+
+
+def start_request_spans():
+    return _request_spans.set([])
+
+
+def current_request_spans() -> List[Tuple[str, float]]:
+    return _request_spans.get() or []
+
+
+def finish_request_spans(token) -> List[Tuple[str, float]]:
+    spans = _request_spans.get() or []
+    _request_spans.reset(token)
+    return spans
+
+
+def timed(name: str):
+    """
+    Record the duration of a function as a span.
+
+    When ``config.PROFILING_SPANS_ENABLED`` is off the function is returned unchanged, so disabled spans
+    cost nothing at call time.
+    """
+    def record(duration: float) -> None:
+        span_stats.record(name, duration)
+        spans = _request_spans.get()
+        if spans is not None:
+            spans.append((name, duration))
+
+    def decorator(function):
+        if not config.PROFILING_SPANS_ENABLED:
+            return function
+
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await function(*args, **kwargs)
+                finally:
+                    record(time.perf_counter() - start)
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def timed_methods(cls):
+    """
+    Class decorator applying ``timed`` to every public coroutine method defined on the class.
+    """
+    if not config.PROFILING_SPANS_ENABLED:
+        return cls
+    for attribute, value in list(vars(cls).items()):
+        if not attribute.startswith("_") and inspect.iscoroutinefunction(value):
+            setattr(cls, attribute, timed(f"{cls.__name__}.{attribute}")(value))
+    return cls
@@ -0,0 +1,255 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from datetime import timedelta
+from typing import Dict, List, Optional, Set
+
+from app.server.events.change_stream import FIELD_EVENTS, LIBRARY_CHANGED, USER_DELETED
+from app.server.events.event_bus import LibraryEvent
+from app.server.models.recommendation import LibraryItems, SimilarBook
+from app.server.repositories.lease_repository import ILeaseRepository
+from app.server.repositories.library_items_repository import ILibraryItemsRepository
+from app.server.repositories.repository_error import RepositoryError
+
+# how much each kind of interaction counts towards two books being read together
+LIBRARY_WEIGHT = 1.0
+FAVOURITE_WEIGHT = 1.0
+COLLECTION_WEIGHT = 0.5
+
+# name of the lease held by the process that builds the index
+LEASE_NAME = "recommendations"
+
+# events after which a user's items have to be read again
+TRACKED_EVENTS = {
+    FIELD_EVENTS["userBooks"],
+    FIELD_EVENTS["favourites"],
+    FIELD_EVENTS["collections"],
+    LIBRARY_CHANGED,
+    USER_DELETED,
+}
+
+
+class RecommendationEngine:
+    """
+    "Similar books" from co-occurrence: two books are similar when the same users have them in their
+    libraries, favourites and collections (cosine similarity of the weighted users x books matrix).
+
+    The top-k neighbours of every book are kept in a ``SimilarityIndex`` and served from memory. A full
+    rebuild reads every user; incremental refreshes re-read only the users whose libraries changed since,
+    as reported on the event bus, and recompute only the rows of the books those users touched. Rows of
+    other books may keep slightly stale scores for an affected neighbour until the next full rebuild.
+
+    With a lease repository, only the process holding the lease reads the users and builds the index; it
+    writes every new index to ``index_path``, and the other processes load that file when it changes. The
+    other processes hand the users whose libraries changed to the leader through the lease, since without
+    change streams their writes are only published on their own event bus.
+
+    numpy and scipy are imported on first build so that importing the app stays cheap.
+    """
+
+    def __init__(self, repository: ILibraryItemsRepository, top_k: int, block_size: int,
+                 refresh_interval: float, full_rebuild_every: int, leases: Optional[ILeaseRepository] = None,
+                 lease_duration: float = 0.0, index_path: Optional[str] = None):
+        self.repository = repository
+        self.top_k = top_k
+        self.block_size = block_size
+        self.refresh_interval = refresh_interval
+        self.full_rebuild_every = full_rebuild_every
+        self.leases = leases
+        self.lease_duration = timedelta(seconds=lease_duration)
+        self.index_path = index_path
+        self.index = None
+        self.built_at: Optional[float] = None
+        self._holder = f"{os.getpid()}-{uuid.uuid4().hex}"
+        self._leading = False
+        self._books: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._user_rows: Dict[str, Dict[int, float]] = {}
+        # whether the rows above belong to the current index, i.e. it was built here and not loaded
+        self._has_rows = False
+        self._dirty: Set[str] = set()
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def on_event(self, event: LibraryEvent) -> None:
+        if event.type in TRACKED_EVENTS:
+            self._dirty.add(event.user_id)
+
+    def similar(self, isnb: str, limit: int) -> Optional[List[SimilarBook]]:
+        """
+        :param isnb: The ISNB of the book.
+        :param limit: The maximum number of similar books.
+        :return: The most similar books, best first, or None if the book is not indexed.
+        """
+        if self.index is None:
+            return None
+        similar = self.index.similar(isnb, limit)
+        return None if similar is None else [SimilarBook(**book) for book in similar]
+
+    async def rebuild(self) -> RepositoryError | None:
+        """
+        Read every user's items and recompute the neighbours of every book.
+        """
+        async with self._lock:
+            # writes from here on are picked up by the next refresh
+            self._dirty.clear()
+            result = await self.repository.get_library_items()
+            if isinstance(result, RepositoryError):
+                return result
+            self.index = await asyncio.to_thread(self._build, result)
+            self._has_rows = True
+            self.built_at = time.time()
+
+    async def refresh(self) -> RepositoryError | None:
+        """
+        Re-read the users whose libraries changed and recompute the neighbours of the books they touched.
+        """
+        async with self._lock:
+            if not self._has_rows:
+                return None
+            users, self._dirty = self._dirty, set()
+            if not users:
+                return None
+            result = await self.repository.get_library_items(list(users))
+            if isinstance(result, RepositoryError):
+                self._dirty |= users
+                return result
+            self.index = await asyncio.to_thread(self._update, users, result)
+            self.built_at = time.time()
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self.leases is not None and self._leading:
+            self._leading = False
+            await self.leases.release(LEASE_NAME, self._holder)
+
+    async def _run(self) -> None:
+        refreshes = 0
+        while True:
+            try:
+                if await self._lead():
+                    if self.leases is not None:
+                        self._dirty.update(await self.leases.take_pending(LEASE_NAME, self._holder))
+                    built_at = self.built_at
+                    if not self._has_rows or (self.full_rebuild_every and refreshes % self.full_rebuild_every == 0):
+                        error = await self.rebuild()
+                    else:
+                        error = await self.refresh()
+                    if error:
+                        logging.warning("Similar books refresh failed: %s", error.message)
+                    elif self.index_path and self.built_at != built_at:
+                        await asyncio.to_thread(self.index.save, self.index_path)
+                    refreshes += 1
+                else:
+                    await self._hand_over()
+                    await self._load()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logging.exception("Similar books refresh failed")
+            await asyncio.sleep(self.refresh_interval)
+
+    async def _lead(self) -> bool:
+        if self.leases is None:
+            return True
+        # renewed every refresh, so the lease has to outlast the refresh interval and a full rebuild
+        leading = await self.leases.acquire(LEASE_NAME, self._holder, self.lease_duration)
+        if leading and not self._leading:
+            # the index may have been loaded from the previous leader, without the rows to refresh it
+            self._has_rows = False
+        self._leading = leading
+        return leading
+
+    async def _hand_over(self) -> None:
+        users, self._dirty = self._dirty, set()
+        if not users:
+            return
+        try:
+            await self.leases.add_pending(LEASE_NAME, sorted(users))
+        except Exception:
+            self._dirty |= users
+            raise
+
+    async def _load(self) -> None:
+        if not self.index_path:
+            return
+        try:
+            modified = os.path.getmtime(self.index_path)
+        except FileNotFoundError:
+            return
+        if self.index is not None and self.built_at is not None and modified <= self.built_at:
+            return
+        from app.server.recommendations.similarity import SimilarityIndex
+
+        self.index = await asyncio.to_thread(SimilarityIndex.load, self.index_path)
+        self._has_rows = False
+        self.built_at = modified
+
+    def _build(self, result: List[LibraryItems]):
+        """
+        Index every user's items and compute a new index; runs in a worker thread.
+        """
+        self._books = []
+        self._positions = {}
+        self._user_rows = {items.user_id: self._row(items) for items in result}
+        return self._compute(list(self._user_rows.values()), list(self._books), None, None)
+
+    def _update(self, users: Set[str], result: List[LibraryItems]):
+        """
+        Replace the rows of ``users`` and recompute the books they touched; runs in a worker thread.
+        """
+        rows = {items.user_id: self._row(items) for items in result}
+        affected = set()
+        for user_id in users:
+            affected.update(self._user_rows.pop(user_id, {}))
+            row = rows.get(user_id)
+            if row:
+                self._user_rows[user_id] = row
+                affected.update(row)
+        if not affected:
+            return self.index
+        return self._compute(list(self._user_rows.values()), list(self._books), sorted(affected), self.index)
+
+    def _row(self, items: LibraryItems) -> Dict[int, float]:
+        weights: Dict[str, float] = {}
+        for isnbs, weight in ((items.books, LIBRARY_WEIGHT), (items.favourites, FAVOURITE_WEIGHT)):
+            for isnb in set(isnbs):
+                weights[isnb] = weights.get(isnb, 0.0) + weight
+        for isnb in set(items.collected):
+            weights[isnb] = weights.get(isnb, 0.0) + COLLECTION_WEIGHT
+        return {self._position(isnb): weight for isnb, weight in weights.items()}
+
+    def _position(self, isnb: str) -> int:
+        position = self._positions.get(isnb)
+        if position is None:
+            position = self._positions[isnb] = len(self._books)
+            self._books.append(isnb)
+        return position
+
+    def _compute(self, user_rows: List[Dict[int, float]], books: List[str], rows: Optional[List[int]], previous):
+        """
+        Build a new index from the snapshot it is given.
+        """
+        import numpy as np
+
+        from app.server.recommendations.similarity import SimilarityIndex, build_user_item_matrix, top_k_cosine
+
+        matrix = build_user_item_matrix(user_rows, len(books))
+        if rows is None:
+            neighbours, scores = top_k_cosine(matrix, np.arange(len(books), dtype=np.int32), self.top_k, self.block_size)
+            return SimilarityIndex(books, neighbours, scores)
+
+        # keep the unaffected rows, padding for books seen for the first time
+        added = len(books) - len(previous.neighbours)
+        neighbours = np.concatenate([previous.neighbours, np.full((added, self.top_k), -1, dtype=np.int32)])
+        scores = np.concatenate([previous.scores, np.zeros((added, self.top_k), dtype=np.float32)])
+        rows = np.asarray(rows, dtype=np.int32)
+        neighbours[rows], scores[rows] = top_k_cosine(matrix, rows, self.top_k, self.block_size)
+        return SimilarityIndex(books, neighbours, scores)
@@ -0,0 +1,110 @@
+import os
+from typing import Dict, List, Sequence
+
+import numpy as np
+from scipy import sparse
+
+
+def build_user_item_matrix(user_rows: Sequence[Dict[int, float]], n_items: int) -> sparse.csr_matrix:
+    """
+    Build the weighted users x items matrix.
+
+    :param user_rows: For every user, the weight of each item index they interacted with.
+    :param n_items: Number of columns.
+    :return: The matrix in CSR format.
+    """
+    counts = np.fromiter((len(row) for row in user_rows), dtype=np.int64, count=len(user_rows))
+    indptr = np.zeros(len(user_rows) + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    indices = np.fromiter((item for row in user_rows for item in row), dtype=np.int32, count=int(indptr[-1]))
+    data = np.fromiter((weight for row in user_rows for weight in row.values()), dtype=np.float32, count=int(indptr[-1]))
+    matrix = sparse.csr_matrix((data, indices, indptr), shape=(len(user_rows), n_items))
+    matrix.sum_duplicates()
+    return matrix
+
+
+def top_k_cosine(matrix: sparse.csr_matrix, items: np.ndarray, k: int, block_size: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Top-k cosine neighbours of the given items by co-occurrence across users.
+
+    Rows are computed ``block_size`` items at a time, so the item x item matrix is never materialised.
+
+    :param matrix: The users x items matrix.
+    :param items: Item indices to compute neighbours for.
+    :param k: Neighbours per item.
+    :param block_size: Items per block.
+    :return: ``(neighbours, scores)`` arrays of shape ``(len(items), k)``; missing neighbours are -1.
+    """
+    by_item = matrix.tocsc()
+    norms = np.sqrt(np.asarray(by_item.multiply(by_item).sum(axis=0)).ravel()).astype(np.float32)
+    inverse_norms = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+
+    neighbours = np.full((len(items), k), -1, dtype=np.int32)
+    scores = np.zeros((len(items), k), dtype=np.float32)
+    for start in range(0, len(items), block_size):
+        block = items[start:start + block_size]
+        # co-occurrence of the block's items with every item, then cosine normalisation
+        cooccurrence = (by_item[:, block].T @ matrix).tocsr()
+        row_of_entry = np.repeat(np.arange(len(block)), np.diff(cooccurrence.indptr))
+        cooccurrence.data *= inverse_norms[block][row_of_entry] * inverse_norms[cooccurrence.indices]
+        cooccurrence.data[cooccurrence.indices == block[row_of_entry]] = 0
+        cooccurrence.eliminate_zeros()
+
+        row_of_entry = np.repeat(np.arange(len(block)), np.diff(cooccurrence.indptr))
+        # scores are in (0, 1], so one float key sorts by row, then by descending score; far cheaper than lexsort
+        order = np.argsort(row_of_entry + (1.0 - cooccurrence.data.astype(np.float64)) * 0.5)
+        rank = np.arange(len(order)) - cooccurrence.indptr[row_of_entry[order]]
+        keep = order[rank < k]
+        rows = start + row_of_entry[keep]
+        columns = rank[rank < k]
+        neighbours[rows, columns] = cooccurrence.indices[keep]
+        scores[rows, columns] = cooccurrence.data[keep]
+    return neighbours, scores
+
+
+class SimilarityIndex:
+    """
+    Array-backed top-k neighbours per item: row ``i`` of ``neighbours`` holds the item indices most
+    similar to item ``i``, best first, padded with -1.
+    """
+
+    def __init__(self, items: List[str], neighbours: np.ndarray, scores: np.ndarray):
+        self.items = items
+        self.positions = {item: position for position, item in enumerate(items)}
+        self.neighbours = neighbours
+        self.scores = scores
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def similar(self, item: str, limit: int) -> List[dict] | None:
+        """
+        :param item: The item to find neighbours of.
+        :param limit: The maximum number of neighbours.
+        :return: Neighbours with their scores, or None if the item is unknown.
+        """
+        position = self.positions.get(item)
+        if position is None or position >= len(self.neighbours):
+            return None
+        neighbours = self.neighbours[position, :limit]
+        scores = self.scores[position, :limit]
+        return [
+            {"isnb": self.items[neighbour], "score": float(score)}
+            for neighbour, score in zip(neighbours.tolist(), scores.tolist())
+            if neighbour >= 0
+        ]
+
+    def save(self, path: str) -> None:
+        """
+        Write the index to ``path``, replacing the previous file atomically so readers never see a partial one.
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as file:
+            np.savez(file, items=np.array(self.items, dtype=np.str_), neighbours=self.neighbours, scores=self.scores)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: str) -> "SimilarityIndex":
+        with np.load(path) as arrays:
+            return cls(arrays["items"].tolist(), arrays["neighbours"], arrays["scores"])
@@ -0,0 +1,79 @@
+from typing import List
+
+from beanie import PydanticObjectId
+from pydantic import BaseModel
+
+from app.server.models.batch import BatchOperation, BatchResult
+from app.server.models.book import Book
+from app.server.models.fieldsets import FieldSet
+from app.server.models.quote import Quote
+from app.server.repositories.batch_repository import IBatchRepository, library_written
+from app.server.repositories.book_repository import IBookRepository
+from app.server.repositories.repository_error import RepositoryError, Result
+from app.server.search.autocomplete import AutocompleteIndex
+
+
+class AutocompleteBookRepository(IBookRepository):
+    """
+    IBookRepository that keeps the loaded autocomplete indexes in sync with successful book writes.
+    """
+
+    def __init__(self, repository: IBookRepository, index: AutocompleteIndex):
+        self.repository = repository
+        self.index = index
+
+    async def add_book_to_user(self, user_id: PydanticObjectId, book: Book) -> RepositoryError | None:
+        error = await self.repository.add_book_to_user(user_id, book)
+        if not error:
+            self.index.book_added(user_id, book)
+        return error
+
+    async def delete_book_from_user(self, user_id, book_id: PydanticObjectId) -> RepositoryError | None:
+        error = await self.repository.delete_book_from_user(user_id, book_id)
+        if not error:
+            self.index.book_removed(user_id, book_id)
+        return error
+
+    async def get_all_books(self, user_id: PydanticObjectId) -> Result[List[Book]]:
+        return await self.repository.get_all_books(user_id)
+
+    async def get_all_books_fields(self, user_id: PydanticObjectId, fields: FieldSet) -> RepositoryError | List[BaseModel]:
+        return await self.repository.get_all_books_fields(user_id, fields)
+
+    async def get_book_by_id(self, user_id, book_id: PydanticObjectId) -> Result[Book]:
+        return await self.repository.get_book_by_id(user_id, book_id)
+
+    async def update_book(self, user_id, book_id: PydanticObjectId, new_book_data: Book) -> RepositoryError | None:
+        error = await self.repository.update_book(user_id, book_id, new_book_data)
+        if not error:
+            self.index.book_replaced(user_id, book_id, new_book_data)
+        return error
+
+    async def add_quote_to_book(self, user_id, book_id: PydanticObjectId, quote: Quote) -> RepositoryError | None:
+        return await self.repository.add_quote_to_book(user_id, book_id, quote)
+
+    async def add_to_collection(self, user_id, book_id, collection_id: PydanticObjectId) -> RepositoryError | None:
+        return await self.repository.add_to_collection(user_id, book_id, collection_id)
+
+    async def update_description(self, user_id: PydanticObjectId, book_id: PydanticObjectId, new_description: str) -> RepositoryError | None:
+        # only the description text changes, which is not indexed
+        return await self.repository.update_description(user_id, book_id, new_description)
+
+
+class AutocompleteBatchRepository(IBatchRepository):
+    """
+    IBatchRepository that removes deleted books from the loaded autocomplete index once a batch wrote to the
+    library. A partly written batch wrote its removals, so its deleted books are gone as well.
+    """
+
+    def __init__(self, repository: IBatchRepository, index: AutocompleteIndex):
+        self.repository = repository
+        self.index = index
+
+    async def execute(self, user_id: PydanticObjectId, operations: List[BatchOperation], transactional: bool) -> RepositoryError | BatchResult:
+        result = await self.repository.execute(user_id, operations, transactional)
+        if library_written(result):
+            for operation in operations:
+                if operation.op == "delete_book":
+                    self.index.book_removed(user_id, operation.book_id)
+        return result
@@ -0,0 +1,290 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Set
+
+from beanie import PydanticObjectId
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from app.server.models.batch import BatchOperation, BatchResult, OperationResult
+from app.server.models.user import User
+from app.server.repositories.repository_error import ConflictError, PartialWriteError, RepositoryError
+from app.server.profiling.spans import timed_methods
+from app.server.resilience.guard import guarded_methods
+
+
+class IBatchRepository(ABC):
+    """
+    Interface for applying many library mutations of one user in a single call.
+    """
+
+    @abstractmethod
+    async def execute(self, user_id: PydanticObjectId, operations: List[BatchOperation], transactional: bool) -> RepositoryError | BatchResult:
+        """
+        Validate all operations against the user's library and apply them if every one is valid.
+
+        Operations are validated in order, each one seeing the effect of the previous ones. If any of them
+        is invalid nothing is written.
+
+        :param user_id: The ID of the user.
+        :param operations: The operations to apply, in order.
+        :param transactional: Run the writes inside a MongoDB transaction (requires a replica set).
+        :return: Per-operation results, a ConflictError if the library changed between the read and the
+            write, a PartialWriteError if it did so after a part of the batch was written, or a
+            RepositoryError if the user does not exist.
+        """
+        pass
+
+
+def library_written(result: RepositoryError | BatchResult) -> bool:
+    """
+    :param result: The outcome of ``IBatchRepository.execute``.
+    :return: Whether the batch wrote to the library, fully or in part.
+    """
+    return isinstance(result, PartialWriteError) or (isinstance(result, BatchResult) and result.applied)
+
+
+class LibraryState:
+    """
+    The parts of a user's library touched by batch operations, used to validate operations in memory
+    and to compute the net change to write.
+    """
+
+    def __init__(self, ratings: Dict[str, int], collections: Dict[str, Set[str]], favourites: Set[str]):
+        self.ratings = ratings
+        self.collections = collections
+        self.favourites = favourites
+
+    @classmethod
+    def from_document(cls, document: dict) -> "LibraryState":
+        # books and collections stored without an id cannot be the target of an operation
+        return cls(
+            ratings={
+                str(book["_id"]): book.get("rating")
+                for book in document.get("userBooks") or [] if book.get("_id") is not None
+            },
+            collections={
+                str(col["_id"]): set(col.get("books") or [])
+                for col in document.get("collections") or [] if col.get("_id") is not None
+            },
+            favourites={str(favourite) for favourite in document.get("favourites") or []},
+        )
+
+    def copy(self) -> "LibraryState":
+        return LibraryState(
+            dict(self.ratings),
+            {collection_id: set(books) for collection_id, books in self.collections.items()},
+            set(self.favourites),
+        )
+
+    def apply(self, operation: BatchOperation) -> str | None:
+        """
+        Apply one operation.
+
+        :return: An error message if the operation is invalid, otherwise None.
+        """
+        if operation.op == "add_to_collection":
+            books = self.collections.get(str(operation.collection_id))
+            if books is None:
+                return f"Collection with ID {operation.collection_id} not found."
+            if operation.book_id in books:
+                return f"Book with ID {operation.book_id} is already in the collection."
+            books.add(operation.book_id)
+        elif operation.op == "remove_from_collection":
+            books = self.collections.get(str(operation.collection_id))
+            if books is None:
+                return f"Collection with ID {operation.collection_id} not found."
+            if operation.book_id not in books:
+                return f"Book with ID {operation.book_id} is not in the collection."
+            books.remove(operation.book_id)
+        elif operation.op == "move_to_collection":
+            source = self.collections.get(str(operation.from_collection_id))
+            target = self.collections.get(str(operation.to_collection_id))
+            if source is None:
+                return f"Collection with ID {operation.from_collection_id} not found."
+            if target is None:
+                return f"Collection with ID {operation.to_collection_id} not found."
+            if operation.book_id not in source:
+                return f"Book with ID {operation.book_id} is not in the collection."
+            if operation.book_id in target:
+                return f"Book with ID {operation.book_id} is already in the collection."
+            source.remove(operation.book_id)
+            target.add(operation.book_id)
+        elif operation.op == "delete_book":
+            if str(operation.book_id) not in self.ratings:
+                return f"No book with id {operation.book_id} belongs to user."
+            del self.ratings[str(operation.book_id)]
+        elif operation.op == "rate_book":
+            if str(operation.book_id) not in self.ratings:
+                return f"No book with id {operation.book_id} belongs to user."
+            self.ratings[str(operation.book_id)] = operation.rating
+        elif operation.op == "add_favourite":
+            if operation.book_id not in self.ratings:
+                return f"Book with id {operation.book_id} not found in user's book list"
+            if operation.book_id in self.favourites:
+                return f"Book with id {operation.book_id} is already in favourites"
+            self.favourites.add(operation.book_id)
+        elif operation.op == "remove_favourite":
+            if operation.book_id not in self.favourites:
+                return f"Book with id {operation.book_id} is not in favourites"
+            self.favourites.remove(operation.book_id)
+        return None
+
+
+def _stored_forms(values) -> list:
+    # favourites were written both as strings and as ObjectIds, so removals match either form
+    forms = []
+    for value in sorted(values):
+        forms.append(value)
+        if ObjectId.is_valid(value):
+            forms.append(ObjectId(value))
+    return forms
+
+
+# projection of the fields batch operations read and write
+PROJECTION = {"userBooks._id": 1, "userBooks.rating": 1, "collections._id": 1, "collections.books": 1, "favourites": 1}
+
+
+def _unchanged(document: dict) -> dict:
+    # matches only while the projected fields still hold what was read into ``document``
+    def values(array: str, field: str) -> list:
+        return [item[field] for item in document.get(array) or [] if field in item]
+
+    def stored(path: str) -> dict:
+        return {"$ifNull": [f"${path}", []]}
+
+    return {"$expr": {"$and": [
+        {"$eq": [stored("userBooks._id"), values("userBooks", "_id")]},
+        {"$eq": [stored("userBooks.rating"), values("userBooks", "rating")]},
+        {"$eq": [stored("collections._id"), values("collections", "_id")]},
+        {"$eq": [stored("collections.books"), values("collections", "books")]},
+        {"$eq": [stored("favourites"), document.get("favourites") or []]},
+    ]}}
+
+
+def _without_removals(document: dict, before: LibraryState, after: LibraryState) -> dict:
+    # the projected document as the removal statement leaves it
+    deleted = before.ratings.keys() - after.ratings.keys()
+    removed_favourites = before.favourites - after.favourites
+    collections = []
+    for collection in document.get("collections") or []:
+        collection_id = collection.get("_id")
+        if collection_id is not None and "books" in collection and str(collection_id) in after.collections:
+            removed = before.collections[str(collection_id)] - after.collections[str(collection_id)]
+            collection = {**collection, "books": [book for book in collection["books"] if book not in removed]}
+        collections.append(collection)
+    result = {
+        "userBooks": [book for book in document.get("userBooks") or [] if str(book.get("_id")) not in deleted],
+        "collections": collections,
+    }
+    if document.get("favourites") is not None:
+        result["favourites"] = [favourite for favourite in document["favourites"] if str(favourite) not in removed_favourites]
+    return result
+
+
+def compile_updates(user_id: PydanticObjectId, before: LibraryState, after: LibraryState,
+                    document: Optional[dict] = None) -> List[UpdateOne]:
+    """
+    Compile the net difference between two library states into at most two update statements.
+
+    Removals go into the first statement and additions and ratings into the second, because MongoDB
+    rejects an update touching the same path with two operators.
+
+    :param document: The projected document ``before`` was read from. When given, every statement only
+        matches while the library is still in the state the statement was computed against.
+    """
+    pull, pull_filters = {}, []
+    add_to_set, add_filters = {}, []
+    set_fields, set_filters = {}, []
+
+    deleted = before.ratings.keys() - after.ratings.keys()
+    if deleted:
+        pull["userBooks"] = {"_id": {"$in": [ObjectId(book_id) for book_id in sorted(deleted)]}}
+
+    for position, (book_id, rating) in enumerate(sorted(after.ratings.items())):
+        if before.ratings.get(book_id) != rating:
+            set_fields[f"userBooks.$[b{position}].rating"] = rating
+            set_filters.append({f"b{position}._id": ObjectId(book_id)})
+
+    for position, (collection_id, books) in enumerate(sorted(after.collections.items())):
+        previous = before.collections[collection_id]
+        removed, added = previous - books, books - previous
+        if removed:
+            pull[f"collections.$[c{position}].books"] = {"$in": sorted(removed)}
+            pull_filters.append({f"c{position}._id": ObjectId(collection_id)})
+        if added:
+            add_to_set[f"collections.$[c{position}].books"] = {"$each": sorted(added)}
+            add_filters.append({f"c{position}._id": ObjectId(collection_id)})
+
+    removed_favourites = before.favourites - after.favourites
+    added_favourites = after.favourites - before.favourites
+    if removed_favourites:
+        pull["favourites"] = {"$in": _stored_forms(removed_favourites)}
+    if added_favourites:
+        add_to_set["favourites"] = {"$each": sorted(added_favourites)}
+
+    statements = []
+    current = document
+    if pull:
+        match = {"_id": user_id, **_unchanged(current)} if current is not None else {"_id": user_id}
+        statements.append(UpdateOne(match, {"$pull": pull}, array_filters=pull_filters or None))
+        if current is not None:
+            current = _without_removals(current, before, after)
+    additions = {}
+    if add_to_set:
+        additions["$addToSet"] = add_to_set
+    if set_fields:
+        additions["$set"] = set_fields
+    if additions:
+        match = {"_id": user_id, **_unchanged(current)} if current is not None else {"_id": user_id}
+        statements.append(UpdateOne(match, additions, array_filters=(add_filters + set_filters) or None))
+    return statements
+
+
+@timed_methods
+@guarded_methods
+class BatchRepository(IBatchRepository):
+    """
+    Implementation of the IBatchRepository interface: one projected read, validation in memory and one
+    ``bulk_write`` of the net changes.
+    """
+
+    async def execute(self, user_id: PydanticObjectId, operations: List[BatchOperation], transactional: bool) -> RepositoryError | BatchResult:
+        collection = User.get_motor_collection()
+        document = await collection.find_one({"_id": user_id}, PROJECTION)
+        if not document:
+            return RepositoryError(message=f"User with id {user_id} not found")
+
+        before = LibraryState.from_document(document)
+        after = before.copy()
+        results = []
+        for index, operation in enumerate(operations):
+            error = after.apply(operation)
+            results.append(OperationResult(index=index, op=operation.op, ok=error is None, message=error))
+        if not all(result.ok for result in results):
+            return BatchResult(applied=False, results=results)
+
+        statements = compile_updates(user_id, before, after, document)
+        if statements:
+            if transactional:
+                async with await collection.database.client.start_session() as session:
+                    try:
+                        async with session.start_transaction():
+                            written = await collection.bulk_write(statements, ordered=True, session=session)
+                            if written.matched_count < len(statements):
+                                raise _Conflict()
+                    except _Conflict:
+                        return ConflictError(message="The library changed while the batch was applied; nothing was written")
+            else:
+                written = await collection.bulk_write(statements, ordered=True)
+                if written.matched_count == 0:
+                    return ConflictError(message="The library changed while the batch was applied; nothing was written")
+                if written.matched_count < len(statements):
+                    # the removals were written, the additions and ratings were not
+                    return PartialWriteError(message="The library changed while the batch was applied; part of it was written")
+        return BatchResult(applied=True, statements=len(statements), results=results)
+
+
+class _Conflict(Exception):
+    """
+    Aborts the transaction of a batch whose preconditions no longer hold.
+    """
@@ -2,11 +2,15 @@ from abc import ABC, abstractmethod
 from typing import List
 
 from beanie import PydanticObjectId
+from pydantic import BaseModel
 
 from app.server.models.book import Book
+from app.server.models.fieldsets import FieldSet, lean_model, mongo_projection
 from app.server.models.quote import Quote
 from app.server.models.user import User
-from app.server.repositories.repository_error import RepositoryError
+from app.server.repositories.repository_error import EmptyLibraryError, NotFoundError, RepositoryError, Result
+from app.server.profiling.spans import timed_methods
+from app.server.resilience.guard import guarded_methods
 
 class IBookRepository(ABC):
     """
@@ -35,23 +39,34 @@ class IBookRepository(ABC):
         pass
 
     @abstractmethod
-    async def get_all_books(self, user_id: PydanticObjectId) -> RepositoryError | List[Book]:
+    async def get_all_books(self, user_id: PydanticObjectId) -> Result[List[Book]]:
         """
         Retrieve all books in a user's collection.
 
         :param user_id: The ID of the user.
-        :return: A list of book models or a RepositoryError if an error occurs.
+        :return: A Result holding the list of book models, or the RepositoryError if an error occurs.
         """
         pass
 
     @abstractmethod
-    async def get_book_by_id(self, user_id, book_id: PydanticObjectId) -> RepositoryError | Book:
+    async def get_all_books_fields(self, user_id: PydanticObjectId, fields: FieldSet) -> RepositoryError | List[BaseModel]:
+        """
+        Retrieve only the selected fields of all books in a user's collection.
+
+        :param user_id: The ID of the user.
+        :param fields: The field paths to load, see ``parse_fieldset``.
+        :return: A list of lean book models or a RepositoryError if an error occurs.
+        """
+        pass
+
+    @abstractmethod
+    async def get_book_by_id(self, user_id, book_id: PydanticObjectId) -> Result[Book]:
         """
         Retrieve a specific book by its ID.
 
         :param user_id: The ID of the user.
         :param book_id: The ID of the book.
-        :return: The book or a RepositoryError if an error occurs.
+        :return: A Result holding the book, or the RepositoryError if an error occurs.
         """
         pass
 
@@ -101,15 +116,21 @@ class IBookRepository(ABC):
         """
         pass
 
+@timed_methods
+@guarded_methods
 class BookRepository(IBookRepository, ABC):
     async def add_book_to_user(self, user_id: PydanticObjectId, book: Book) -> RepositoryError | None:
         user_data = await User.get(user_id)
         if not user_data:
-            error = RepositoryError(message=f"No user with id {user_id}.")
+            error = NotFoundError(message=f"No user with id {user_id}.")
             return error
         if any(existing_book.isnb == book.isnb for existing_book in user_data.userBooks):
             error = RepositoryError(message=f"Book with ISNB {book.isnb} is already added to the user.")
             return error
+        # a request body may carry its own id
+        if book.id is not None and any(existing_book.id == book.id for existing_book in user_data.userBooks):
+            error = RepositoryError(message=f"Book with id {book.id} already exists for user {user_id}.")
+            return error
         user_data.userBooks.append(book)
         await user_data.save()
         return None
@@ -117,65 +138,102 @@ class BookRepository(IBookRepository, ABC):
     async def delete_book_from_user(self, user_id: PydanticObjectId, book_id: PydanticObjectId) -> RepositoryError | None:
         user_data = await User.get(user_id)
         if not user_data:
-            error = RepositoryError(message=f"No user with id {user_id}.")
+            error = NotFoundError(message=f"No user with id {user_id}.")
             return error
         book_to_remove = next((book for book in user_data.userBooks if book.id == book_id), None)
         if not book_to_remove:
-            error = RepositoryError(message=f"No book with id {book_id} belongs to user.")
+            error = NotFoundError(message=f"No book with id {book_id} belongs to user.")
             return error
         user_data.userBooks.remove(book_to_remove)
         await user_data.save()
         return None
 
-    async def get_all_books(self, user_id: PydanticObjectId) -> (RepositoryError, List[Book]):
+    async def get_all_books(self, user_id: PydanticObjectId) -> Result[List[Book]]:
         user_data = await User.get(user_id)
         if not user_data:
-            error = RepositoryError(message=f"User with id {user_id} not found")
-            return error, None
+            return Result(error=NotFoundError(message=f"User with id {user_id} not found"))
         if not user_data.userBooks:
-            error = RepositoryError(message=f"User with id {user_id} does not have any books.")
-            return error, None
-        return None, user_data.userBooks
+            return Result(error=EmptyLibraryError(message=f"User with id {user_id} does not have any books."))
+        return Result(user_data.userBooks)
 
-    async def get_book_by_id(self, user_id, book_id: PydanticObjectId) -> (RepositoryError, Book):
+    async def get_all_books_fields(self, user_id: PydanticObjectId, fields: FieldSet) -> RepositoryError | List[BaseModel]:
+        projection = mongo_projection(Book, fields, prefix="userBooks.")
+        user_data = await User.get_motor_collection().find_one({"_id": user_id}, projection)
+        if not user_data:
+            return NotFoundError(message=f"User with id {user_id} not found")
+        if not user_data.get("userBooks"):
+            return EmptyLibraryError(message=f"User with id {user_id} does not have any books.")
+        model = lean_model(Book, fields)
+        return [model.model_validate(book) for book in user_data["userBooks"]]
+
+    async def get_book_by_id(self, user_id, book_id: PydanticObjectId) -> Result[Book]:
         user_data = await User.get(user_id)
         if not user_data:
-            error = RepositoryError(message=f"User with id {user_id} not found")
-            return error, None
+            return Result(error=NotFoundError(message=f"User with id {user_id} not found"))
         if not user_data.userBooks:
-            error = RepositoryError(message=f"User with id {user_id} does not have any books.")
-            return error, None
+            return Result(error=EmptyLibraryError(message=f"User with id {user_id} does not have any books."))
         book = next((book for book in user_data.userBooks if book.id == book_id), None)
         if not book:
-            error = RepositoryError(message=f"Book with id {book_id} not found for user {user_id}.")
-            return error, None
-        return None, book
+            return Result(error=NotFoundError(message=f"Book with id {book_id} not found for user {user_id}."))
+        return Result(book)
 
     async def update_book(self, user_id, book_id: PydanticObjectId, new_book_data: Book) -> RepositoryError | None:
         user_data = await User.get(user_id)
         if not user_data:
-            error = RepositoryError(message=f"User with id {user_id} not found")
+            error = NotFoundError(message=f"User with id {user_id} not found")
             return error
         if not user_data.userBooks:
-            error = RepositoryError(message=f"User with id {user_id} does not have any books.")
+            error = EmptyLibraryError(message=f"User with id {user_id} does not have any books.")
             return error
-        for index, book in enumerate(user_data.userBooks):
-            if book.id == book_id:
-                user_data.userBooks[index] = new_book_data
-                await user_data.save()
-                return None
-        error = RepositoryError(message=f"Book with id {book_id} not found for user {user_id}.")
-        return error
+        ids = [book.id for book in user_data.userBooks]
+        if book_id not in ids:
+            error = NotFoundError(message=f"Book with id {book_id} not found for user {user_id}.")
+            return error
+        if new_book_data.id != book_id and new_book_data.id in ids:
+            error = RepositoryError(message=f"Book with id {new_book_data.id} already exists for user {user_id}.")
+            return error
+        user_data.userBooks[ids.index(book_id)] = new_book_data
+        await user_data.save()
+        return None
+
+    async def add_quote_to_book(self, user_id, book_id: PydanticObjectId, quote: Quote) -> RepositoryError | None:
+        user_data = await User.get(user_id)
+        if not user_data:
+            error = NotFoundError(message=f"User with id {user_id} not found")
+            return error
+        if not any(book.id == book_id for book in user_data.userBooks):
+            error = NotFoundError(message=f"Book with id {book_id} not found for user {user_id}.")
+            return error
+        quote.book_id = str(book_id)
+        user_data.quotes.append(quote)
+        await user_data.save()
+        return None
+
+    async def add_to_collection(self, user_id, book_id, collection_id: PydanticObjectId) -> RepositoryError | None:
+        user_data = await User.get(user_id)
+        if not user_data:
+            error = NotFoundError(message=f"User with id {user_id} not found")
+            return error
+        collection = next((col for col in user_data.collections if col.id == collection_id), None)
+        if not collection:
+            error = NotFoundError(message=f"Collection with id {collection_id} not found.")
+            return error
+        if str(book_id) in collection.books:
+            error = RepositoryError(message=f"Book with id {book_id} is already in the collection.")
+            return error
+        collection.books.append(str(book_id))
+        await user_data.save()
+        return None
 
     async def update_description(self, user_id: PydanticObjectId, book_id: PydanticObjectId, new_description: str) -> RepositoryError | None:
         user_data = await User.get(user_id)
         if not user_data:
-            error = RepositoryError(message=f"User with id {user_id} not found")
+            error = NotFoundError(message=f"User with id {user_id} not found")
             return error
         for book in user_data.userBooks:
             if book.id == book_id:
                 book.description.description = new_description
                 await user_data.save()
                 return None
-        error = RepositoryError(message=f"Book with id {book_id} not found for user {user_id}.")
+        error = NotFoundError(message=f"Book with id {book_id} not found for user {user_id}.")
         return error
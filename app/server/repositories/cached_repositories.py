@@ -0,0 +1,240 @@
+from typing import List
+
+from beanie import PydanticObjectId
+from pydantic import BaseModel
+
+from app.server.cache.cache_backend import ICacheBackend
+from app.server.models.batch import BatchOperation, BatchResult
+from app.server.models.book import Book
+from app.server.models.collection import Collection
+from app.server.models.fieldsets import FieldSet
+from app.server.models.quote import Quote
+from app.server.models.user import User
+from app.server.repositories.batch_repository import IBatchRepository, library_written
+from app.server.repositories.book_repository import IBookRepository
+from app.server.repositories.collection_repository import ICollectionRepository
+from app.server.repositories.quote_repository import IQuoteRepository
+from app.server.repositories.repository_error import RepositoryError, Result
+from app.server.repositories.user_repository import IUserRepository
+
+# cache keys, scoped to a user by the backend
+BOOKS_KEY = "books"
+BOOK_KEY = "book:{}"
+QUOTES_PREFIX = "quotes:"
+QUOTES_KEY = QUOTES_PREFIX + "{}"
+COLLECTIONS_KEY = "collections"
+COLLECTION_KEY = "collection:{}"
+
+
+class CachedBookRepository(IBookRepository):
+    """
+    Read-through cache in front of another IBookRepository.
+
+    Reads are served from the cache when possible, each write invalidates the entries it affects. What a
+    read returns may be shared with other readers and must not be modified.
+    """
+
+    def __init__(self, repository: IBookRepository, cache: ICacheBackend):
+        self.repository = repository
+        self.cache = cache
+
+    async def add_book_to_user(self, user_id: PydanticObjectId, book: Book) -> RepositoryError | None:
+        error = await self.repository.add_book_to_user(user_id, book)
+        await self.cache.delete(str(user_id), BOOKS_KEY)
+        return error
+
+    async def delete_book_from_user(self, user_id, book_id: PydanticObjectId) -> RepositoryError | None:
+        error = await self.repository.delete_book_from_user(user_id, book_id)
+        await self.cache.delete(str(user_id), BOOKS_KEY, BOOK_KEY.format(book_id))
+        return error
+
+    async def get_all_books(self, user_id: PydanticObjectId) -> Result[List[Book]]:
+        books = await self.cache.get(str(user_id), BOOKS_KEY, List[Book])
+        if books is not None:
+            return Result(books)
+        generation = await self.cache.generation(str(user_id))
+        result = await self.repository.get_all_books(user_id)
+        if not result.error:
+            await self.cache.set(str(user_id), BOOKS_KEY, result.value, generation)
+        return result
+
+    async def get_all_books_fields(self, user_id: PydanticObjectId, fields: FieldSet) -> RepositoryError | List[BaseModel]:
+        return await self.repository.get_all_books_fields(user_id, fields)
+
+    async def get_book_by_id(self, user_id, book_id: PydanticObjectId) -> Result[Book]:
+        book = await self.cache.get(str(user_id), BOOK_KEY.format(book_id), Book)
+        if book is not None:
+            return Result(book)
+        generation = await self.cache.generation(str(user_id))
+        result = await self.repository.get_book_by_id(user_id, book_id)
+        if not result.error:
+            await self.cache.set(str(user_id), BOOK_KEY.format(book_id), result.value, generation)
+        return result
+
+    async def update_book(self, user_id, book_id: PydanticObjectId, new_book_data: Book) -> RepositoryError | None:
+        error = await self.repository.update_book(user_id, book_id, new_book_data)
+        keys = [BOOKS_KEY, BOOK_KEY.format(book_id)]
+        if new_book_data.id is not None:
+            keys.append(BOOK_KEY.format(new_book_data.id))
+        await self.cache.delete(str(user_id), *keys)
+        return error
+
+    async def add_quote_to_book(self, user_id, book_id: PydanticObjectId, quote: Quote) -> RepositoryError | None:
+        error = await self.repository.add_quote_to_book(user_id, book_id, quote)
+        await self.cache.delete(str(user_id), QUOTES_KEY.format(book_id))
+        return error
+
+    async def add_to_collection(self, user_id, book_id, collection_id: PydanticObjectId) -> RepositoryError | None:
+        error = await self.repository.add_to_collection(user_id, book_id, collection_id)
+        await self.cache.delete(str(user_id), COLLECTIONS_KEY, COLLECTION_KEY.format(collection_id))
+        return error
+
+    async def update_description(self, user_id: PydanticObjectId, book_id: PydanticObjectId, new_description: str) -> RepositoryError | None:
+        error = await self.repository.update_description(user_id, book_id, new_description)
+        await self.cache.delete(str(user_id), BOOKS_KEY, BOOK_KEY.format(book_id))
+        return error
+
+
+class CachedQuoteRepository(IQuoteRepository):
+    """
+    Read-through cache in front of another IQuoteRepository.
+    """
+
+    def __init__(self, repository: IQuoteRepository, cache: ICacheBackend):
+        self.repository = repository
+        self.cache = cache
+
+    async def add_quote_to_book(self, user_id: PydanticObjectId, book_id: PydanticObjectId, text: str) -> RepositoryError | None:
+        error = await self.repository.add_quote_to_book(user_id, book_id, text)
+        await self.cache.delete(str(user_id), QUOTES_KEY.format(book_id))
+        return error
+
+    async def update_quote(self, user_id: PydanticObjectId, quote_id: PydanticObjectId, new_text: str) -> RepositoryError | None:
+        error = await self.repository.update_quote(user_id, quote_id, new_text)
+        # the book of the quote is unknown here, so every cached quote list of the user is dropped
+        await self.cache.delete_prefix(str(user_id), QUOTES_PREFIX)
+        return error
+
+    async def remove_quote_from_book(self, user_id: PydanticObjectId, quote_id: PydanticObjectId) -> RepositoryError | None:
+        error = await self.repository.remove_quote_from_book(user_id, quote_id)
+        await self.cache.delete_prefix(str(user_id), QUOTES_PREFIX)
+        return error
+
+    async def get_quotes_for_book(self, user_id: PydanticObjectId, book_id: PydanticObjectId) -> List[Quote] | RepositoryError:
+        quotes = await self.cache.get(str(user_id), QUOTES_KEY.format(book_id), List[Quote])
+        if quotes is not None:
+            return quotes
+        generation = await self.cache.generation(str(user_id))
+        result = await self.repository.get_quotes_for_book(user_id, book_id)
+        if not isinstance(result, RepositoryError):
+            await self.cache.set(str(user_id), QUOTES_KEY.format(book_id), result, generation)
+        return result
+
+    async def get_quotes_for_book_fields(self, user_id: PydanticObjectId, book_id: PydanticObjectId, fields: FieldSet) -> List[BaseModel] | RepositoryError:
+        return await self.repository.get_quotes_for_book_fields(user_id, book_id, fields)
+
+
+class CachedCollectionRepository(ICollectionRepository):
+    """
+    Read-through cache in front of another ICollectionRepository.
+    """
+
+    def __init__(self, repository: ICollectionRepository, cache: ICacheBackend):
+        self.repository = repository
+        self.cache = cache
+
+    async def create_collection(self, user_id: PydanticObjectId, collection_name: str) -> RepositoryError | None:
+        error = await self.repository.create_collection(user_id, collection_name)
+        await self.cache.delete(str(user_id), COLLECTIONS_KEY)
+        return error
+
+    async def delete_collection(self, user_id: PydanticObjectId, collection_id: PydanticObjectId) -> RepositoryError | None:
+        error = await self.repository.delete_collection(user_id, collection_id)
+        await self.cache.delete(str(user_id), COLLECTIONS_KEY, COLLECTION_KEY.format(collection_id))
+        return error
+
+    async def add_book_to_collection(self, user_id: PydanticObjectId, collection_id: PydanticObjectId, book_id: str) -> RepositoryError | None:
+        error = await self.repository.add_book_to_collection(user_id, collection_id, book_id)
+        await self.cache.delete(str(user_id), COLLECTIONS_KEY, COLLECTION_KEY.format(collection_id))
+        return error
+
+    async def remove_book_from_collection(self, user_id: PydanticObjectId, collection_id: PydanticObjectId, book_id: str) -> RepositoryError | None:
+        error = await self.repository.remove_book_from_collection(user_id, collection_id, book_id)
+        await self.cache.delete(str(user_id), COLLECTIONS_KEY, COLLECTION_KEY.format(collection_id))
+        return error
+
+    async def update_collection(self, user_id: PydanticObjectId, collection_id: PydanticObjectId, new_name: str) -> RepositoryError | None:
+        error = await self.repository.update_collection(user_id, collection_id, new_name)
+        await self.cache.delete(str(user_id), COLLECTIONS_KEY, COLLECTION_KEY.format(collection_id))
+        return error
+
+    async def get_collections(self, user_id: PydanticObjectId) -> RepositoryError | List[Collection]:
+        collections = await self.cache.get(str(user_id), COLLECTIONS_KEY, List[Collection])
+        if collections is not None:
+            return collections
+        generation = await self.cache.generation(str(user_id))
+        result = await self.repository.get_collections(user_id)
+        if not isinstance(result, RepositoryError):
+            await self.cache.set(str(user_id), COLLECTIONS_KEY, result, generation)
+        return result
+
+    async def get_collection_by_id(self, user_id: PydanticObjectId, collection_id: PydanticObjectId) -> RepositoryError | Collection:
+        collection = await self.cache.get(str(user_id), COLLECTION_KEY.format(collection_id), Collection)
+        if collection is not None:
+            return collection
+        generation = await self.cache.generation(str(user_id))
+        result = await self.repository.get_collection_by_id(user_id, collection_id)
+        if not isinstance(result, RepositoryError):
+            await self.cache.set(str(user_id), COLLECTION_KEY.format(collection_id), result, generation)
+        return result
+
+
+class CachedUserRepository(IUserRepository):
+    """
+    Pass-through IUserRepository that drops a user's cached entries when the user is updated or deleted.
+    """
+
+    def __init__(self, repository: IUserRepository, cache: ICacheBackend):
+        self.repository = repository
+        self.cache = cache
+
+    async def add_user(self, user: User) -> RepositoryError | None:
+        return await self.repository.add_user(user)
+
+    async def delete_user(self, user_id: PydanticObjectId) -> RepositoryError | None:
+        error = await self.repository.delete_user(user_id)
+        await self.cache.invalidate_user(str(user_id))
+        return error
+
+    async def update_user(self, user_id: PydanticObjectId, updated_data: dict) -> RepositoryError | None:
+        error = await self.repository.update_user(user_id, updated_data)
+        await self.cache.invalidate_user(str(user_id))
+        return error
+
+    async def get_user_by_id(self, user_id: PydanticObjectId) -> RepositoryError | User:
+        return await self.repository.get_user_by_id(user_id)
+
+    async def get_user_by_email(self, email: str) -> RepositoryError | User:
+        return await self.repository.get_user_by_email(email)
+
+    async def get_user_by_username(self, username: str) -> User | None:
+        return await self.repository.get_user_by_username(username)
+
+    async def get_user_fields_by_username(self, username: str, fields: FieldSet) -> RepositoryError | BaseModel:
+        return await self.repository.get_user_fields_by_username(username, fields)
+
+
+class CachedBatchRepository(IBatchRepository):
+    """
+    Pass-through IBatchRepository that drops the user's cached entries after a batch wrote to the library.
+    """
+
+    def __init__(self, repository: IBatchRepository, cache: ICacheBackend):
+        self.repository = repository
+        self.cache = cache
+
+    async def execute(self, user_id: PydanticObjectId, operations: List[BatchOperation], transactional: bool) -> RepositoryError | BatchResult:
+        result = await self.repository.execute(user_id, operations, transactional)
+        if library_written(result):
+            await self.cache.invalidate_user(str(user_id))
+        return result
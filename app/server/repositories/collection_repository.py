@@ -5,7 +5,9 @@ from beanie import PydanticObjectId
 
 from app.server.models.collection import Collection
 from app.server.models.user import User
-from app.server.repositories.repository_error import RepositoryError
+from app.server.repositories.repository_error import NotFoundError, RepositoryError
+from app.server.profiling.spans import timed_methods
+from app.server.resilience.guard import guarded_methods
 
 
 class ICollectionRepository(ABC):
@@ -71,7 +73,30 @@ class ICollectionRepository(ABC):
         """
         pass
 
+    @abstractmethod
+    async def get_collections(self, user_id: PydanticObjectId) -> RepositoryError | List[Collection]:
+        """
+        Retrieve all collections of a user.
+
+        :param user_id: The ID of the user.
+        :return: A list of collections or a RepositoryError if an error occurs.
+        """
+        pass
 
+    @abstractmethod
+    async def get_collection_by_id(self, user_id: PydanticObjectId, collection_id: PydanticObjectId) -> RepositoryError | Collection:
+        """
+        Retrieve a specific collection.
+
+        :param user_id: The ID of the user.
+        :param collection_id: The ID of the collection.
+        :return: The collection or a RepositoryError if an error occurs.
+        """
+        pass
+
+
+@timed_methods
+@guarded_methods
 class CollectionRepository(ICollectionRepository):
     """
     Implementation of the ICollectionRepository interface for managing collections.
@@ -80,7 +105,7 @@ class CollectionRepository(ICollectionRepository):
     async def create_collection(self, user_id: PydanticObjectId, collection_name: str) -> RepositoryError | None:
         user_data = await User.get(user_id)
         if not user_data:
-            return RepositoryError(message=f"User with ID {user_id} not found.")
+            return NotFoundError(message=f"User with ID {user_id} not found.")
         new_collection = Collection(collection_name=collection_name, books=[])
         user_data.collections.append(new_collection)
         await user_data.save()
@@ -89,10 +114,10 @@ class CollectionRepository(ICollectionRepository):
     async def delete_collection(self, user_id: PydanticObjectId, collection_id: PydanticObjectId) -> RepositoryError | None:
         user_data = await User.get(user_id)
         if not user_data:
-            return RepositoryError(message=f"User with ID {user_id} not found.")
+            return NotFoundError(message=f"User with ID {user_id} not found.")
         collection_to_remove = next((col for col in user_data.collections if col.id == collection_id), None)
         if not collection_to_remove:
-            return RepositoryError(message=f"Collection with ID {collection_id} not found.")
+            return NotFoundError(message=f"Collection with ID {collection_id} not found.")
         user_data.collections.remove(collection_to_remove)
         await user_data.save()
         return None
@@ -100,10 +125,10 @@ class CollectionRepository(ICollectionRepository):
     async def add_book_to_collection(self, user_id: PydanticObjectId, collection_id: PydanticObjectId, book_id: str) -> RepositoryError | None:
         user_data = await User.get(user_id)
         if not user_data:
-            return RepositoryError(message=f"User with ID {user_id} not found.")
+            return NotFoundError(message=f"User with ID {user_id} not found.")
         collection = next((col for col in user_data.collections if col.id == collection_id), None)
         if not collection:
-            return RepositoryError(message=f"Collection with ID {collection_id} not found.")
+            return NotFoundError(message=f"Collection with ID {collection_id} not found.")
         if book_id in collection.books:
             return RepositoryError(message=f"Book with ID {book_id} is already in the collection.")
         collection.books.append(book_id)
@@ -113,10 +138,10 @@ class CollectionRepository(ICollectionRepository):
     async def remove_book_from_collection(self, user_id: PydanticObjectId, collection_id: PydanticObjectId, book_id: str) -> RepositoryError | None:
         user_data = await User.get(user_id)
         if not user_data:
-            return RepositoryError(message=f"User with ID {user_id} not found.")
+            return NotFoundError(message=f"User with ID {user_id} not found.")
         collection = next((col for col in user_data.collections if col.id == collection_id), None)
         if not collection:
-            return RepositoryError(message=f"Collection with ID {collection_id} not found.")
+            return NotFoundError(message=f"Collection with ID {collection_id} not found.")
         if book_id not in collection.books:
             return RepositoryError(message=f"Book with ID {book_id} is not in the collection.")
         collection.books.remove(book_id)
@@ -126,10 +151,25 @@ class CollectionRepository(ICollectionRepository):
     async def update_collection(self, user_id: PydanticObjectId, collection_id: PydanticObjectId, new_name: str) -> RepositoryError | None:
         user_data = await User.get(user_id)
         if not user_data:
-            return RepositoryError(message=f"User with ID {user_id} not found.")
+            return NotFoundError(message=f"User with ID {user_id} not found.")
         collection = next((col for col in user_data.collections if col.id == collection_id), None)
         if not collection:
-            return RepositoryError(message=f"Collection with ID {collection_id} not found.")
+            return NotFoundError(message=f"Collection with ID {collection_id} not found.")
         collection.collection_name = new_name
         await user_data.save()
         return None
+
+    async def get_collections(self, user_id: PydanticObjectId) -> RepositoryError | List[Collection]:
+        user_data = await User.get(user_id)
+        if not user_data:
+            return NotFoundError(message=f"User with ID {user_id} not found.")
+        return user_data.collections
+
+    async def get_collection_by_id(self, user_id: PydanticObjectId, collection_id: PydanticObjectId) -> RepositoryError | Collection:
+        user_data = await User.get(user_id)
+        if not user_data:
+            return NotFoundError(message=f"User with ID {user_id} not found.")
+        collection = next((col for col in user_data.collections if col.id == collection_id), None)
+        if not collection:
+            return NotFoundError(message=f"Collection with ID {collection_id} not found.")
+        return collection
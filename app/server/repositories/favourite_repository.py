@@ -4,7 +4,9 @@ from typing import Optional
 from beanie import PydanticObjectId
 
 from app.server.models.user import User
-from app.server.repositories.repository_error import RepositoryError
+from app.server.repositories.repository_error import NotFoundError, RepositoryError
+from app.server.profiling.spans import timed_methods
+from app.server.resilience.guard import guarded_methods
 
 
 class IFavouriteRepository(ABC):
@@ -57,14 +59,16 @@ async def _validate_user_and_book(
     """
     user_data = await User.get(user_id)
     if not user_data:
-        return RepositoryError(message=f"User with id {user_id} not found")
+        return NotFoundError(message=f"User with id {user_id} not found")
 
     if not any(book.id == book_id for book in user_data.userBooks):
-        return RepositoryError(message=f"Book with id {book_id} not found in user's book list")
+        return NotFoundError(message=f"Book with id {book_id} not found in user's book list")
 
     return None
 
 
+@timed_methods
+@guarded_methods
 class FavouriteRepository(IFavouriteRepository, ABC):
     async def add_to_favourites(self, user_id, book_id: PydanticObjectId) -> RepositoryError | None:
         error = await _validate_user_and_book(user_id, book_id)
@@ -72,10 +76,10 @@ class FavouriteRepository(IFavouriteRepository, ABC):
             return error
 
         user_data = await User.get(user_id)
-        if book_id in user_data.favourites:
+        if str(book_id) in user_data.favourites:
             return RepositoryError(message=f"Book with id {book_id} is already in favourites")
 
-        user_data.favourites.append(book_id)
+        user_data.favourites.append(str(book_id))
         await user_data.save()
         return None
 
@@ -85,9 +89,9 @@ class FavouriteRepository(IFavouriteRepository, ABC):
             return error
 
         user_data = await User.get(user_id)
-        if book_id not in user_data.favourites:
+        if str(book_id) not in user_data.favourites:
             return RepositoryError(message=f"Book with id {book_id} is not in favourites")
 
-        user_data.favourites.remove(book_id)
+        user_data.favourites.remove(str(book_id))
         await user_data.save()
         return None
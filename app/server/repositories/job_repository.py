@@ -0,0 +1,145 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import List, Optional
+
+from beanie import PydanticObjectId
+from pymongo import ReturnDocument
+
+from app.server.models.job import Job, JobStatus
+from app.server.repositories.repository_error import RepositoryError
+from app.server.profiling.spans import timed_methods
+from app.server.resilience.guard import guarded_methods
+
+
+class IJobRepository(ABC):
+    """
+    Interface for persisting background jobs.
+    """
+
+    @abstractmethod
+    async def create_job(self, job: Job) -> RepositoryError | Job:
+        """
+        Store a new job.
+
+        :param job: The job to store.
+        :return: The stored job with its ID, or a RepositoryError if an error occurs.
+        """
+        pass
+
+    @abstractmethod
+    async def get_job(self, job_id: PydanticObjectId) -> RepositoryError | Job:
+        """
+        Retrieve a job by its ID.
+
+        :param job_id: The ID of the job.
+        :return: The job or a RepositoryError if it does not exist.
+        """
+        pass
+
+    @abstractmethod
+    async def update_claimed_job(self, job_id: PydanticObjectId, attempt: int, changes: dict) -> RepositoryError | None:
+        """
+        Update fields of a running job, provided it is still running under the given claim.
+
+        A worker whose lease expired may find its job queued again, or claimed by another worker; its
+        updates must then no longer apply.
+
+        :param job_id: The ID of the job.
+        :param attempt: The job's number of attempts when it was claimed, which identifies the claim.
+        :param changes: The fields to set.
+        :return: RepositoryError if the job is no longer running under this claim, otherwise None.
+        """
+        pass
+
+    @abstractmethod
+    async def claim_job(self, job_id: PydanticObjectId, now: datetime, lease_until: datetime) -> Optional[Job]:
+        """
+        Atomically move a queued job that is due to running, so that only one worker runs it.
+
+        :param job_id: The ID of the job.
+        :param now: The current time.
+        :param lease_until: When the lease of the worker on the job expires unless it is renewed.
+        :return: The claimed job, or None if it is not queued, not due yet or was claimed by another worker.
+        """
+        pass
+
+    @abstractmethod
+    async def get_queued_jobs(self, now: datetime) -> List[Job]:
+        """
+        Retrieve the queued jobs that are due.
+
+        :param now: The current time.
+        :return: The queued jobs, highest priority first.
+        """
+        pass
+
+    @abstractmethod
+    async def requeue_expired_jobs(self, now: datetime) -> None:
+        """
+        Queue again the running jobs whose lease expired because their process stopped, or fail them once
+        they used up their attempts.
+
+        :param now: The current time.
+        """
+        pass
+
+
+@timed_methods
+@guarded_methods
+class JobRepository(IJobRepository):
+    """
+    Implementation of the IJobRepository interface backed by the jobs collection.
+    """
+
+    async def create_job(self, job: Job) -> RepositoryError | Job:
+        await job.insert()
+        return job
+
+    async def get_job(self, job_id: PydanticObjectId) -> RepositoryError | Job:
+        job = await Job.get(job_id)
+        if not job:
+            return RepositoryError(message=f"Job with id {job_id} not found")
+        return job
+
+    async def update_claimed_job(self, job_id: PydanticObjectId, attempt: int, changes: dict) -> RepositoryError | None:
+        result = await Job.get_motor_collection().update_one(
+            {"_id": job_id, "status": JobStatus.running.value, "attempts": attempt}, {"$set": changes}
+        )
+        if not result.matched_count:
+            return RepositoryError(message=f"Job with id {job_id} is no longer claimed by this worker")
+        return None
+
+    async def claim_job(self, job_id: PydanticObjectId, now: datetime, lease_until: datetime) -> Optional[Job]:
+        document = await Job.get_motor_collection().find_one_and_update(
+            {"_id": job_id, "status": JobStatus.queued.value, **_due(now)},
+            {
+                "$set": {"status": JobStatus.running.value, "started_at": now, "lease_expires_at": lease_until,
+                         "error": None},
+                "$inc": {"attempts": 1},
+            },
+            return_document=ReturnDocument.AFTER,
+        )
+        return Job.model_validate(document) if document else None
+
+    async def get_queued_jobs(self, now: datetime) -> List[Job]:
+        return await Job.find(
+            {"status": JobStatus.queued.value, **_due(now)}
+        ).sort([("priority", -1), ("created_at", 1)]).to_list()
+
+    async def requeue_expired_jobs(self, now: datetime) -> None:
+        collection = Job.get_motor_collection()
+        # running jobs stored before leases existed have none and count as expired
+        expired = {
+            "status": JobStatus.running.value,
+            "$or": [{"lease_expires_at": None}, {"lease_expires_at": {"$lt": now}}],
+        }
+        await collection.update_many(
+            {**expired, "$expr": {"$gte": ["$attempts", "$max_attempts"]}},
+            {"$set": {"status": JobStatus.failed.value, "error": "Job was abandoned by its worker",
+                      "finished_at": now, "lease_expires_at": None}},
+        )
+        await collection.update_many(expired, {"$set": {"status": JobStatus.queued.value, "lease_expires_at": None}})
+
+
+def _due(now: datetime) -> dict:
+    return {"$or": [{"run_after": None}, {"run_after": {"$lte": now}}]}
@@ -0,0 +1,98 @@
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import List
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.server.models.lease import Lease
+from app.server.profiling.spans import timed_methods
+from app.server.resilience.guard import guarded_methods
+
+
+class ILeaseRepository(ABC):
+    """
+    Interface for electing the one process that does a piece of background work.
+    """
+
+    @abstractmethod
+    async def acquire(self, name: str, holder: str, duration: timedelta) -> bool:
+        """
+        Take or renew a lease.
+
+        :param name: The name of the work the lease is for.
+        :param holder: Identifies the calling process.
+        :param duration: How long the lease lasts unless it is renewed.
+        :return: True if the caller holds the lease, False if another process does.
+        """
+        pass
+
+    @abstractmethod
+    async def release(self, name: str, holder: str) -> None:
+        """
+        Give up a lease so that another process can take it over without waiting for it to expire.
+
+        :param name: The name of the work the lease is for.
+        :param holder: Identifies the calling process.
+        """
+        pass
+
+    @abstractmethod
+    async def add_pending(self, name: str, items: List[str]) -> None:
+        """
+        Leave work for the holder of a lease, e.g. the users whose libraries changed in this process.
+
+        Nothing is stored while nobody holds the lease; whoever takes it next starts from scratch.
+
+        :param name: The name of the work the lease is for.
+        :param items: The work items, kept once each.
+        """
+        pass
+
+    @abstractmethod
+    async def take_pending(self, name: str, holder: str) -> List[str]:
+        """
+        Retrieve and clear the work left for the holder of a lease.
+
+        :param name: The name of the work the lease is for.
+        :param holder: Identifies the calling process.
+        :return: The work items, or an empty list if the caller does not hold the lease.
+        """
+        pass
+
+
+@timed_methods
+@guarded_methods
+class LeaseRepository(ILeaseRepository):
+    """
+    Implementation of the ILeaseRepository interface backed by the leases collection.
+    """
+
+    async def acquire(self, name: str, holder: str, duration: timedelta) -> bool:
+        now = datetime.utcnow()
+        try:
+            # the upsert of a lease held by someone else collides on _id instead of taking it over
+            await Lease.get_motor_collection().update_one(
+                {"_id": name, "$or": [{"holder": holder}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"holder": holder, "expires_at": now + duration}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def release(self, name: str, holder: str) -> None:
+        await Lease.get_motor_collection().delete_one({"_id": name, "holder": holder})
+
+    async def add_pending(self, name: str, items: List[str]) -> None:
+        # no upsert: a lease document without a holder could never be acquired
+        await Lease.get_motor_collection().update_one({"_id": name}, {"$addToSet": {"pending": {"$each": items}}})
+
+    async def take_pending(self, name: str, holder: str) -> List[str]:
+        document = await Lease.get_motor_collection().find_one_and_update(
+            {"_id": name, "holder": holder},
+            {"$set": {"pending": []}},
+            projection={"pending": True},
+            return_document=ReturnDocument.BEFORE,
+        )
+        return document.get("pending", []) if document else []
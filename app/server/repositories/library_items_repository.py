@@ -0,0 +1,65 @@
+from abc import ABC, abstractmethod
+from typing import List, Optional
+
+from beanie import PydanticObjectId
+
+from app.server.models.recommendation import LibraryItems
+from app.server.models.user import User
+from app.server.repositories.repository_error import RepositoryError
+from app.server.profiling.spans import timed_methods
+
+# only the fields needed to tell which books a user has, favourites and collects
+_PROJECTION = {"userBooks._id": 1, "userBooks.isnb": 1, "favourites": 1, "collections.books": 1}
+
+
+class ILibraryItemsRepository(ABC):
+    """
+    Interface for reading the books of users' libraries, favourites and collections in bulk.
+    """
+
+    @abstractmethod
+    async def get_library_items(self, user_ids: Optional[List[str]] = None) -> RepositoryError | List[LibraryItems]:
+        """
+        Retrieve the ISNBs each user has in the library, among the favourites and in any collection.
+
+        :param user_ids: The IDs of the users to read, or None to read every user.
+        :return: The items of every matching user or a RepositoryError if an error occurs.
+        """
+        pass
+
+
+def library_items(document: dict) -> LibraryItems:
+    """
+    Resolve the book ids referenced by favourites and collections to ISNBs through the user's books.
+    """
+    books = document.get("userBooks") or []
+    isnbs = {str(book["_id"]): book["isnb"] for book in books if book.get("_id") is not None and book.get("isnb")}
+    known = set(isnbs.values())
+
+    def resolve(book_ids) -> List[str]:
+        resolved = (isnbs.get(str(book_id), book_id) for book_id in book_ids or [])
+        return [isnb for isnb in resolved if isnb in known]
+
+    return LibraryItems(
+        user_id=str(document["_id"]),
+        books=[book["isnb"] for book in books if book.get("isnb")],
+        favourites=resolve(document.get("favourites")),
+        collected=resolve(book_id for collection in document.get("collections") or [] for book_id in collection.get("books") or []),
+    )
+
+
+@timed_methods
+class LibraryItemsRepository(ILibraryItemsRepository):
+    """
+    Reads the items with a projected scan of the users collection.
+    """
+
+    async def get_library_items(self, user_ids: Optional[List[str]] = None) -> RepositoryError | List[LibraryItems]:
+        query = {}
+        if user_ids is not None:
+            query = {"_id": {"$in": [PydanticObjectId(user_id) for user_id in user_ids]}}
+        try:
+            documents = User.get_motor_collection().find(query, _PROJECTION)
+            return [library_items(document) async for document in documents]
+        except Exception as e:
+            return RepositoryError(message=f"Failed to read library items: {e}")
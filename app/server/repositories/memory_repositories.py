@@ -0,0 +1,540 @@
+import logging
+import secrets
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+
+from beanie import PydanticObjectId
+from pydantic import BaseModel
+
+from app.server.models.book import Book
+from app.server.models.collection import Collection
+from app.server.models.fieldsets import FieldSet, lean_model
+from app.server.models.quote import Quote
+from app.server.models.refresh_token import IssuedRefreshToken, RefreshToken
+from app.server.models.user import User
+from app.server.profiling.spans import timed_methods
+from app.server.repositories.book_repository import IBookRepository
+from app.server.repositories.collection_repository import ICollectionRepository
+from app.server.repositories.favourite_repository import IFavouriteRepository
+from app.server.repositories.quote_repository import IQuoteRepository
+from app.server.repositories.refresh_token_repository import IRefreshTokenRepository, hash_refresh_token
+from app.server.repositories.repository_error import EmptyLibraryError, NotFoundError, RepositoryError, Result
+from app.server.repositories.user_repository import IUserRepository
+
+# the embedded lists of a user, kept in its Library rather than on the stored profile
+LIBRARY_FIELDS = ("userBooks", "collections", "quotes", "favourites")
+
+
+def _lean(model: type, fields: FieldSet, item: BaseModel) -> BaseModel:
+    # same shape as a projected MongoDB document, so the lean models load it the same way
+    selected = {path.split(".", 1)[0] for path in fields}
+    return lean_model(model, fields).model_validate(item.model_dump(by_alias=True, include=selected))
+
+
+class Library:
+    """
+    One user's books, quotes, collections and favourites, indexed by id.
+
+    Dicts keep insertion order, so reading them back gives the order of the embedded lists in MongoDB.
+    """
+
+    def __init__(self, user: User):
+        self.books: Dict[PydanticObjectId, Book] = {}
+        self.isnbs: Counter = Counter()
+        for book in user.userBooks:
+            self.add_book(book)
+        self.quotes: Dict[PydanticObjectId, Quote] = {}
+        self.quotes_by_book: Dict[str, Dict[PydanticObjectId, Quote]] = {}
+        for quote in user.quotes:
+            self.add_quote(quote)
+        self.collections: Dict[PydanticObjectId, Collection] = {}
+        self.collection_books: Dict[PydanticObjectId, Set[str]] = {}
+        for collection in user.collections:
+            self.add_collection(collection)
+        # used as an ordered set
+        self.favourites: Dict[str, None] = dict.fromkeys(user.favourites)
+
+    def add_book(self, book: Book) -> None:
+        self.books[book.id] = book
+        self.isnbs[book.isnb] += 1
+
+    def remove_book(self, book_id: PydanticObjectId) -> Optional[Book]:
+        book = self.books.pop(book_id, None)
+        if book is not None:
+            self._forget_isnb(book.isnb)
+        return book
+
+    def replace_book(self, book_id: PydanticObjectId, book: Book) -> None:
+        self._forget_isnb(self.books[book_id].isnb)
+        self.isnbs[book.isnb] += 1
+        if book.id == book_id:
+            self.books[book_id] = book
+        else:
+            # the new book takes the position of the old one, as in the embedded list
+            self.books = {
+                (book.id if key == book_id else key): (book if key == book_id else value)
+                for key, value in self.books.items()
+            }
+
+    def add_quote(self, quote: Quote) -> None:
+        self.quotes[quote.id] = quote
+        self.quotes_by_book.setdefault(quote.book_id, {})[quote.id] = quote
+
+    def remove_quote(self, quote_id: PydanticObjectId) -> Optional[Quote]:
+        quote = self.quotes.pop(quote_id, None)
+        if quote is not None:
+            book_quotes = self.quotes_by_book[quote.book_id]
+            del book_quotes[quote_id]
+            if not book_quotes:
+                del self.quotes_by_book[quote.book_id]
+        return quote
+
+    def add_collection(self, collection: Collection) -> None:
+        self.collections[collection.id] = collection
+        self.collection_books[collection.id] = set(collection.books)
+
+    def remove_collection(self, collection_id: PydanticObjectId) -> Optional[Collection]:
+        self.collection_books.pop(collection_id, None)
+        return self.collections.pop(collection_id, None)
+
+    def add_to_collection(self, collection_id: PydanticObjectId, book_id: str) -> bool:
+        members = self.collection_books[collection_id]
+        if book_id in members:
+            return False
+        members.add(book_id)
+        self.collections[collection_id].books.append(book_id)
+        return True
+
+    def remove_from_collection(self, collection_id: PydanticObjectId, book_id: str) -> bool:
+        members = self.collection_books[collection_id]
+        if book_id not in members:
+            return False
+        members.discard(book_id)
+        self.collections[collection_id].books.remove(book_id)
+        return True
+
+    def embedded_lists(self) -> dict:
+        return {
+            "userBooks": list(self.books.values()),
+            "collections": list(self.collections.values()),
+            "quotes": list(self.quotes.values()),
+            "favourites": list(self.favourites),
+        }
+
+    def _forget_isnb(self, isnb: str) -> None:
+        self.isnbs[isnb] -= 1
+        if not self.isnbs[isnb]:
+            del self.isnbs[isnb]
+
+
+class MemoryStore:
+    """
+    Users and their libraries kept in process memory, shared by the in-memory repositories.
+
+    Users are indexed by id, email and username. The stored profile holds no embedded lists; those live
+    in the user's ``Library`` and are put back together by ``user``.
+    """
+
+    def __init__(self):
+        self.profiles: Dict[PydanticObjectId, User] = {}
+        self.libraries: Dict[PydanticObjectId, Library] = {}
+        self.ids_by_email: Dict[str, PydanticObjectId] = {}
+        self.ids_by_username: Dict[str, PydanticObjectId] = {}
+
+    def put(self, user: User) -> None:
+        self._unindex(user.id)
+        self.profiles[user.id] = user.model_copy(update={field: [] for field in LIBRARY_FIELDS})
+        self.libraries[user.id] = Library(user)
+        self.ids_by_email[user.email] = user.id
+        self.ids_by_username[user.username] = user.id
+
+    def remove(self, user_id: PydanticObjectId) -> bool:
+        if user_id not in self.profiles:
+            return False
+        self._unindex(user_id)
+        del self.profiles[user_id]
+        del self.libraries[user_id]
+        return True
+
+    def user(self, user_id: Optional[PydanticObjectId]) -> Optional[User]:
+        profile = self.profiles.get(user_id)
+        if profile is None:
+            return None
+        return profile.model_copy(update=self.libraries[user_id].embedded_lists())
+
+    def _unindex(self, user_id: PydanticObjectId) -> None:
+        profile = self.profiles.get(user_id)
+        if profile is not None:
+            self.ids_by_email.pop(profile.email, None)
+            self.ids_by_username.pop(profile.username, None)
+
+
+@timed_methods
+class MemoryBookRepository(IBookRepository):
+    """
+    Implementation of the IBookRepository interface over a MemoryStore.
+    """
+
+    def __init__(self, store: MemoryStore):
+        self.store = store
+
+    async def add_book_to_user(self, user_id: PydanticObjectId, book: Book) -> RepositoryError | None:
+        library = self.store.libraries.get(user_id)
+        if library is None:
+            return NotFoundError(message=f"No user with id {user_id}.")
+        if book.isnb in library.isnbs:
+            return RepositoryError(message=f"Book with ISNB {book.isnb} is already added to the user.")
+        # a request body may carry its own id
+        if book.id is not None and book.id in library.books:
+            return RepositoryError(message=f"Book with id {book.id} already exists for user {user_id}.")
+        library.add_book(book)
+        return None
+
+    async def delete_book_from_user(self, user_id: PydanticObjectId, book_id: PydanticObjectId) -> RepositoryError | None:
+        library = self.store.libraries.get(user_id)
+        if library is None:
+            return NotFoundError(message=f"No user with id {user_id}.")
+        if library.remove_book(book_id) is None:
+            return NotFoundError(message=f"No book with id {book_id} belongs to user.")
+        return None
+
+    async def get_all_books(self, user_id: PydanticObjectId) -> Result[List[Book]]:
+        library = self.store.libraries.get(user_id)
+        if library is None:
+            return Result(error=NotFoundError(message=f"User with id {user_id} not found"))
+        if not library.books:
+            return Result(error=EmptyLibraryError(message=f"User with id {user_id} does not have any books."))
+        return Result(list(library.books.values()))
+
+    async def get_all_books_fields(self, user_id: PydanticObjectId, fields: FieldSet) -> RepositoryError | List[BaseModel]:
+        library = self.store.libraries.get(user_id)
+        if library is None:
+            return NotFoundError(message=f"User with id {user_id} not found")
+        if not library.books:
+            return EmptyLibraryError(message=f"User with id {user_id} does not have any books.")
+        return [_lean(Book, fields, book) for book in library.books.values()]
+
+    async def get_book_by_id(self, user_id, book_id: PydanticObjectId) -> Result[Book]:
+        library = self.store.libraries.get(user_id)
+        if library is None:
+            return Result(error=NotFoundError(message=f"User with id {user_id} not found"))
+        if not library.books:
+            return Result(error=EmptyLibraryError(message=f"User with id {user_id} does not have any books."))
+        book = library.books.get(book_id)
+        if book is None:
+            return Result(error=NotFoundError(message=f"Book with id {book_id} not found for user {user_id}."))
+        return Result(book)
+
+    async def update_book(self, user_id, book_id: PydanticObjectId, new_book_data: Book) -> RepositoryError | None:
+        library = self.store.libraries.get(user_id)
+        if library is None:
+            return NotFoundError(message=f"User with id {user_id} not found")
+        if not library.books:
+            return EmptyLibraryError(message=f"User with id {user_id} does not have any books.")
+        if book_id not in library.books:
+            return NotFoundError(message=f"Book with id {book_id} not found for user {user_id}.")
+        if new_book_data.id != book_id and new_book_data.id in library.books:
+            return RepositoryError(message=f"Book with id {new_book_data.id} already exists for user {user_id}.")
+        library.replace_book(book_id, new_book_data)
+        return None
+
+    async def add_quote_to_book(self, user_id, book_id: PydanticObjectId, quote: Quote) -> RepositoryError | None:
+        library = self.store.libraries.get(user_id)
+        if library is None:
+            return NotFoundError(message=f"User with id {user_id} not found")
+        if book_id not in library.books:
+            return NotFoundError(message=f"Book with id {book_id} not found for user {user_id}.")
+        quote.book_id = str(book_id)
+        library.add_quote(quote)
+        return None
+
+    async def add_to_collection(self, user_id, book_id, collection_id: PydanticObjectId) -> RepositoryError | None:
+        library = self.store.libraries.get(user_id)
+        if library is None:
+            return NotFoundError(message=f"User with id {user_id} not found")
+        if collection_id not in library.collections:
+            return NotFoundError(message=f"Collection with id {collection_id} not found.")
+        if not library.add_to_collection(collection_id, str(book_id)):
+            return RepositoryError(message=f"Book with id {book_id} is already in the collection.")
+        return None
+
+    async def update_description(self, user_id: PydanticObjectId, book_id: PydanticObjectId, new_description: str) -> RepositoryError | None:
+        library = self.store.libraries.get(user_id)
+        if library is None:
+            return NotFoundError(message=f"User with id {user_id} not found")
+        book = library.books.get(book_id)
+        if book is None:
+            return NotFoundError(message=f"Book with id {book_id} not found for user {user_id}.")
+        book.description.description = new_description
+        return None
+
+
+@timed_methods
+class MemoryQuoteRepository(IQuoteRepository):
+    """
+    Implementation of the IQuoteRepository interface over a MemoryStore.
+    """
+
+    def __init__(self, store: MemoryStore):
+        self.store = store
+
+    async def add_quote_to_book(self, user_id: PydanticObjectId, book_id: PydanticObjectId, text: str) -> RepositoryError | None:
+        library = self.store.libraries.get(user_id)
+        if library is None:
+            return NotFoundError(message=f"User with id {user_id} not found")
+        if book_id not in library.books:
+            return NotFoundError(message=f"Book with id {book_id} not found in user's book list")
+        library.add_quote(Quote(book_id=str(book_id), text=text, created_at=datetime.utcnow()))
+        return None
+
+    async def update_quote(self, user_id: PydanticObjectId, quote_id: PydanticObjectId, new_text: str) -> RepositoryError | None:
+        library = self.store.libraries.get(user_id)
+        if library is None:
+            return NotFoundError(message=f"User with id {user_id} not found")
+        quote = library.quotes.get(quote_id)
+        if quote is None:
+            return NotFoundError(message=f"Quote with id {quote_id} not found")
+        quote.text = new_text
+        return None
+
+    async def remove_quote_from_book(self, user_id: PydanticObjectId, quote_id: PydanticObjectId) -> RepositoryError | None:
+        library = self.store.libraries.get(user_id)
+        if library is None:
+            return NotFoundError(message=f"User with id {user_id} not found")
+        if library.remove_quote(quote_id) is None:
+            return NotFoundError(message=f"Quote with id {quote_id} not found")
+        return None
+
+    async def get_quotes_for_book(self, user_id: PydanticObjectId, book_id: PydanticObjectId) -> List[Quote] | RepositoryError:
+        library = self.store.libraries.get(user_id)
+        if library is None:
+            return NotFoundError(message=f"User with id {user_id} not found")
+        return list(library.quotes_by_book.get(str(book_id), {}).values())
+
+    async def get_quotes_for_book_fields(self, user_id: PydanticObjectId, book_id: PydanticObjectId, fields: FieldSet) -> List[BaseModel] | RepositoryError:
+        library = self.store.libraries.get(user_id)
+        if library is None:
+            return NotFoundError(message=f"User with id {user_id} not found")
+        return [_lean(Quote, fields, quote) for quote in library.quotes_by_book.get(str(book_id), {}).values()]
+
+
+@timed_methods
+class MemoryCollectionRepository(ICollectionRepository):
+    """
+    Implementation of the ICollectionRepository interface over a MemoryStore.
+    """
+
+    def __init__(self, store: MemoryStore):
+        self.store = store
+
+    async def create_collection(self, user_id: PydanticObjectId, collection_name: str) -> RepositoryError | None:
+        library = self.store.libraries.get(user_id)
+        if library is None:
+            return NotFoundError(message=f"User with ID {user_id} not found.")
+        library.add_collection(Collection(collection_name=collection_name, books=[]))
+        return None
+
+    async def delete_collection(self, user_id: PydanticObjectId, collection_id: PydanticObjectId) -> RepositoryError | None:
+        library = self.store.libraries.get(user_id)
+        if library is None:
+            return NotFoundError(message=f"User with ID {user_id} not found.")
+        if library.remove_collection(collection_id) is None:
+            return NotFoundError(message=f"Collection with ID {collection_id} not found.")
+        return None
+
+    async def add_book_to_collection(self, user_id: PydanticObjectId, collection_id: PydanticObjectId, book_id: str) -> RepositoryError | None:
+        library = self.store.libraries.get(user_id)
+        if library is None:
+            return NotFoundError(message=f"User with ID {user_id} not found.")
+        if collection_id not in library.collections:
+            return NotFoundError(message=f"Collection with ID {collection_id} not found.")
+        if not library.add_to_collection(collection_id, book_id):
+            return RepositoryError(message=f"Book with ID {book_id} is already in the collection.")
+        return None
+
+    async def remove_book_from_collection(self, user_id: PydanticObjectId, collection_id: PydanticObjectId, book_id: str) -> RepositoryError | None:
+        library = self.store.libraries.get(user_id)
+        if library is None:
+            return NotFoundError(message=f"User with ID {user_id} not found.")
+        if collection_id not in library.collections:
+            return NotFoundError(message=f"Collection with ID {collection_id} not found.")
+        if not library.remove_from_collection(collection_id, book_id):
+            return RepositoryError(message=f"Book with ID {book_id} is not in the collection.")
+        return None
+
+    async def update_collection(self, user_id: PydanticObjectId, collection_id: PydanticObjectId, new_name: str) -> RepositoryError | None:
+        library = self.store.libraries.get(user_id)
+        if library is None:
+            return NotFoundError(message=f"User with ID {user_id} not found.")
+        collection = library.collections.get(collection_id)
+        if collection is None:
+            return NotFoundError(message=f"Collection with ID {collection_id} not found.")
+        collection.collection_name = new_name
+        return None
+
+    async def get_collections(self, user_id: PydanticObjectId) -> RepositoryError | List[Collection]:
+        library = self.store.libraries.get(user_id)
+        if library is None:
+            return NotFoundError(message=f"User with ID {user_id} not found.")
+        return list(library.collections.values())
+
+    async def get_collection_by_id(self, user_id: PydanticObjectId, collection_id: PydanticObjectId) -> RepositoryError | Collection:
+        library = self.store.libraries.get(user_id)
+        if library is None:
+            return NotFoundError(message=f"User with ID {user_id} not found.")
+        collection = library.collections.get(collection_id)
+        if collection is None:
+            return NotFoundError(message=f"Collection with ID {collection_id} not found.")
+        return collection
+
+
+def _validate_user_and_book(library: Optional[Library], user_id: PydanticObjectId, book_id: PydanticObjectId) -> RepositoryError | None:
+    if library is None:
+        return NotFoundError(message=f"User with id {user_id} not found")
+    if book_id not in library.books:
+        return NotFoundError(message=f"Book with id {book_id} not found in user's book list")
+    return None
+
+
+@timed_methods
+class MemoryFavouriteRepository(IFavouriteRepository):
+    """
+    Implementation of the IFavouriteRepository interface over a MemoryStore.
+    """
+
+    def __init__(self, store: MemoryStore):
+        self.store = store
+
+    async def add_to_favourites(self, user_id, book_id: PydanticObjectId) -> RepositoryError | None:
+        library = self.store.libraries.get(user_id)
+        error = _validate_user_and_book(library, user_id, book_id)
+        if error:
+            return error
+        if str(book_id) in library.favourites:
+            return RepositoryError(message=f"Book with id {book_id} is already in favourites")
+        library.favourites[str(book_id)] = None
+        return None
+
+    async def remove_from_favourites(self, user_id, book_id: PydanticObjectId) -> RepositoryError | None:
+        library = self.store.libraries.get(user_id)
+        error = _validate_user_and_book(library, user_id, book_id)
+        if error:
+            return error
+        if str(book_id) not in library.favourites:
+            return RepositoryError(message=f"Book with id {book_id} is not in favourites")
+        del library.favourites[str(book_id)]
+        return None
+
+
+@timed_methods
+class MemoryUserRepository(IUserRepository):
+    """
+    Implementation of the IUserRepository interface over a MemoryStore.
+    """
+
+    def __init__(self, store: MemoryStore):
+        self.store = store
+
+    async def add_user(self, user: User) -> RepositoryError | None:
+        if user.email in self.store.ids_by_email:
+            return RepositoryError(message=f"User with email {user.email} already exists.")
+        if user.id is None:
+            user.id = PydanticObjectId()
+        self.store.put(user)
+        return None
+
+    async def delete_user(self, user_id: PydanticObjectId) -> RepositoryError | None:
+        if not self.store.remove(user_id):
+            return NotFoundError(message=f"User with ID {user_id} not found.")
+        return None
+
+    async def update_user(self, user_id: PydanticObjectId, updated_data: dict) -> RepositoryError | None:
+        user = self.store.user(user_id)
+        if user is None:
+            return NotFoundError(message=f"User with ID {user_id} not found.")
+        for key, value in updated_data.items():
+            if hasattr(user, key):
+                setattr(user, key, value)
+        self.store.put(user)
+        return None
+
+    async def get_user_by_id(self, user_id: PydanticObjectId) -> RepositoryError | User:
+        return self.store.user(user_id)
+
+    async def get_user_by_email(self, email: str) -> RepositoryError | User:
+        return self.store.user(self.store.ids_by_email.get(email))
+
+    async def get_user_by_username(self, username: str) -> User | None:
+        return self.store.user(self.store.ids_by_username.get(username))
+
+    async def get_user_fields_by_username(self, username: str, fields: FieldSet) -> RepositoryError | BaseModel:
+        user = self.store.user(self.store.ids_by_username.get(username))
+        if user is None:
+            return NotFoundError(message=f"User with username {username} not found.")
+        return _lean(User, fields, user)
+
+
+@timed_methods
+class MemoryRefreshTokenRepository(IRefreshTokenRepository):
+    """
+    Implementation of the IRefreshTokenRepository interface keeping the tokens in process memory.
+    """
+
+    def __init__(self, lifetime: timedelta):
+        self.lifetime = lifetime
+        self.tokens: Dict[str, RefreshToken] = {}
+        self.families: Dict[str, List[str]] = {}
+
+    async def issue(self, username: str) -> IssuedRefreshToken:
+        return self._issue(username, uuid.uuid4().hex)
+
+    async def rotate(self, token: str) -> RepositoryError | IssuedRefreshToken:
+        now = datetime.utcnow()
+        stored = self._find(hash_refresh_token(token), now)
+        if stored is None:
+            return RepositoryError(message="Refresh token is invalid or expired")
+        if stored.used_at is not None or stored.revoked:
+            logging.warning("Refresh token reuse detected, revoking token family of %s", stored.username)
+            self._revoke_family(stored.family_id)
+            return RepositoryError(message="Refresh token was already used")
+        # nothing is awaited between the check and the update, so concurrent refreshes cannot both pass
+        stored.used_at = now
+        return self._issue(stored.username, stored.family_id)
+
+    async def revoke(self, token: str) -> RepositoryError | None:
+        stored = self._find(hash_refresh_token(token), datetime.utcnow())
+        if stored is None:
+            return RepositoryError(message="Refresh token is invalid or expired")
+        self._revoke_family(stored.family_id)
+        return None
+
+    def _find(self, token_hash: str, now: datetime) -> Optional[RefreshToken]:
+        stored = self.tokens.get(token_hash)
+        if stored is not None and stored.expires_at <= now:
+            # dropped like MongoDB's TTL index drops expired tokens
+            del self.tokens[token_hash]
+            self.families[stored.family_id].remove(token_hash)
+            if not self.families[stored.family_id]:
+                del self.families[stored.family_id]
+            return None
+        return stored
+
+    def _issue(self, username: str, family_id: str) -> IssuedRefreshToken:
+        token = secrets.token_urlsafe(32)
+        token_hash = hash_refresh_token(token)
+        now = datetime.utcnow()
+        self.tokens[token_hash] = RefreshToken(
+            token_hash=token_hash,
+            family_id=family_id,
+            username=username,
+            created_at=now,
+            expires_at=now + self.lifetime,
+        )
+        self.families.setdefault(family_id, []).append(token_hash)
+        return IssuedRefreshToken(username=username, refresh_token=token)
+
+    def _revoke_family(self, family_id: str) -> None:
+        for token_hash in self.families.get(family_id, []):
+            self.tokens[token_hash].revoked = True
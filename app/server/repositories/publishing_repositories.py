@@ -0,0 +1,248 @@
+from typing import List
+
+from beanie import PydanticObjectId
+from pydantic import BaseModel
+
+from app.server.events.change_stream import FIELD_EVENTS, LIBRARY_CHANGED, USER_DELETED
+from app.server.events.event_bus import EventPublisher
+from app.server.models.batch import BatchOperation, BatchResult
+from app.server.models.book import Book
+from app.server.models.collection import Collection
+from app.server.models.fieldsets import FieldSet
+from app.server.models.quote import Quote
+from app.server.models.user import User
+from app.server.repositories.batch_repository import IBatchRepository, library_written
+from app.server.repositories.book_repository import IBookRepository
+from app.server.repositories.collection_repository import ICollectionRepository
+from app.server.repositories.favourite_repository import IFavouriteRepository
+from app.server.repositories.quote_repository import IQuoteRepository
+from app.server.repositories.repository_error import RepositoryError, Result
+from app.server.repositories.user_repository import IUserRepository
+
+BOOKS_CHANGED = FIELD_EVENTS["userBooks"]
+QUOTES_CHANGED = FIELD_EVENTS["quotes"]
+COLLECTIONS_CHANGED = FIELD_EVENTS["collections"]
+FAVOURITES_CHANGED = FIELD_EVENTS["favourites"]
+
+# event published for each kind of batch operation
+BATCH_OPERATION_EVENTS = {
+    "add_to_collection": COLLECTIONS_CHANGED,
+    "remove_from_collection": COLLECTIONS_CHANGED,
+    "move_to_collection": COLLECTIONS_CHANGED,
+    "delete_book": BOOKS_CHANGED,
+    "rate_book": BOOKS_CHANGED,
+    "add_favourite": FAVOURITES_CHANGED,
+    "remove_favourite": FAVOURITES_CHANGED,
+}
+
+
+class PublishingBookRepository(IBookRepository):
+    """
+    IBookRepository that publishes an event to the user's subscribers after every successful write.
+    """
+
+    def __init__(self, repository: IBookRepository, publisher: EventPublisher):
+        self.repository = repository
+        self.publisher = publisher
+
+    async def add_book_to_user(self, user_id: PydanticObjectId, book: Book) -> RepositoryError | None:
+        error = await self.repository.add_book_to_user(user_id, book)
+        if not error:
+            self.publisher.publish(user_id, BOOKS_CHANGED, {"action": "added", "book_id": str(book.id), "isnb": book.isnb})
+        return error
+
+    async def delete_book_from_user(self, user_id, book_id: PydanticObjectId) -> RepositoryError | None:
+        error = await self.repository.delete_book_from_user(user_id, book_id)
+        if not error:
+            self.publisher.publish(user_id, BOOKS_CHANGED, {"action": "deleted", "book_id": str(book_id)})
+        return error
+
+    async def get_all_books(self, user_id: PydanticObjectId) -> Result[List[Book]]:
+        return await self.repository.get_all_books(user_id)
+
+    async def get_all_books_fields(self, user_id: PydanticObjectId, fields: FieldSet) -> RepositoryError | List[BaseModel]:
+        return await self.repository.get_all_books_fields(user_id, fields)
+
+    async def get_book_by_id(self, user_id, book_id: PydanticObjectId) -> Result[Book]:
+        return await self.repository.get_book_by_id(user_id, book_id)
+
+    async def update_book(self, user_id, book_id: PydanticObjectId, new_book_data: Book) -> RepositoryError | None:
+        error = await self.repository.update_book(user_id, book_id, new_book_data)
+        if not error:
+            self.publisher.publish(user_id, BOOKS_CHANGED, {"action": "updated", "book_id": str(book_id)})
+        return error
+
+    async def add_quote_to_book(self, user_id, book_id: PydanticObjectId, quote: Quote) -> RepositoryError | None:
+        error = await self.repository.add_quote_to_book(user_id, book_id, quote)
+        if not error:
+            self.publisher.publish(user_id, QUOTES_CHANGED, {"action": "added", "book_id": str(book_id)})
+        return error
+
+    async def add_to_collection(self, user_id, book_id, collection_id: PydanticObjectId) -> RepositoryError | None:
+        error = await self.repository.add_to_collection(user_id, book_id, collection_id)
+        if not error:
+            self.publisher.publish(user_id, COLLECTIONS_CHANGED, {"action": "book_added", "collection_id": str(collection_id), "book_id": str(book_id)})
+        return error
+
+    async def update_description(self, user_id: PydanticObjectId, book_id: PydanticObjectId, new_description: str) -> RepositoryError | None:
+        error = await self.repository.update_description(user_id, book_id, new_description)
+        if not error:
+            self.publisher.publish(user_id, BOOKS_CHANGED, {"action": "updated", "book_id": str(book_id)})
+        return error
+
+
+class PublishingQuoteRepository(IQuoteRepository):
+    """
+    IQuoteRepository that publishes an event to the user's subscribers after every successful write.
+    """
+
+    def __init__(self, repository: IQuoteRepository, publisher: EventPublisher):
+        self.repository = repository
+        self.publisher = publisher
+
+    async def add_quote_to_book(self, user_id: PydanticObjectId, book_id: PydanticObjectId, text: str) -> RepositoryError | None:
+        error = await self.repository.add_quote_to_book(user_id, book_id, text)
+        if not error:
+            self.publisher.publish(user_id, QUOTES_CHANGED, {"action": "added", "book_id": str(book_id)})
+        return error
+
+    async def update_quote(self, user_id: PydanticObjectId, quote_id: PydanticObjectId, new_text: str) -> RepositoryError | None:
+        error = await self.repository.update_quote(user_id, quote_id, new_text)
+        if not error:
+            self.publisher.publish(user_id, QUOTES_CHANGED, {"action": "updated", "quote_id": str(quote_id)})
+        return error
+
+    async def remove_quote_from_book(self, user_id: PydanticObjectId, quote_id: PydanticObjectId) -> RepositoryError | None:
+        error = await self.repository.remove_quote_from_book(user_id, quote_id)
+        if not error:
+            self.publisher.publish(user_id, QUOTES_CHANGED, {"action": "deleted", "quote_id": str(quote_id)})
+        return error
+
+    async def get_quotes_for_book(self, user_id: PydanticObjectId, book_id: PydanticObjectId) -> List[Quote] | RepositoryError:
+        return await self.repository.get_quotes_for_book(user_id, book_id)
+
+    async def get_quotes_for_book_fields(self, user_id: PydanticObjectId, book_id: PydanticObjectId, fields: FieldSet) -> List[BaseModel] | RepositoryError:
+        return await self.repository.get_quotes_for_book_fields(user_id, book_id, fields)
+
+
+class PublishingCollectionRepository(ICollectionRepository):
+    """
+    ICollectionRepository that publishes an event to the user's subscribers after every successful write.
+    """
+
+    def __init__(self, repository: ICollectionRepository, publisher: EventPublisher):
+        self.repository = repository
+        self.publisher = publisher
+
+    async def create_collection(self, user_id: PydanticObjectId, collection_name: str) -> RepositoryError | None:
+        error = await self.repository.create_collection(user_id, collection_name)
+        if not error:
+            self.publisher.publish(user_id, COLLECTIONS_CHANGED, {"action": "created"})
+        return error
+
+    async def delete_collection(self, user_id: PydanticObjectId, collection_id: PydanticObjectId) -> RepositoryError | None:
+        error = await self.repository.delete_collection(user_id, collection_id)
+        if not error:
+            self.publisher.publish(user_id, COLLECTIONS_CHANGED, {"action": "deleted", "collection_id": str(collection_id)})
+        return error
+
+    async def add_book_to_collection(self, user_id: PydanticObjectId, collection_id: PydanticObjectId, book_id: str) -> RepositoryError | None:
+        error = await self.repository.add_book_to_collection(user_id, collection_id, book_id)
+        if not error:
+            self.publisher.publish(user_id, COLLECTIONS_CHANGED, {"action": "book_added", "collection_id": str(collection_id), "book_id": book_id})
+        return error
+
+    async def remove_book_from_collection(self, user_id: PydanticObjectId, collection_id: PydanticObjectId, book_id: str) -> RepositoryError | None:
+        error = await self.repository.remove_book_from_collection(user_id, collection_id, book_id)
+        if not error:
+            self.publisher.publish(user_id, COLLECTIONS_CHANGED, {"action": "book_removed", "collection_id": str(collection_id), "book_id": book_id})
+        return error
+
+    async def update_collection(self, user_id: PydanticObjectId, collection_id: PydanticObjectId, new_name: str) -> RepositoryError | None:
+        error = await self.repository.update_collection(user_id, collection_id, new_name)
+        if not error:
+            self.publisher.publish(user_id, COLLECTIONS_CHANGED, {"action": "updated", "collection_id": str(collection_id)})
+        return error
+
+    async def get_collections(self, user_id: PydanticObjectId) -> RepositoryError | List[Collection]:
+        return await self.repository.get_collections(user_id)
+
+    async def get_collection_by_id(self, user_id: PydanticObjectId, collection_id: PydanticObjectId) -> RepositoryError | Collection:
+        return await self.repository.get_collection_by_id(user_id, collection_id)
+
+
+class PublishingFavouriteRepository(IFavouriteRepository):
+    """
+    IFavouriteRepository that publishes an event to the user's subscribers after every successful write.
+    """
+
+    def __init__(self, repository: IFavouriteRepository, publisher: EventPublisher):
+        self.repository = repository
+        self.publisher = publisher
+
+    async def add_to_favourites(self, user_id, book_id: PydanticObjectId) -> RepositoryError | None:
+        error = await self.repository.add_to_favourites(user_id, book_id)
+        if not error:
+            self.publisher.publish(user_id, FAVOURITES_CHANGED, {"action": "added", "book_id": str(book_id)})
+        return error
+
+    async def remove_from_favourites(self, user_id, book_id: PydanticObjectId) -> RepositoryError | None:
+        error = await self.repository.remove_from_favourites(user_id, book_id)
+        if not error:
+            self.publisher.publish(user_id, FAVOURITES_CHANGED, {"action": "removed", "book_id": str(book_id)})
+        return error
+
+
+class PublishingUserRepository(IUserRepository):
+    """
+    IUserRepository that publishes an event when a user is updated or deleted.
+    """
+
+    def __init__(self, repository: IUserRepository, publisher: EventPublisher):
+        self.repository = repository
+        self.publisher = publisher
+
+    async def add_user(self, user: User) -> RepositoryError | None:
+        return await self.repository.add_user(user)
+
+    async def delete_user(self, user_id: PydanticObjectId) -> RepositoryError | None:
+        error = await self.repository.delete_user(user_id)
+        if not error:
+            self.publisher.publish(user_id, USER_DELETED)
+        return error
+
+    async def update_user(self, user_id: PydanticObjectId, updated_data: dict) -> RepositoryError | None:
+        error = await self.repository.update_user(user_id, updated_data)
+        if not error:
+            self.publisher.publish(user_id, LIBRARY_CHANGED, {"fields": sorted(updated_data)})
+        return error
+
+    async def get_user_by_id(self, user_id: PydanticObjectId) -> RepositoryError | User:
+        return await self.repository.get_user_by_id(user_id)
+
+    async def get_user_by_email(self, email: str) -> RepositoryError | User:
+        return await self.repository.get_user_by_email(email)
+
+    async def get_user_by_username(self, username: str) -> User | None:
+        return await self.repository.get_user_by_username(username)
+
+    async def get_user_fields_by_username(self, username: str, fields: FieldSet) -> RepositoryError | BaseModel:
+        return await self.repository.get_user_fields_by_username(username, fields)
+
+
+class PublishingBatchRepository(IBatchRepository):
+    """
+    IBatchRepository that publishes one event per changed part of the library after a batch wrote to it,
+    fully or in part.
+    """
+
+    def __init__(self, repository: IBatchRepository, publisher: EventPublisher):
+        self.repository = repository
+        self.publisher = publisher
+
+    async def execute(self, user_id: PydanticObjectId, operations: List[BatchOperation], transactional: bool) -> RepositoryError | BatchResult:
+        result = await self.repository.execute(user_id, operations, transactional)
+        if library_written(result):
+            for type in sorted({BATCH_OPERATION_EVENTS[operation.op] for operation in operations}):
+                self.publisher.publish(user_id, type, {"action": "batch", "operations": len(operations)})
+        return result
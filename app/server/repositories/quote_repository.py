@@ -2,11 +2,15 @@ from abc import ABC, abstractmethod
 from typing import Optional, List
 
 from beanie import PydanticObjectId
+from pydantic import BaseModel
 from datetime import datetime
 
+from app.server.models.fieldsets import FieldSet, lean_model, mongo_projection
 from app.server.models.user import User
 from app.server.models.quote import Quote
-from app.server.repositories.repository_error import RepositoryError
+from app.server.repositories.repository_error import NotFoundError, RepositoryError
+from app.server.profiling.spans import timed_methods
+from app.server.resilience.guard import guarded_methods
 
 
 class IQuoteRepository(ABC):
@@ -71,7 +75,24 @@ class IQuoteRepository(ABC):
         """
         pass
 
+    @abstractmethod
+    async def get_quotes_for_book_fields(self, user_id: PydanticObjectId, book_id: PydanticObjectId, fields: FieldSet) -> List[BaseModel] | RepositoryError:
+        """
+        Retrieves only the selected fields of the quotes for a specific book.
 
+        Args:
+            user_id (PydanticObjectId): The ID of the user.
+            book_id (PydanticObjectId): The ID of the book.
+            fields (FieldSet): The field paths to load, see ``parse_fieldset``.
+
+        Returns:
+            List[BaseModel] | RepositoryError: Returns a list of lean quote models or an error if the operation fails.
+        """
+        pass
+
+
+@timed_methods
+@guarded_methods
 class QuoteRepository(IQuoteRepository):
     """
     Implementation of the IQuoteRepository interface for managing quotes.
@@ -79,10 +100,10 @@ class QuoteRepository(IQuoteRepository):
     async def add_quote_to_book(self, user_id: PydanticObjectId, book_id: PydanticObjectId, text: str) -> RepositoryError | None:
         user_data = await User.get(user_id)
         if not user_data:
-            return RepositoryError(message=f"User with id {user_id} not found")
+            return NotFoundError(message=f"User with id {user_id} not found")
 
         if not any(book.id == book_id for book in user_data.userBooks):
-            return RepositoryError(message=f"Book with id {book_id} not found in user's book list")
+            return NotFoundError(message=f"Book with id {book_id} not found in user's book list")
 
         new_quote = Quote(book_id=str(book_id), text=text, created_at=datetime.utcnow())
         user_data.quotes.append(new_quote)
@@ -92,7 +113,7 @@ class QuoteRepository(IQuoteRepository):
     async def update_quote(self, user_id: PydanticObjectId, quote_id: PydanticObjectId, new_text: str) -> RepositoryError | None:
         user_data = await User.get(user_id)
         if not user_data:
-            return RepositoryError(message=f"User with id {user_id} not found")
+            return NotFoundError(message=f"User with id {user_id} not found")
 
         for quote in user_data.quotes:
             if quote.id == quote_id:
@@ -100,12 +121,12 @@ class QuoteRepository(IQuoteRepository):
                 await user_data.save()
                 return None
 
-        return RepositoryError(message=f"Quote with id {quote_id} not found")
+        return NotFoundError(message=f"Quote with id {quote_id} not found")
 
     async def remove_quote_from_book(self, user_id: PydanticObjectId, quote_id: PydanticObjectId) -> RepositoryError | None:
         user_data = await User.get(user_id)
         if not user_data:
-            return RepositoryError(message=f"User with id {user_id} not found")
+            return NotFoundError(message=f"User with id {user_id} not found")
 
         for quote in user_data.quotes:
             if quote.id == quote_id:
@@ -113,12 +134,24 @@ class QuoteRepository(IQuoteRepository):
                 await user_data.save()
                 return None
 
-        return RepositoryError(message=f"Quote with id {quote_id} not found")
+        return NotFoundError(message=f"Quote with id {quote_id} not found")
 
     async def get_quotes_for_book(self, user_id: PydanticObjectId, book_id: PydanticObjectId) -> List[Quote] | RepositoryError:
         user_data = await User.get(user_id)
         if not user_data:
-            return RepositoryError(message=f"User with id {user_id} not found")
+            return NotFoundError(message=f"User with id {user_id} not found")
 
         quotes_for_book = [quote for quote in user_data.quotes if quote.book_id == str(book_id)]
         return quotes_for_book
+
+    async def get_quotes_for_book_fields(self, user_id: PydanticObjectId, book_id: PydanticObjectId, fields: FieldSet) -> List[BaseModel] | RepositoryError:
+        pipeline = [
+            {"$match": {"_id": user_id}},
+            {"$project": {"quotes": {"$filter": {"input": "$quotes", "cond": {"$eq": ["$$this.book_id", str(book_id)]}}}}},
+            {"$project": {"_id": 0, **mongo_projection(Quote, fields, prefix="quotes.")}},
+        ]
+        user_data = await User.get_motor_collection().aggregate(pipeline).to_list(length=1)
+        if not user_data:
+            return NotFoundError(message=f"User with id {user_id} not found")
+        model = lean_model(Quote, fields)
+        return [model.model_validate(quote) for quote in user_data[0].get("quotes") or []]
@@ -0,0 +1,119 @@
+import hashlib
+import logging
+import secrets
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Tuple
+
+from app.server.models.refresh_token import IssuedRefreshToken, RefreshToken
+from app.server.repositories.repository_error import RepositoryError
+from app.server.profiling.spans import timed_methods
+from app.server.resilience.guard import guarded_methods
+
+
+def hash_refresh_token(token: str) -> str:
+    # refresh tokens are 256 random bits, so a fast hash is enough; unlike passwords they need no bcrypt
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class IRefreshTokenRepository(ABC):
+    """
+    Interface for issuing and rotating refresh tokens.
+    """
+
+    @abstractmethod
+    async def issue(self, username: str) -> IssuedRefreshToken:
+        """
+        Start a new token family for a user, e.g. on login.
+
+        :param username: The user the token is issued to.
+        :return: The token to hand to the client.
+        """
+        pass
+
+    @abstractmethod
+    async def rotate(self, token: str) -> RepositoryError | IssuedRefreshToken:
+        """
+        Exchange a refresh token for the next one of its family.
+
+        A token can be exchanged once. Presenting a used or revoked token means it was copied, so the whole
+        family is revoked and the client has to log in again.
+
+        :param token: The refresh token presented by the client.
+        :return: The next token or a RepositoryError if the token is unknown, expired, used or revoked.
+        """
+        pass
+
+    @abstractmethod
+    async def revoke(self, token: str) -> RepositoryError | None:
+        """
+        Revoke the family of a refresh token, e.g. on logout.
+
+        :param token: The refresh token presented by the client.
+        :return: RepositoryError if the token is unknown, otherwise None.
+        """
+        pass
+
+
+@timed_methods
+@guarded_methods
+class RefreshTokenRepository(IRefreshTokenRepository):
+    """
+    Implementation of the IRefreshTokenRepository interface backed by the refresh_tokens collection.
+    """
+
+    def __init__(self, lifetime: timedelta):
+        self.lifetime = lifetime
+
+    async def issue(self, username: str) -> IssuedRefreshToken:
+        return await self._issue(username, uuid.uuid4().hex)
+
+    async def rotate(self, token: str) -> RepositoryError | IssuedRefreshToken:
+        now = datetime.utcnow()
+        token_hash = hash_refresh_token(token)
+        collection = RefreshToken.get_motor_collection()
+        usable = {"token_hash": token_hash, "used_at": None, "revoked": False, "expires_at": {"$gt": now}}
+        current = await collection.find_one(usable)
+        if current is not None:
+            # the successor is stored before the token is spent, so if storing fails the token still works
+            successor, issued = self._next(current["username"], current["family_id"])
+            await successor.insert()
+            # marking the token used is atomic, so of two concurrent refreshes with the same token one fails
+            if await collection.find_one_and_update(usable, {"$set": {"used_at": now}}) is not None:
+                return issued
+            await successor.delete()
+        stored = await collection.find_one({"token_hash": token_hash})
+        if stored is None or stored["expires_at"] <= now:
+            return RepositoryError(message="Refresh token is invalid or expired")
+        logging.warning("Refresh token reuse detected, revoking token family of %s", stored["username"])
+        await self._revoke_family(stored["family_id"])
+        return RepositoryError(message="Refresh token was already used")
+
+    async def revoke(self, token: str) -> RepositoryError | None:
+        stored = await RefreshToken.get_motor_collection().find_one({"token_hash": hash_refresh_token(token)})
+        if stored is None:
+            return RepositoryError(message="Refresh token is invalid or expired")
+        await self._revoke_family(stored["family_id"])
+        return None
+
+    async def _issue(self, username: str, family_id: str) -> IssuedRefreshToken:
+        stored, issued = self._next(username, family_id)
+        await stored.insert()
+        return issued
+
+    def _next(self, username: str, family_id: str) -> Tuple[RefreshToken, IssuedRefreshToken]:
+        token = secrets.token_urlsafe(32)
+        now = datetime.utcnow()
+        stored = RefreshToken(
+            token_hash=hash_refresh_token(token),
+            family_id=family_id,
+            username=username,
+            created_at=now,
+            expires_at=now + self.lifetime,
+        )
+        return stored, IssuedRefreshToken(username=username, refresh_token=token)
+
+    @staticmethod
+    async def _revoke_family(family_id: str) -> None:
+        await RefreshToken.get_motor_collection().update_many({"family_id": family_id}, {"$set": {"revoked": True}})
@@ -8,7 +8,30 @@ T = TypeVar("T")
 class RepositoryError(BaseModel):
     message: str
 
+class NotFoundError(RepositoryError):
+    """
+    RepositoryError for a user, book, quote or collection that does not exist.
+    """
+
+class EmptyLibraryError(NotFoundError):
+    """
+    NotFoundError for a user who exists but has no books.
+    """
+
+class ConflictError(RepositoryError):
+    """
+    RepositoryError for a write that was not applied because the data it was based on changed meanwhile.
+    """
+
+class PartialWriteError(ConflictError):
+    """
+    ConflictError for a write of which a part was applied before the change was noticed.
+    """
+
 class Result(Generic[T]):
+    """
+    Outcome of a repository read: the value, or the error that prevented reading it.
+    """
     def __init__(self, value: Optional[T] = None, error: Optional[RepositoryError] = None):
         self.value = value
-        self.error = error
\ No newline at end of file
+        self.error = error
@@ -0,0 +1,173 @@
+import heapq
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import AsyncIterator, List, Optional
+
+from beanie import PydanticObjectId
+
+from app.server.models.timeline import KIND_ORDER, TimelineCursor, TimelineEvent, TimelineEventKind, TimelinePage
+from app.server.models.user import User
+from app.server.repositories.repository_error import RepositoryError
+from app.server.profiling.spans import timed_methods
+from app.server.resilience.guard import guarded_methods
+
+
+class ITimelineRepository(ABC):
+    """
+    Interface for querying a user's reading activity in date order.
+    """
+
+    @abstractmethod
+    async def get_timeline(self, user_id: PydanticObjectId, start: datetime, end: datetime, limit: int,
+                           cursor: Optional[TimelineCursor] = None) -> RepositoryError | TimelinePage:
+        """
+        Retrieve books started, books finished and quotes added in ``[start, end)``, oldest first.
+
+        :param user_id: The ID of the user.
+        :param start: Inclusive lower bound of the event dates.
+        :param end: Exclusive upper bound of the event dates.
+        :param limit: The maximum number of events to return.
+        :param cursor: Position after which the page starts, taken from a previous page.
+        :return: A page of events or a RepositoryError if an error occurs.
+        """
+        pass
+
+
+async def merge_event_streams(*streams: AsyncIterator[TimelineEvent]) -> AsyncIterator[TimelineEvent]:
+    """
+    Lazily k-way merge event streams that are each already sorted by ``TimelineEvent.sort_key``.
+    """
+    heap = []
+    for position, stream in enumerate(streams):
+        event = await anext(stream, None)
+        if event is not None:
+            heap.append((event.sort_key(), position, event))
+    heapq.heapify(heap)
+    while heap:
+        _, position, event = heap[0]
+        yield event
+        following = await anext(streams[position], None)
+        if following is None:
+            heapq.heappop(heap)
+        else:
+            heapq.heapreplace(heap, (following.sort_key(), position, following))
+
+
+def paginate(events: List[TimelineEvent], limit: int, cursor: Optional[TimelineCursor] = None) -> TimelinePage:
+    """
+    Build a page from up to ``limit + 1`` merged events; the extra event only signals that more exist.
+
+    Events stored without an id cannot be told apart by the cursor, so when the page ends on one the
+    cursor also counts how many id-less events of that kind at that timestamp have been returned so far.
+    """
+    if len(events) <= limit:
+        return TimelinePage(events=events)
+    events = events[:limit]
+    last = events[-1]
+    skip = 0
+    if not last.id:
+        skip = sum(1 for event in events if (event.at, event.kind, event.id) == (last.at, last.kind, ""))
+        if cursor is not None and (cursor.at, cursor.kind, cursor.id) == (last.at, last.kind, ""):
+            skip += cursor.skip
+    return TimelinePage(events=events, next_cursor=TimelineCursor.after(last, skip).encode())
+
+
+# (array, date field, event kind) of each merged stream
+_STREAMS = [
+    ("userBooks", "start_read_date", TimelineEventKind.book_started),
+    ("userBooks", "end_read_date", TimelineEventKind.book_finished),
+    ("quotes", "created_at", TimelineEventKind.quote_added),
+]
+
+
+def _after_cursor(array: str, date_field: str, kind: TimelineEventKind, cursor: TimelineCursor) -> dict:
+    date_path = f"{array}.{date_field}"
+    kind_order, cursor_order = KIND_ORDER[kind], KIND_ORDER[cursor.kind]
+    if kind_order > cursor_order:
+        return {date_path: {"$gte": cursor.at}}
+    if kind_order < cursor_order:
+        return {date_path: {"$gt": cursor.at}}
+    if not PydanticObjectId.is_valid(cursor.id):
+        # id-less entries sort first within a timestamp; _stream_pipeline skips the ones already returned
+        return {date_path: {"$gte": cursor.at}}
+    # id-less entries at the cursor's timestamp sorted before it and are not matched by $gt
+    return {"$or": [
+        {date_path: {"$gt": cursor.at}},
+        {date_path: cursor.at, f"{array}._id": {"$gt": PydanticObjectId(cursor.id)}},
+    ]}
+
+
+def _stream_pipeline(user_id: PydanticObjectId, array: str, date_field: str, kind: TimelineEventKind,
+                     start: datetime, end: datetime, limit: int, cursor: Optional[TimelineCursor]) -> list:
+    date_path = f"{array}.{date_field}"
+    in_range = {date_path: {"$gte": start, "$lt": end}}
+    match = dict(in_range)
+    if cursor is not None:
+        match = {"$and": [in_range, _after_cursor(array, date_field, kind, cursor)]}
+    if array == "quotes":
+        fields = {"book_id": "$quotes.book_id", "text": "$quotes.text"}
+    else:
+        fields = {"book_id": "$userBooks._id", "isnb": "$userBooks.isnb", "title": "$userBooks.description.title"}
+    skip = []
+    if cursor is not None and cursor.kind == kind and not PydanticObjectId.is_valid(cursor.id):
+        skip = [{"$skip": cursor.skip}]
+    return [
+        {"$match": {"_id": user_id, **in_range}},
+        {"$project": {array: 1}},
+        {"$unwind": {"path": f"${array}", "includeArrayIndex": "position"}},
+        {"$match": match},
+        # the array position orders entries that share a timestamp and have no id
+        {"$sort": {date_path: 1, f"{array}._id": 1, "position": 1}},
+        *skip,
+        {"$limit": limit},
+        {"$project": {"_id": 0, "id": f"${array}._id", "at": f"${date_path}", **fields}},
+    ]
+
+
+@timed_methods
+@guarded_methods
+class TimelineRepository(ITimelineRepository):
+    """
+    Timeline over the embedded arrays of the users collection.
+
+    Every event kind is filtered, sorted and limited by MongoDB, so at most ``limit + 1`` events per
+    kind leave the database; the application only merges the three sorted streams.
+    """
+
+    async def get_timeline(self, user_id: PydanticObjectId, start: datetime, end: datetime, limit: int,
+                           cursor: Optional[TimelineCursor] = None) -> RepositoryError | TimelinePage:
+        collection = User.get_motor_collection()
+        if not await collection.count_documents({"_id": user_id}, limit=1):
+            return RepositoryError(message=f"User with id {user_id} not found")
+
+        cursors = [
+            collection.aggregate(
+                _stream_pipeline(user_id, array, date_field, kind, start, end, limit + 1, cursor),
+                batchSize=limit + 1,
+            )
+            for array, date_field, kind in _STREAMS
+        ]
+        events = []
+        try:
+            streams = [self._events(documents, kind) for documents, (_, _, kind) in zip(cursors, _STREAMS)]
+            async for event in merge_event_streams(*streams):
+                events.append(event)
+                if len(events) > limit:
+                    break
+        finally:
+            for documents in cursors:
+                await documents.close()
+        return paginate(events, limit, cursor)
+
+    @staticmethod
+    async def _events(documents, kind: TimelineEventKind) -> AsyncIterator[TimelineEvent]:
+        async for document in documents:
+            yield TimelineEvent(
+                kind=kind,
+                at=document["at"],
+                id=str(document.get("id") or ""),
+                book_id=str(document.get("book_id") or ""),
+                isnb=document.get("isnb"),
+                title=document.get("title"),
+                text=document.get("text"),
+            )
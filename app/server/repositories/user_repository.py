@@ -1,9 +1,13 @@
 from abc import ABC, abstractmethod
 
 from beanie import PydanticObjectId
+from pydantic import BaseModel
 
+from app.server.models.fieldsets import FieldSet, lean_model, mongo_projection
 from app.server.models.user import User
-from app.server.repositories.repository_error import RepositoryError
+from app.server.repositories.repository_error import NotFoundError, RepositoryError
+from app.server.profiling.spans import timed_methods
+from app.server.resilience.guard import guarded_methods
 
 class IUserRepository(ABC):
     """
@@ -61,6 +65,30 @@ class IUserRepository(ABC):
         """
         pass
 
+    @abstractmethod
+    async def get_user_by_username(self, username: str) -> User | None:
+        """
+        Retrieve a user by their username.
+
+        :param username: The username of the user to retrieve.
+        :return: The User object if found, otherwise None.
+        """
+        pass
+
+    @abstractmethod
+    async def get_user_fields_by_username(self, username: str, fields: FieldSet) -> RepositoryError | BaseModel:
+        """
+        Retrieve only the selected fields of a user.
+
+        :param username: The username of the user to retrieve.
+        :param fields: The field paths to load, see ``parse_fieldset``.
+        :return: A lean user model, or a RepositoryError if the user does not exist.
+        """
+        pass
+
+
+@timed_methods
+@guarded_methods
 class UserRepository(IUserRepository, ABC):
     """
     Repository for managing user data.
@@ -76,14 +104,14 @@ class UserRepository(IUserRepository, ABC):
     async def delete_user(self, user_id: PydanticObjectId) -> RepositoryError | None:
         user = await User.get(user_id)
         if not user:
-            return RepositoryError(message=f"User with ID {user_id} not found.")
+            return NotFoundError(message=f"User with ID {user_id} not found.")
         await user.delete()
         return None
 
     async def update_user(self, user_id: PydanticObjectId, updated_data: dict) -> RepositoryError | None:
         user = await User.get(user_id)
         if not user:
-            return RepositoryError(message=f"User with ID {user_id} not found.")
+            return NotFoundError(message=f"User with ID {user_id} not found.")
         for key, value in updated_data.items():
             if hasattr(user, key):
                 setattr(user, key, value)
@@ -94,4 +122,13 @@ class UserRepository(IUserRepository, ABC):
         return await User.get(user_id)
 
     async def get_user_by_email(self, email: str) -> RepositoryError | User:
-        return await User.find_one(User.email == email)
\ No newline at end of file
+        return await User.find_one(User.email == email)
+
+    async def get_user_by_username(self, username: str) -> User | None:
+        return await User.find_one(User.username == username)
+
+    async def get_user_fields_by_username(self, username: str, fields: FieldSet) -> RepositoryError | BaseModel:
+        user_data = await User.get_motor_collection().find_one({"username": username}, mongo_projection(User, fields))
+        if not user_data:
+            return NotFoundError(message=f"User with username {username} not found.")
+        return lean_model(User, fields).model_validate(user_data)
@@ -0,0 +1,100 @@
+import time
+from collections import deque
+from enum import Enum
+from typing import Deque, Tuple
+
+
+class CircuitState(str, Enum):
+    closed = "closed"
+    open = "open"
+    half_open = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """
+    Calls are rejected because the circuit is open.
+    """
+
+    def __init__(self, retry_after: float):
+        super().__init__("Database circuit is open")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Fails calls fast while a dependency is failing or slow.
+
+    The outcomes of the last ``window`` calls are kept. Once at least ``min_calls`` were seen, the circuit
+    opens when the share of failed calls reaches ``failure_rate`` or the share of calls slower than
+    ``slow_call_seconds`` reaches ``slow_rate``. After ``open_seconds`` it half-opens and lets
+    ``half_open_probes`` calls through: if they all succeed in time the circuit closes, the first failed or
+    slow probe opens it again.
+    """
+
+    def __init__(self, window: int, min_calls: int, failure_rate: float, slow_call_seconds: float,
+                 slow_rate: float, open_seconds: float, half_open_probes: int):
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.state = CircuitState.closed
+        self._outcomes: Deque[Tuple[bool, bool]] = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probes_started = 0
+        self._probes_passed = 0
+
+    def before_call(self) -> None:
+        """
+        :raises CircuitOpenError: If the call must not reach the dependency.
+        """
+        if self.state == CircuitState.open:
+            waited = time.monotonic() - self._opened_at
+            if waited < self.open_seconds:
+                raise CircuitOpenError(retry_after=self.open_seconds - waited)
+            self.state = CircuitState.half_open
+            self._probes_started = self._probes_passed = 0
+        if self.state == CircuitState.half_open:
+            if self._probes_started >= self.half_open_probes:
+                raise CircuitOpenError(retry_after=self.open_seconds)
+            self._probes_started += 1
+
+    def record(self, failed: bool, duration: float) -> None:
+        """
+        Record the outcome of a call let through by ``before_call``.
+        """
+        slow = duration >= self.slow_call_seconds
+        if self.state == CircuitState.half_open:
+            if failed or slow:
+                self._open()
+            else:
+                self._probes_passed += 1
+                if self._probes_passed >= self.half_open_probes:
+                    self.state = CircuitState.closed
+                    self._outcomes.clear()
+            return
+        if self.state == CircuitState.open:
+            return
+        self._outcomes.append((failed, slow))
+        calls = len(self._outcomes)
+        if calls < self.min_calls:
+            return
+        failures = sum(failed for failed, _ in self._outcomes)
+        slow_calls = sum(slow for _, slow in self._outcomes)
+        if failures / calls >= self.failure_rate or slow_calls / calls >= self.slow_rate:
+            self._open()
+
+    def as_dict(self) -> dict:
+        calls = len(self._outcomes)
+        return {
+            "state": self.state.value,
+            "calls": calls,
+            "failures": sum(failed for failed, _ in self._outcomes),
+            "slow_calls": sum(slow for _, slow in self._outcomes),
+        }
+
+    def _open(self) -> None:
+        self.state = CircuitState.open
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
@@ -0,0 +1,37 @@
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+# absolute deadline of the current request on the time.monotonic() clock, set by the deadline middleware
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """
+    The request ran out of time before or while waiting for the database.
+    """
+
+
+def start_deadline(seconds: Optional[float]):
+    return _deadline.set(None if seconds is None else time.monotonic() + seconds)
+
+
+def finish_deadline(token) -> None:
+    _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """
+    :return: Seconds left until the deadline of the current request, or None without a deadline.
+    """
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def check_deadline() -> None:
+    """
+    Fail fast instead of starting an operation the request has no time left for.
+    """
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded("Request deadline exceeded")
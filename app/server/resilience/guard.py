@@ -0,0 +1,74 @@
+import functools
+import inspect
+import time
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from app.server.config import config
+from app.server.resilience.circuit_breaker import CircuitBreaker
+from app.server.resilience.deadline import DeadlineExceeded, check_deadline
+
+# one breaker for the MongoDB deployment shared by every guarded repository
+database_breaker = CircuitBreaker(
+    window=config.CIRCUIT_WINDOW,
+    min_calls=config.CIRCUIT_MIN_CALLS,
+    failure_rate=config.CIRCUIT_FAILURE_RATE,
+    slow_call_seconds=config.CIRCUIT_SLOW_CALL_SECONDS,
+    slow_rate=config.CIRCUIT_SLOW_RATE,
+    open_seconds=config.CIRCUIT_OPEN_SECONDS,
+    half_open_probes=config.CIRCUIT_HALF_OPEN_PROBES,
+)
+
+
+# server error codes that mean the deployment cannot serve the operation right now: unreachable hosts, network
+# errors, shutdowns, elections and write concern timeouts
+UNAVAILABLE_CODES = {6, 7, 64, 89, 91, 189, 9001, 10107, 11600, 11602, 13435, 13436}
+
+
+def is_request_error(error: PyMongoError) -> bool:
+    """
+    Whether MongoDB rejected the operation itself, e.g. a duplicate key, rather than failed to serve it.
+
+    Such errors say nothing about the health of the database, so they do not count towards the circuit.
+    """
+    if not isinstance(error, OperationFailure):
+        return False
+    return error.code not in UNAVAILABLE_CODES and not error.has_error_label("RetryableWriteError")
+
+
+def guarded(function):
+    """
+    Run a database-bound coroutine under the request deadline and the database circuit breaker.
+
+    The deadline itself reaches MongoDB through ``pymongo.timeout``, entered by the deadline middleware;
+    here an exhausted deadline fails before the call and a timed out operation becomes DeadlineExceeded.
+    Timeouts are not counted as failures, only as slow calls when they took long, so a client sending a
+    tiny deadline cannot open the circuit for everyone. Nor are errors about the operation itself, such as
+    a duplicate key.
+    """
+    @functools.wraps(function)
+    async def wrapper(*args, **kwargs):
+        check_deadline()
+        database_breaker.before_call()
+        start = time.monotonic()
+        failed = False
+        try:
+            return await function(*args, **kwargs)
+        except PyMongoError as e:
+            if e.timeout:
+                raise DeadlineExceeded("Database operation exceeded the request deadline") from e
+            failed = not is_request_error(e)
+            raise
+        finally:
+            database_breaker.record(failed, time.monotonic() - start)
+    return wrapper
+
+
+def guarded_methods(cls):
+    """
+    Class decorator applying ``guarded`` to every public coroutine method defined on the class.
+    """
+    for attribute, value in list(vars(cls).items()):
+        if not attribute.startswith("_") and inspect.iscoroutinefunction(value):
+            setattr(cls, attribute, guarded(value))
+    return cls
@@ -0,0 +1,34 @@
+from typing import Annotated
+
+from beanie import PydanticObjectId
+from fastapi import APIRouter, HTTPException, status, Depends
+
+from app.server.config import config
+from app.server.dependencies import get_batch_repository
+from app.server.models.batch import BatchRequest, BatchResult
+from app.server.repositories.batch_repository import IBatchRepository
+from app.server.repositories.repository_error import ConflictError, RepositoryError
+
+router = APIRouter()
+
+
+#apply many library mutations at once; nothing is written unless every operation is valid
+@router.post("/{user_id}", response_model=BatchResult)
+async def execute_batch(
+        user_id: PydanticObjectId,
+        batch: BatchRequest,
+        repository: Annotated[IBatchRepository, Depends(get_batch_repository)],
+):
+    if len(batch.operations) > config.BATCH_MAX_OPERATIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A batch may contain at most {config.BATCH_MAX_OPERATIONS} operations",
+        )
+    result = await repository.execute(user_id, batch.operations, batch.transactional)
+    if isinstance(result, ConflictError):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=result.message)
+    if isinstance(result, RepositoryError):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=result.message)
+    if not result.applied:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=result.model_dump())
+    return result
@@ -1,59 +1,126 @@
+from typing import Annotated, Optional
+
 from beanie import PydanticObjectId
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, status, Depends, Query
 
+from app.server.config import config
+from app.server.dependencies import (
+    get_autocomplete_index,
+    get_book_repository,
+    get_quote_repository,
+    get_recommendation_engine,
+)
 from app.server.models.book import Book
-from app.server.models.user import User
+from app.server.models.fieldsets import FieldSetError, parse_fieldset
+from app.server.models.quote import Quote
+from app.server.models.recommendation import SimilarBooks
+from app.server.repositories.book_repository import IBookRepository
+from app.server.repositories.quote_repository import IQuoteRepository
+from app.server.repositories.repository_error import NotFoundError, RepositoryError
+from app.server.recommendations.engine import RecommendationEngine
+from app.server.search.autocomplete import AutocompleteIndex
+from app.server.profiling.spans import timed
 
 router = APIRouter()
+
+
+def error_status(error: RepositoryError) -> int:
+    return status.HTTP_404_NOT_FOUND if isinstance(error, NotFoundError) else status.HTTP_400_BAD_REQUEST
+
 #add new book to user
 @router.post("/", status_code=status.HTTP_201_CREATED)
-async def add_book_to_user(user_id: PydanticObjectId, book: Book):
-    user_data = await User.get(user_id)
-    if not user_data:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"User with id {user_id} not found",
-        )
-    # if any(book.isnb == isnb for book in user_data.userBooks):
-    #     raise HTTPException(
-    #         status_code=status.HTTP_400_BAD_REQUEST,
-    #         detail=f"Book with ISNB {isnb} is already added to the user."
-    #     )
-    if not user_data.userBooks:
-        raise HTTPException(
-            status_code=status.HTTP_100_CONTINUE
-        )
-    user_data.userBooks.append(book)
-    await user_data.save()
+@timed("route.add_book_to_user")
+async def add_book_to_user(
+        user_id: PydanticObjectId,
+        book: Book,
+        repository: Annotated[IBookRepository, Depends(get_book_repository)],
+):
+    error = await repository.add_book_to_user(user_id, book)
+    if error:
+        raise HTTPException(status_code=error_status(error), detail=error.message)
 
 
 @router.delete("/", status_code=status.HTTP_200_OK)
-async def delete_book_from_user(user_id: PydanticObjectId, book_id: PydanticObjectId):
-    user_data = await User.get(user_id)
-    if not user_data:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"User with id {user_id} not found",
-        )
-    book_to_remove = next((book for book in user_data.userBooks if book.id == book_id), None)
-    if not book_to_remove:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"No book with id {book_id} belongs to user",
-        )
-    user_data.userBooks.remove(book_to_remove)
-    await user_data.save()
+@timed("route.delete_book_from_user")
+async def delete_book_from_user(
+        user_id: PydanticObjectId,
+        book_id: PydanticObjectId,
+        repository: Annotated[IBookRepository, Depends(get_book_repository)],
+):
+    error = await repository.delete_book_from_user(user_id, book_id)
+    if error:
+        raise HTTPException(status_code=error_status(error), detail=error.message)
 
 @router.get("/{user_id}")
-async def get_all_books(user_id: PydanticObjectId):
-    user_data = await User.get(user_id)
+@timed("route.get_all_books")
+async def get_all_books(
+        user_id: PydanticObjectId,
+        repository: Annotated[IBookRepository, Depends(get_book_repository)],
+        fields: Optional[str] = None,
+):
+    if fields:
+        try:
+            fieldset = parse_fieldset(Book, fields)
+        except FieldSetError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        books = await repository.get_all_books_fields(user_id, fieldset)
+        if isinstance(books, RepositoryError):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=books.message)
+        return books
+    result = await repository.get_all_books(user_id)
+    if result.error:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=result.error.message)
+    return result.value
 
-    if not user_data:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail=f"User with id {user_id} not found"
-        )
-    if not user_data.userBooks:
+#quotes of one book, optionally reduced to the selected fields
+@router.get("/{user_id}/{book_id}/quotes")
+@timed("route.get_quotes_for_book")
+async def get_quotes_for_book(
+        user_id: PydanticObjectId,
+        book_id: PydanticObjectId,
+        repository: Annotated[IQuoteRepository, Depends(get_quote_repository)],
+        fields: Optional[str] = None,
+):
+    if fields:
+        try:
+            fieldset = parse_fieldset(Quote, fields)
+        except FieldSetError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        quotes = await repository.get_quotes_for_book_fields(user_id, book_id, fieldset)
+    else:
+        quotes = await repository.get_quotes_for_book(user_id, book_id)
+    if isinstance(quotes, RepositoryError):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=quotes.message)
+    return quotes
+
+#title/author prefix search over the user's books
+@router.get("/{user_id}/autocomplete")
+@timed("route.autocomplete_books")
+async def autocomplete_books(
+        user_id: PydanticObjectId,
+        index: Annotated[AutocompleteIndex, Depends(get_autocomplete_index)],
+        q: Annotated[str, Query(min_length=1)],
+        limit: Annotated[int, Query(ge=1, le=config.AUTOCOMPLETE_MAX_LIMIT)] = 10,
+):
+    books = await index.search(user_id, q, limit)
+    if isinstance(books, RepositoryError):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=books.message)
+    return books
+
+#books most often read, favourited and collected together with the given one, across all libraries
+@router.get("/{isnb}/similar", response_model=SimilarBooks)
+@timed("route.similar_books")
+async def similar_books(
+        isnb: str,
+        engine: Annotated[RecommendationEngine, Depends(get_recommendation_engine)],
+        limit: Annotated[int, Query(ge=1, le=config.RECOMMENDATIONS_TOP_K)] = 10,
+):
+    if config.REPOSITORY_BACKEND == "memory":
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Similar books need MongoDB")
+    similar = engine.similar(isnb, limit)
+    if similar is None:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail=f"User with id {user_id} does not have any books"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No recommendations for book with ISNB {isnb}",
         )
-    return user_data.userBooks
+    return SimilarBooks(isnb=isnb, similar=similar)
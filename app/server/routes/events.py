@@ -0,0 +1,69 @@
+import asyncio
+import json
+from typing import Annotated, AsyncIterator, Optional
+
+from beanie import PydanticObjectId
+from fastapi import APIRouter, Depends, Header, Request
+from fastapi.responses import StreamingResponse
+
+from app.server.config import config
+from app.server.dependencies import get_event_bus
+from app.server.events.event_bus import EventBus, LibraryEvent
+
+router = APIRouter()
+
+RESYNC = "resync"
+
+
+def format_event(event: LibraryEvent) -> str:
+    return f"id: {event.id}\nevent: {event.type}\ndata: {json.dumps(event.data)}\n\n"
+
+
+def format_resync(reason: str) -> str:
+    return f"event: {RESYNC}\ndata: {json.dumps({'reason': reason})}\n\n"
+
+
+async def event_stream(request: Request, bus: EventBus, user_id: PydanticObjectId,
+                       last_event_id: Optional[str]) -> AsyncIterator[str]:
+    # subscribe before replaying so nothing published in between is lost
+    subscription = bus.subscribe(user_id)
+    try:
+        yield f"retry: {config.EVENTS_RETRY_MILLISECONDS}\n\n"
+        replayed = set()
+        if last_event_id:
+            missed = bus.replay(user_id, last_event_id)
+            if missed is None:
+                yield format_resync("history_expired")
+            else:
+                for event in missed:
+                    replayed.add(event.id)
+                    yield format_event(event)
+        while not await request.is_disconnected():
+            if subscription.overflowed:
+                # the client could not keep up; it reconnects and refetches instead of the server buffering
+                yield format_resync("slow_consumer")
+                return
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), config.EVENTS_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": heartbeat\n\n"
+                continue
+            if event.id not in replayed:
+                yield format_event(event)
+    finally:
+        bus.unsubscribe(subscription)
+
+
+#server-sent events of changes to the user's library
+@router.get("/{user_id}")
+async def subscribe_to_events(
+        request: Request,
+        user_id: PydanticObjectId,
+        bus: Annotated[EventBus, Depends(get_event_bus)],
+        last_event_id: Annotated[Optional[str], Header()] = None,
+):
+    return StreamingResponse(
+        event_stream(request, bus, user_id, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,49 @@
+from typing import Annotated
+
+from beanie import PydanticObjectId
+from fastapi import APIRouter, HTTPException, status, Depends
+
+from app.server.dependencies import get_job_queue, get_job_repository
+from app.server.jobs.job_queue import JobQueue
+from app.server.models.job import Job, JobProgress, JobRequest
+from app.server.models.user import User
+from app.server.repositories.job_repository import IJobRepository
+from app.server.repositories.repository_error import RepositoryError
+from app.server.routes.users import get_current_user
+
+router = APIRouter()
+
+
+async def get_own_job(
+        job_id: PydanticObjectId,
+        user: Annotated[User, Depends(get_current_user)],
+        repository: Annotated[IJobRepository, Depends(get_job_repository)],
+) -> Job:
+    job = await repository.get_job(job_id)
+    # jobs of other users are reported as missing rather than forbidden, so their ids are not disclosed
+    if isinstance(job, RepositoryError) or job.user_id != str(user.id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Job with id {job_id} not found")
+    return job
+
+
+#queue a background job on the library of the signed-in user
+@router.post("/", status_code=status.HTTP_202_ACCEPTED, response_model=Job)
+async def submit_job(
+        job_request: JobRequest,
+        user: Annotated[User, Depends(get_current_user)],
+        queue: Annotated[JobQueue, Depends(get_job_queue)],
+):
+    job = await queue.submit(job_request, user.id)
+    if isinstance(job, RepositoryError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=job.message)
+    return job
+
+
+@router.get("/{job_id}", response_model=Job)
+async def get_job(job: Annotated[Job, Depends(get_own_job)]):
+    return job
+
+
+@router.get("/{job_id}/progress", response_model=JobProgress)
+async def get_job_progress(job: Annotated[Job, Depends(get_own_job)]):
+    return JobProgress(status=job.status, progress=job.progress, message=job.message)
@@ -0,0 +1,43 @@
+from datetime import datetime, timezone
+from typing import Annotated, Optional
+
+from beanie import PydanticObjectId
+from fastapi import APIRouter, HTTPException, status, Depends, Query
+
+from app.server.config import config
+from app.server.dependencies import get_timeline_repository
+from app.server.models.timeline import TimelineCursor, TimelinePage
+from app.server.repositories.repository_error import RepositoryError
+from app.server.repositories.timeline_repository import ITimelineRepository
+
+router = APIRouter()
+
+
+def _naive_utc(value: datetime) -> datetime:
+    # stored dates are naive UTC; bounds given with an offset are converted, those without one taken as UTC
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+#books started, books finished and quotes added between two dates
+@router.get("/{user_id}", response_model=TimelinePage)
+async def get_timeline(
+        user_id: PydanticObjectId,
+        repository: Annotated[ITimelineRepository, Depends(get_timeline_repository)],
+        start: datetime,
+        end: datetime,
+        limit: Annotated[int, Query(ge=1, le=config.TIMELINE_MAX_LIMIT)] = 50,
+        cursor: Optional[str] = None,
+):
+    start, end = _naive_utc(start), _naive_utc(end)
+    if start >= end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="start must be before end")
+    try:
+        after = TimelineCursor.decode(cursor) if cursor else None
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    result = await repository.get_timeline(user_id, start, end, limit, after)
+    if isinstance(result, RepositoryError):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=result.message)
+    return result
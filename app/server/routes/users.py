@@ -1,4 +1,5 @@
-from typing import Annotated, List
+from functools import lru_cache
+from typing import Annotated, List, Optional
 
 from beanie import PydanticObjectId
 from fastapi import APIRouter, HTTPException, status, Depends
@@ -9,25 +10,39 @@ import logging
 
 from jwt import InvalidTokenError
 from pydantic import BaseModel, EmailStr
-from pymongo.errors import DuplicateKeyError
 
-from app.server.models.user import User
-from passlib.context import CryptContext
+from app.server.dependencies import get_refresh_token_repository, get_user_repository
+from app.server.models.fieldsets import FieldSetError, parse_fieldset
+from app.server.models.refresh_token import RefreshRequest
+from app.server.models.user import User, Token, LoginData, SignupData
+from app.server.repositories.refresh_token_repository import IRefreshTokenRepository
+from app.server.repositories.repository_error import RepositoryError
+from app.server.repositories.user_repository import IUserRepository
 from datetime import datetime, timedelta
 from app.server.config import config
+from app.server.profiling.spans import timed
 
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 logging.basicConfig(level=logging.INFO)
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
-async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]) -> User:
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+@lru_cache(maxsize=1)
+def get_pwd_context():
+    # passlib loads the bcrypt backend on import, so it is deferred until the first signup or login
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+credentials_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+
+async def get_current_username(token: Annotated[str, Depends(oauth2_scheme)]) -> str:
     try:
         payload = jwt.decode(token, config.SECRET_KEY, algorithms="HS256")
         username: str = payload.get("sub")
@@ -35,18 +50,31 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]) -> Use
             raise credentials_exception
     except InvalidTokenError:
         raise credentials_exception
-    user = await User.find_one({"username": username})
+    return username
+
+
+@timed("auth.get_current_user")
+async def get_current_user(
+        username: Annotated[str, Depends(get_current_username)],
+        repository: Annotated[IUserRepository, Depends(get_user_repository)],
+) -> User:
+    user = await repository.get_user_by_username(username)
     if user is None:
         raise credentials_exception
     return user
 
 
 @router.post("/signup", status_code=status.HTTP_201_CREATED, response_model=Token)
-async def create_user(signup_data: SignupData):
-    user_with_username = await User.find_one({"username": signup_data.username})
+@timed("route.create_user")
+async def create_user(
+        signup_data: SignupData,
+        repository: Annotated[IUserRepository, Depends(get_user_repository)],
+        refresh_tokens: Annotated[IRefreshTokenRepository, Depends(get_refresh_token_repository)],
+):
+    user_with_username = await repository.get_user_by_username(signup_data.username)
     if user_with_username is not None:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Username already taken")
-    user_with_email = await User.find_one({"email": signup_data.email})
+    user_with_email = await repository.get_user_by_email(signup_data.email)
     if user_with_email is not None:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already taken")
     hashed_password = hash_password(signup_data.password)
@@ -59,35 +87,89 @@ async def create_user(signup_data: SignupData):
         collections=[],
         quotes=[],
         favourites=[])
-    await User.insert_one(user)
-    access_token = create_access_token(data={"sub": user.username})
-    return {"access_token": access_token, "token_type": "bearer"}
+    error = await repository.add_user(user)
+    if error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error.message)
+    return await issue_tokens(user.username, refresh_tokens)
 @router.post("/login", status_code=status.HTTP_200_OK, response_model=Token)
-async def login(user: LoginData):
+@timed("route.login")
+async def login(
+        user: LoginData,
+        repository: Annotated[IUserRepository, Depends(get_user_repository)],
+        refresh_tokens: Annotated[IRefreshTokenRepository, Depends(get_refresh_token_repository)],
+):
+    logging.info("Attempting to find user by email")
+    user_dict = await repository.get_user_by_email(user.email)
+    if not user_dict or isinstance(user_dict, RepositoryError):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+
     try:
-        logging.info("Attempting to find user by email")
-        user_dict = await User.find_one({"email": user.email})
-        if not user_dict:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
-
-        if not verify_password(user.password, user_dict.password):
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
-        logging.info(user_dict.id)
-        access_token = create_access_token(data={"sub": user_dict.username})
-
-        return {"access_token": access_token, "token_type": "bearer"}
-    except Exception as e:
-        raise HTTPException(status_code=401)
+        verified = verify_password(user.password, user_dict.password)
+    except ValueError:
+        # a stored hash passlib cannot read never matches
+        verified = False
+    if not verified:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    logging.info(user_dict.id)
+    return await issue_tokens(user_dict.username, refresh_tokens)
+#exchange a refresh token for new tokens without the password, i.e. without bcrypt
+@router.post("/token/refresh", status_code=status.HTTP_200_OK, response_model=Token)
+@timed("route.refresh_token")
+async def refresh_token(
+        request: RefreshRequest,
+        refresh_tokens: Annotated[IRefreshTokenRepository, Depends(get_refresh_token_repository)],
+):
+    issued = await refresh_tokens.rotate(request.refresh_token)
+    if isinstance(issued, RepositoryError):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=issued.message)
+    return Token(
+        access_token=create_access_token(data={"sub": issued.username}),
+        token_type="bearer",
+        refresh_token=issued.refresh_token,
+    )
+#revoke a refresh token and every token rotated from it
+@router.post("/token/revoke", status_code=status.HTTP_204_NO_CONTENT)
+@timed("route.revoke_token")
+async def revoke_token(
+        request: RefreshRequest,
+        refresh_tokens: Annotated[IRefreshTokenRepository, Depends(get_refresh_token_repository)],
+):
+    error = await refresh_tokens.revoke(request.refresh_token)
+    if error:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=error.message)
 @router.get("/", status_code=status.HTTP_200_OK)
-async def read_user(current_user: Annotated[User, Depends(get_current_user)]):
-    return current_user
+@timed("route.read_user")
+async def read_user(
+        username: Annotated[str, Depends(get_current_username)],
+        repository: Annotated[IUserRepository, Depends(get_user_repository)],
+        fields: Optional[str] = None,
+):
+    if fields:
+        try:
+            fieldset = parse_fieldset(User, fields, hidden=frozenset({"password"}))
+        except FieldSetError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        user = await repository.get_user_fields_by_username(username, fieldset)
+        if isinstance(user, RepositoryError):
+            raise credentials_exception
+        return user
+    return await get_current_user(username, repository)
+
+async def issue_tokens(username: str, refresh_tokens: IRefreshTokenRepository) -> Token:
+    issued = await refresh_tokens.issue(username)
+    return Token(
+        access_token=create_access_token(data={"sub": username}),
+        token_type="bearer",
+        refresh_token=issued.refresh_token,
+    )
+
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
+        expire = datetime.utcnow() + timedelta(minutes=config.ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, config.SECRET_KEY, algorithm="HS256")
     return encoded_jwt
@@ -101,9 +183,11 @@ def decode_access_token(token: str):
         return None
 
 
+@timed("auth.hash_password")
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 
+@timed("auth.verify_password")
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
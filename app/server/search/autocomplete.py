@@ -0,0 +1,231 @@
+import asyncio
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import Callable, Dict, List, Tuple
+
+from beanie import PydanticObjectId
+
+from app.server.models.book import Book
+from app.server.repositories.book_repository import IBookRepository
+from app.server.repositories.repository_error import EmptyLibraryError, RepositoryError
+
+TITLE = "title"
+AUTHOR = "author_name"
+
+
+def normalize(text: str) -> str:
+    """
+    Fold a string into its search key: accents removed, case folded and whitespace collapsed.
+
+    :param text: The text to normalize.
+    :return: The normalized key.
+    """
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.casefold().split())
+
+
+def _word_suffixes(key: str) -> List[str]:
+    # "the name of the rose" -> every suffix starting at a word, so "rose" and "name of" both match
+    suffixes = [key]
+    for index, char in enumerate(key):
+        if char == " ":
+            suffixes.append(key[index + 1:])
+    return suffixes
+
+
+def book_key(book: Book) -> str:
+    return str(book.id) if book.id is not None else book.isnb
+
+
+class UserPrefixIndex:
+    """
+    Prefix index over the titles and author names of one user's books.
+
+    Entries are ``(key, field, book_key)`` tuples kept in a sorted list, so a prefix lookup is a binary
+    search followed by a scan over the matching range.
+    """
+
+    def __init__(self):
+        self._entries: List[Tuple[str, str, str]] = []
+        self._entries_by_book: Dict[str, List[Tuple[str, str, str]]] = {}
+        self._books: Dict[str, dict] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @classmethod
+    def build(cls, books: List[Book]) -> "UserPrefixIndex":
+        index = cls()
+        for book in books:
+            index._entries.extend(index._register(book))
+        index._entries.sort()
+        return index
+
+    def add(self, book: Book) -> None:
+        self.remove(book_key(book))
+        for entry in self._register(book):
+            insort(self._entries, entry)
+
+    def remove(self, key: str) -> None:
+        for entry in self._entries_by_book.pop(key, ()):
+            position = bisect_left(self._entries, entry)
+            if position < len(self._entries) and self._entries[position] == entry:
+                del self._entries[position]
+        self._books.pop(key, None)
+
+    def search(self, prefix: str, limit: int) -> List[dict]:
+        """
+        Find the books whose title or author name has a word starting with the prefix.
+
+        :param prefix: The raw text typed by the user.
+        :param limit: The maximum number of books to return.
+        :return: The matching books in key order.
+        """
+        query = normalize(prefix)
+        if not query:
+            return []
+        results = []
+        seen = set()
+        position = bisect_left(self._entries, (query,))
+        while position < len(self._entries) and len(results) < limit:
+            key, field, book = self._entries[position]
+            if not key.startswith(query):
+                break
+            if book not in seen:
+                seen.add(book)
+                results.append({**self._books[book], "matched": field})
+            position += 1
+        return results
+
+    def _register(self, book: Book) -> List[Tuple[str, str, str]]:
+        key = book_key(book)
+        entries = []
+        for field, value in ((TITLE, book.description.title), (AUTHOR, book.description.author_name)):
+            for suffix in _word_suffixes(normalize(value)):
+                entries.append((suffix, field, key))
+        self._entries_by_book[key] = entries
+        self._books[key] = {
+            "id": str(book.id) if book.id is not None else None,
+            "isnb": book.isnb,
+            "title": book.description.title,
+            "author_name": book.description.author_name,
+        }
+        return entries
+
+
+class AutocompleteIndex:
+    """
+    Per-user prefix indexes, built lazily from the book repository and evicted least recently used
+    first once the total number of entries exceeds ``max_entries``.
+
+    Writes made through this process are applied to the loaded indexes, including those still being built.
+    Writes made by other processes are not seen, so an index is rebuilt once it is ``ttl_seconds`` old.
+    """
+
+    def __init__(self, repository: IBookRepository, max_entries: int, ttl_seconds: float):
+        self.repository = repository
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._indexes: OrderedDict[str, UserPrefixIndex] = OrderedDict()
+        self._expires_at: Dict[str, float] = {}
+        self._build_locks: Dict[str, asyncio.Lock] = {}
+        # changes made while a user's index is being built, applied to it once it is built
+        self._pending: Dict[str, List[Callable[[UserPrefixIndex], None]]] = {}
+        self._total_entries = 0
+
+    async def search(self, user_id: PydanticObjectId, prefix: str, limit: int) -> RepositoryError | List[dict]:
+        index = await self._get_or_build(str(user_id))
+        if isinstance(index, RepositoryError):
+            return index
+        return index.search(prefix, limit)
+
+    def loaded(self, user_id: PydanticObjectId) -> UserPrefixIndex | None:
+        """
+        :param user_id: The ID of the user.
+        :return: The user's index if it is currently in memory, otherwise None.
+        """
+        return self._indexes.get(str(user_id))
+
+    def book_added(self, user_id: PydanticObjectId, book: Book) -> None:
+        self._apply(str(user_id), lambda index: index.add(book))
+
+    def book_removed(self, user_id: PydanticObjectId, book_id: PydanticObjectId) -> None:
+        self._apply(str(user_id), lambda index: index.remove(str(book_id)))
+
+    def book_replaced(self, user_id: PydanticObjectId, book_id: PydanticObjectId, book: Book) -> None:
+        def replace(index: UserPrefixIndex):
+            index.remove(str(book_id))
+            index.add(book)
+        self._apply(str(user_id), replace)
+
+    def evict(self, user_id: PydanticObjectId) -> None:
+        self._evict(str(user_id))
+
+    async def _get_or_build(self, user_id: str) -> RepositoryError | UserPrefixIndex:
+        index = self._indexes.get(user_id)
+        if index is not None and self._expires_at[user_id] < time.monotonic():
+            self._evict(user_id)
+            index = None
+        if index is not None:
+            self._indexes.move_to_end(user_id)
+            return index
+        lock = self._build_locks.setdefault(user_id, asyncio.Lock())
+        try:
+            async with lock:
+                index = self._indexes.get(user_id)
+                if index is None:
+                    index = await self._build(user_id)
+        finally:
+            self._build_locks.pop(user_id, None)
+        return index
+
+    async def _build(self, user_id: str) -> RepositoryError | UserPrefixIndex:
+        # writes from here on may be missing from the books read below; they are recorded and replayed,
+        # which is harmless for those that are not, since every change is idempotent
+        pending = self._pending.setdefault(user_id, [])
+        try:
+            result = await self.repository.get_all_books(PydanticObjectId(user_id))
+            # an empty library gets an empty index; any other error, e.g. an unknown user, is not cached
+            if result.error and not isinstance(result.error, EmptyLibraryError):
+                return result.error
+            # tokenising a large library takes long enough to stall other requests
+            index = await asyncio.to_thread(UserPrefixIndex.build, result.value or [])
+        finally:
+            del self._pending[user_id]
+        for change in pending:
+            change(index)
+        self._indexes[user_id] = index
+        self._expires_at[user_id] = time.monotonic() + self.ttl_seconds
+        self._total_entries += len(index)
+        self._shrink(keep=user_id)
+        return index
+
+    def _apply(self, user_id: str, change: Callable[[UserPrefixIndex], None]) -> None:
+        index = self._indexes.get(user_id)
+        if index is None:
+            # indexes that are not loaded are built from the repository on their next lookup
+            pending = self._pending.get(user_id)
+            if pending is not None:
+                pending.append(change)
+            return
+        before = len(index)
+        change(index)
+        self._total_entries += len(index) - before
+        self._shrink(keep=user_id)
+
+    def _shrink(self, keep: str) -> None:
+        while self._total_entries > self.max_entries and len(self._indexes) > 1:
+            user_id = next(iter(self._indexes))
+            if user_id == keep:
+                self._indexes.move_to_end(user_id)
+                continue
+            self._evict(user_id)
+
+    def _evict(self, user_id: str) -> None:
+        index = self._indexes.pop(user_id, None)
+        if index is not None:
+            self._total_entries -= len(index)
+            del self._expires_at[user_id]
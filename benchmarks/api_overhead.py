@@ -0,0 +1,122 @@
+"""
+Framework overhead benchmark.
+
+Runs the API on the in-memory repositories (``REPOSITORY_BACKEND = "memory"``, no read cache) and times
+requests sent through the ASGI interface, so no database or network is involved. For every endpoint the
+time spent inside the repository, taken from the repository spans, is reported next to the rest: routing,
+validation, dependency injection, the wrappers and serialisation.
+
+Usage: python benchmarks/api_overhead.py [--books 500] [--quotes 200] [--runs 500]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from app.server.config import config  # noqa: E402
+
+# read before the repositories are decorated and built
+config.REPOSITORY_BACKEND = "memory"
+config.CACHE_BACKEND = "none"
+config.PROFILING_SPANS_ENABLED = True
+
+import httpx  # noqa: E402
+
+from app.server.app import app  # noqa: E402
+from app.server.dependencies import get_user_repository  # noqa: E402
+from app.server.models.book import Book  # noqa: E402
+from app.server.models.quote import Quote  # noqa: E402
+from app.server.models.user import User  # noqa: E402
+from app.server.profiling.spans import span_stats  # noqa: E402
+from app.server.routes.users import create_access_token  # noqa: E402
+
+
+def library_user(books: int, quotes: int) -> User:
+    start = datetime(2020, 1, 1)
+    user_books = [
+        Book.model_validate({
+            "isnb": f"978-{book:09d}",
+            "start_read_date": start + timedelta(days=book),
+            "end_read_date": start + timedelta(days=book + 14),
+            "description": {
+                "title": f"Title {book}",
+                "description": "A book about books. " * 10,
+                "author_name": f"Author {book % 300}",
+                "publisher_name": f"Publisher {book % 40}",
+                "publishing_date": start - timedelta(days=book),
+                "cover_url": f"https://covers.example/{book}.jpg",
+            },
+            "rating": book % 5 + 1,
+        })
+        for book in range(books)
+    ]
+    return User(
+        username="reader",
+        email="reader@example.com",
+        password="$2b$12$" + "x" * 53,
+        created_at=start,
+        userBooks=user_books,
+        collections=[],
+        quotes=[
+            Quote(book_id=str(user_books[0].id), text="Quoted words " * 5, created_at=start + timedelta(hours=quote))
+            for quote in range(quotes)
+        ],
+        favourites=[],
+    )
+
+
+def repository_ms() -> float:
+    return sum(stats["total_ms"] for name, stats in span_stats.as_dict().items() if name.startswith("Memory"))
+
+
+async def measure(client: httpx.AsyncClient, url: str, runs: int, headers: dict) -> tuple:
+    response = await client.get(url, headers=headers)
+    assert response.status_code == 200, response.text
+    timings = []
+    in_repository = repository_ms()
+    for _ in range(runs):
+        started = time.perf_counter()
+        await client.get(url, headers=headers)
+        timings.append(time.perf_counter() - started)
+    in_repository = (repository_ms() - in_repository) / runs
+    return statistics.median(timings) * 1000, in_repository
+
+
+async def run(args) -> None:
+    await app.router.startup()
+    user = library_user(args.books, args.quotes)
+    await get_user_repository().add_user(user)
+    user_id, book_id = user.id, user.userBooks[0].id
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': user.username})}"}
+    endpoints = [
+        f"/books/{user_id}",
+        f"/books/{user_id}?fields=isnb,description.title",
+        f"/books/{user_id}/{book_id}/quotes",
+        "/users/?fields=username,email",
+    ]
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        print(f"user with {args.books} books and {args.quotes} quotes, {args.runs} requests per endpoint")
+        for url in endpoints:
+            total, in_repository = await measure(client, url, args.runs, headers)
+            print(f"GET {url}: {total:.3f} ms, repository {in_repository:.3f} ms, rest {total - in_repository:.3f} ms")
+    await app.router.shutdown()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--books", type=int, default=500)
+    parser.add_argument("--quotes", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=500)
+    asyncio.run(run(parser.parse_args()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+Build-time benchmark for the "similar books" engine.
+
+Generates a synthetic catalogue with skewed book popularity, then times a full rebuild over the
+requested number of user-book pairs and an incremental refresh of a few changed users.
+
+Usage: python benchmarks/recommendations_build.py [--pairs 1000000] [--books 100000] [--books-per-user 50]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from app.server.config import config  # noqa: E402
+from app.server.models.recommendation import LibraryItems  # noqa: E402
+from app.server.recommendations.engine import RecommendationEngine  # noqa: E402
+from app.server.repositories.library_items_repository import ILibraryItemsRepository  # noqa: E402
+
+
+class SyntheticLibraryItems(ILibraryItemsRepository):
+    def __init__(self, users: dict):
+        self.users = users
+
+    async def get_library_items(self, user_ids=None):
+        ids = self.users if user_ids is None else [user_id for user_id in user_ids if user_id in self.users]
+        return [self.users[user_id] for user_id in ids]
+
+
+def generate(pairs: int, books: int, books_per_user: int, seed: int) -> dict:
+    rng = np.random.default_rng(seed)
+    popularity = 1.0 / np.arange(1, books + 1) ** 0.8
+    popularity /= popularity.sum()
+    libraries = rng.choice(books, size=(pairs // books_per_user, books_per_user), p=popularity)
+    users = {}
+    for user, library in enumerate(libraries.tolist()):
+        isnbs = [f"isnb-{book}" for book in dict.fromkeys(library)]
+        users[f"user-{user}"] = LibraryItems(
+            user_id=f"user-{user}",
+            books=isnbs,
+            favourites=isnbs[:books_per_user // 10],
+            collected=isnbs[:books_per_user // 3],
+        )
+    return users
+
+
+async def run(args) -> None:
+    started = time.perf_counter()
+    users = generate(args.pairs, args.books, args.books_per_user, args.seed)
+    print(f"generated {len(users)} users, {sum(len(items.books) for items in users.values())} pairs in {time.perf_counter() - started:.1f} s")
+
+    engine = RecommendationEngine(
+        SyntheticLibraryItems(users),
+        top_k=config.RECOMMENDATIONS_TOP_K,
+        block_size=config.RECOMMENDATIONS_BLOCK_SIZE,
+        refresh_interval=config.RECOMMENDATIONS_REFRESH_SECONDS,
+        full_rebuild_every=config.RECOMMENDATIONS_FULL_REBUILD_EVERY,
+    )
+    started = time.perf_counter()
+    await engine.rebuild()
+    print(f"full rebuild: {time.perf_counter() - started:.2f} s, {len(engine.index)} books indexed")
+
+    # a few users change their libraries; only the books they touch are recomputed
+    changed = list(users)[:args.changed_users]
+    replacement = generate(args.changed_users * args.books_per_user, args.books, args.books_per_user, args.seed + 1)
+    for user_id, items in zip(changed, replacement.values()):
+        users[user_id] = items.model_copy(update={"user_id": user_id})
+        engine._dirty.add(user_id)
+    started = time.perf_counter()
+    await engine.refresh()
+    print(f"incremental refresh of {len(changed)} users: {time.perf_counter() - started:.2f} s")
+
+    started = time.perf_counter()
+    for book in range(10_000):
+        engine.similar(f"isnb-{book}", 10)
+    print(f"lookup: {(time.perf_counter() - started) / 10_000 * 1e6:.1f} us per request")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pairs", type=int, default=1_000_000)
+    parser.add_argument("--books", type=int, default=100_000)
+    parser.add_argument("--books-per-user", type=int, default=50)
+    parser.add_argument("--changed-users", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(run(parser.parse_args()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
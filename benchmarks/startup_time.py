@@ -0,0 +1,63 @@
+"""
+Startup-time benchmark for the API.
+
+Imports ``app.server.app`` in fresh interpreters and reports the median import time. The run fails if
+the median exceeds the budget or if one of the lazily loaded stacks is pulled in at import time.
+
+Usage: python benchmarks/startup_time.py [--runs 7] [--budget-ms 1500]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# modules that must only be imported on first use. beanie, and with it motor and pymongo, is not among them:
+# the document models subclass beanie.Document, so every route module needs it at import time; what is
+# deferred for the database is the connection and the index creation, done after startup
+LAZY_MODULES = ["passlib", "bcrypt", "numpy", "scipy"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app.server.app
+elapsed = time.perf_counter() - start
+print(json.dumps({"ms": elapsed * 1000, "modules": sorted(sys.modules)}))
+"""
+
+
+def measure_once() -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--budget-ms", type=float, default=1500.0)
+    args = parser.parse_args()
+
+    samples = [measure_once() for _ in range(args.runs)]
+    timings = [sample["ms"] for sample in samples]
+    median = statistics.median(timings)
+    print(f"import app.server.app: median {median:.1f} ms, min {min(timings):.1f} ms, max {max(timings):.1f} ms")
+
+    loaded = set(samples[-1]["modules"])
+    eager = [name for name in LAZY_MODULES if name in loaded]
+    failed = False
+    if eager:
+        print(f"FAIL: imported eagerly at startup: {', '.join(eager)}")
+        failed = True
+    if median > args.budget_ms:
+        print(f"FAIL: median import time {median:.1f} ms exceeds budget {args.budget_ms:.1f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
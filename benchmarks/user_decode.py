@@ -0,0 +1,149 @@
+"""
+Decode benchmark for stored users.
+
+Builds a user document shaped like the ones in the users collection and times loading it into ``User``,
+whose books, quotes and collections are plain embedded models, against the previous shape where every
+sub-document was a beanie Document. Needs a MongoDB at ``config.DATABASE_URL`` to bind the documents.
+
+Usage: python benchmarks/user_decode.py [--books 2000] [--quotes 1000] [--collections 50] [--runs 20]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from beanie import Document, init_beanie  # noqa: E402
+from bson import ObjectId  # noqa: E402
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+
+from app.server.config import config  # noqa: E402
+from app.server.models.user import User  # noqa: E402
+
+
+# the previous shape of the models, every sub-document a beanie Document
+class DocumentDescription(Document):
+    title: str
+    description: str
+    author_name: str
+    publisher_name: str
+    publishing_date: datetime
+    cover_url: str
+
+
+class DocumentBook(Document):
+    isnb: str
+    start_read_date: datetime
+    end_read_date: datetime
+    description: DocumentDescription
+    rating: int
+
+
+class DocumentCollection(Document):
+    collection_name: str
+    books: List[str]
+
+
+class DocumentQuote(Document):
+    book_id: str
+    text: str
+    created_at: datetime
+
+
+class DocumentUser(Document):
+    username: str
+    email: str
+    password: str
+    created_at: datetime
+    userBooks: List[DocumentBook]
+    collections: List[DocumentCollection]
+    quotes: List[DocumentQuote]
+    favourites: List[str]
+
+
+def stored_user(books: int, quotes: int, collections: int) -> dict:
+    start = datetime(2020, 1, 1)
+    user_books = [
+        {
+            "_id": ObjectId(),
+            "isnb": f"978-{book:09d}",
+            "start_read_date": start + timedelta(days=book),
+            "end_read_date": start + timedelta(days=book + 14),
+            "description": {
+                "title": f"Title {book}",
+                "description": "A book about books. " * 10,
+                "author_name": f"Author {book % 300}",
+                "publisher_name": f"Publisher {book % 40}",
+                "publishing_date": start - timedelta(days=book),
+                "cover_url": f"https://covers.example/{book}.jpg",
+            },
+            "rating": book % 5 + 1,
+        }
+        for book in range(books)
+    ]
+    return {
+        "_id": ObjectId(),
+        "username": "reader",
+        "email": "reader@example.com",
+        "password": "$2b$12$" + "x" * 53,
+        "created_at": start,
+        "userBooks": user_books,
+        "collections": [
+            {"_id": ObjectId(), "collection_name": f"Shelf {shelf}", "books": [str(book["_id"]) for book in user_books[shelf::collections]]}
+            for shelf in range(collections)
+        ],
+        "quotes": [
+            {"_id": ObjectId(), "book_id": str(user_books[quote % books]["_id"]), "text": "Quoted words " * 5, "created_at": start + timedelta(hours=quote)}
+            for quote in range(quotes)
+        ],
+        "favourites": [str(book["_id"]) for book in user_books[::20]],
+    }
+
+
+def measure(decode, document: dict, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        decode(document)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+async def bind_documents() -> None:
+    client = AsyncIOMotorClient(config.DATABASE_URL)
+    await init_beanie(
+        database=client[config.DATABASE_NAME],
+        document_models=[User, DocumentUser, DocumentBook, DocumentCollection, DocumentQuote, DocumentDescription],
+        skip_indexes=True,
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--books", type=int, default=2000)
+    parser.add_argument("--quotes", type=int, default=1000)
+    parser.add_argument("--collections", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    asyncio.run(bind_documents())
+    document = stored_user(args.books, args.quotes, args.collections)
+    user = User.model_validate(document)
+    assert str(user.userBooks[0].id) == str(document["userBooks"][0]["_id"])
+
+    nested_documents = measure(DocumentUser.model_validate, document, args.runs)
+    embedded_models = measure(User.model_validate, document, args.runs)
+    print(f"user with {args.books} books, {args.quotes} quotes, {args.collections} collections")
+    print(f"nested beanie documents: {nested_documents:.2f} ms")
+    print(f"embedded models: {embedded_models:.2f} ms ({nested_documents / embedded_models:.1f}x faster)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,16 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture(scope="session", autouse=True)
+def bound_models():
+    # documents can only be created once beanie knows their collections; nothing connects to MongoDB
+    from app.server.db.database import bind_models
+
+    asyncio.run(bind_models())
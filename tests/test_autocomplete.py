@@ -0,0 +1,167 @@
+import asyncio
+from datetime import datetime
+
+from beanie import PydanticObjectId
+
+from app.server.models.book import Book
+from app.server.repositories.repository_error import EmptyLibraryError, NotFoundError, RepositoryError, Result
+from app.server.search.autocomplete import AutocompleteIndex, UserPrefixIndex, normalize
+
+
+def make_book(title: str, author: str, isnb: str = "978-0") -> Book:
+    return Book.model_validate({
+        "isnb": isnb,
+        "start_read_date": datetime(2024, 1, 1),
+        "end_read_date": datetime(2024, 1, 10),
+        "rating": 4,
+        "description": {
+            "title": title,
+            "description": "",
+            "author_name": author,
+            "publisher_name": "",
+            "publishing_date": datetime(2000, 1, 1),
+            "cover_url": "",
+        },
+    })
+
+
+class BooksByUser:
+    def __init__(self, results: dict):
+        self.results = results
+        self.calls = 0
+
+    async def get_all_books(self, user_id: PydanticObjectId) -> Result:
+        self.calls += 1
+        return self.results[str(user_id)]
+
+
+def test_normalize_folds_case_accents_and_whitespace():
+    assert normalize("  Les  Misérables ") == "les miserables"
+
+
+def test_search_matches_any_word_of_title_or_author():
+    rose = make_book("The Name of the Rose", "Umberto Eco")
+    dune = make_book("Dune", "Frank Herbert")
+    index = UserPrefixIndex.build([rose, dune])
+
+    assert [hit["title"] for hit in index.search("ros", 10)] == ["The Name of the Rose"]
+    assert [hit["matched"] for hit in index.search("herb", 10)] == ["author_name"]
+    assert [hit["title"] for hit in index.search("NAME OF", 10)] == ["The Name of the Rose"]
+    assert index.search("", 10) == []
+
+
+def test_search_lists_each_book_once_and_respects_the_limit():
+    books = [make_book(f"Dune {number}", "Dune Writer", isnb=str(number)) for number in range(5)]
+    index = UserPrefixIndex.build(books)
+
+    hits = index.search("dune", 3)
+    assert len(hits) == 3
+    assert len({hit["id"] for hit in hits}) == 3
+
+
+def test_add_and_remove_keep_the_index_consistent():
+    dune = make_book("Dune", "Frank Herbert")
+    index = UserPrefixIndex.build([dune])
+    emma = make_book("Emma", "Jane Austen")
+
+    index.add(emma)
+    assert [hit["title"] for hit in index.search("em", 10)] == ["Emma"]
+    size = len(index)
+    index.add(emma)
+    assert len(index) == size
+
+    index.remove(str(dune.id))
+    assert index.search("dune", 10) == []
+    assert len(index) == size - len(UserPrefixIndex.build([dune]))
+
+
+def test_unknown_user_is_an_error_and_is_not_cached():
+    user_id = PydanticObjectId()
+    repository = BooksByUser({str(user_id): Result(error=NotFoundError(message="missing"))})
+    index = AutocompleteIndex(repository, max_entries=100, ttl_seconds=60)
+
+    async def scenario():
+        first = await index.search(user_id, "du", 10)
+        second = await index.search(user_id, "du", 10)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert isinstance(first, RepositoryError) and isinstance(second, RepositoryError)
+    assert repository.calls == 2
+    assert index.loaded(user_id) is None
+
+
+def test_empty_library_is_cached_as_an_empty_index():
+    user_id = PydanticObjectId()
+    repository = BooksByUser({str(user_id): Result(error=EmptyLibraryError(message="no books"))})
+    index = AutocompleteIndex(repository, max_entries=100, ttl_seconds=60)
+
+    async def scenario():
+        return await index.search(user_id, "du", 10), await index.search(user_id, "du", 10)
+
+    assert asyncio.run(scenario()) == ([], [])
+    assert repository.calls == 1
+
+
+def test_least_recently_used_indexes_are_evicted_over_the_entry_budget():
+    first, second = PydanticObjectId(), PydanticObjectId()
+    repository = BooksByUser({
+        str(first): Result([make_book("Dune", "Frank Herbert")]),
+        str(second): Result([make_book("Emma", "Jane Austen")]),
+    })
+    budget = len(UserPrefixIndex.build([make_book("Dune", "Frank Herbert")]))
+    index = AutocompleteIndex(repository, max_entries=budget, ttl_seconds=60)
+
+    async def scenario():
+        await index.search(first, "du", 10)
+        await index.search(second, "em", 10)
+
+    asyncio.run(scenario())
+    assert index.loaded(first) is None
+    assert index.loaded(second) is not None
+
+
+# the snapshot is read, then a write lands before the index built from it is stored
+class SlowBooks(BooksByUser):
+    def __init__(self, results: dict, during_read):
+        super().__init__(results)
+        self.during_read = during_read
+
+    async def get_all_books(self, user_id: PydanticObjectId) -> Result:
+        result = await super().get_all_books(user_id)
+        self.during_read()
+        return result
+
+
+def test_writes_made_during_a_build_are_applied_to_the_built_index():
+    user_id = PydanticObjectId()
+    dune = make_book("Dune", "Frank Herbert")
+    emma = make_book("Emma", "Jane Austen")
+    index = None
+
+    def write():
+        index.book_added(user_id, emma)
+        index.book_removed(user_id, dune.id)
+
+    repository = SlowBooks({str(user_id): Result([dune])}, write)
+    index = AutocompleteIndex(repository, max_entries=100, ttl_seconds=60)
+
+    async def scenario():
+        return await index.search(user_id, "em", 10), await index.search(user_id, "du", 10)
+
+    emma_hits, dune_hits = asyncio.run(scenario())
+    assert [hit["title"] for hit in emma_hits] == ["Emma"]
+    assert dune_hits == []
+
+
+def test_expired_indexes_are_rebuilt():
+    user_id = PydanticObjectId()
+    repository = BooksByUser({str(user_id): Result([make_book("Dune", "Frank Herbert")])})
+    index = AutocompleteIndex(repository, max_entries=100, ttl_seconds=-1)
+
+    async def scenario():
+        await index.search(user_id, "du", 10)
+        await index.search(user_id, "du", 10)
+
+    asyncio.run(scenario())
+    assert repository.calls == 2
@@ -0,0 +1,147 @@
+import asyncio
+
+import pytest
+from beanie import PydanticObjectId
+from bson import ObjectId
+
+from app.server.cache.cache_backend import LRUCacheBackend
+from app.server.events.event_bus import EventBus, EventPublisher
+from app.server.models.batch import AddFavourite, BatchResult, DeleteBook, MoveToCollection, RateBook, RemoveFavourite
+from app.server.repositories.autocomplete_book_repository import AutocompleteBatchRepository
+from app.server.repositories.batch_repository import LibraryState, _unchanged, _without_removals, compile_updates
+from app.server.repositories.cached_repositories import CachedBatchRepository
+from app.server.repositories.publishing_repositories import PublishingBatchRepository
+from app.server.repositories.repository_error import ConflictError, PartialWriteError
+
+USER = PydanticObjectId()
+BOOK, OTHER_BOOK = ObjectId(), ObjectId()
+SHELF, WISHLIST = ObjectId(), ObjectId()
+
+
+def library() -> dict:
+    return {
+        "_id": USER,
+        "userBooks": [{"_id": BOOK, "rating": 3}, {"_id": OTHER_BOOK, "rating": 4}, {"rating": 1}],
+        "collections": [{"_id": SHELF, "books": [str(BOOK)]}, {"_id": WISHLIST, "books": []}, {"_id": None, "books": ["x"]}],
+        "favourites": [str(OTHER_BOOK), ObjectId(BOOK)],
+    }
+
+
+def changed(document: dict, *operations) -> LibraryState:
+    state = LibraryState.from_document(document).copy()
+    for operation in operations:
+        assert state.apply(operation) is None
+    return state
+
+
+def test_items_without_an_id_are_left_out_of_the_state():
+    state = LibraryState.from_document(library())
+    assert set(state.ratings) == {str(BOOK), str(OTHER_BOOK)}
+    assert set(state.collections) == {str(SHELF), str(WISHLIST)}
+
+
+def test_no_change_compiles_to_no_statement():
+    before = LibraryState.from_document(library())
+    assert compile_updates(USER, before, before.copy()) == []
+
+
+def test_removals_and_additions_go_into_separate_statements():
+    document = library()
+    before = LibraryState.from_document(document)
+    after = changed(document,
+                    DeleteBook(op="delete_book", book_id=OTHER_BOOK),
+                    RateBook(op="rate_book", book_id=BOOK, rating=5),
+                    MoveToCollection(op="move_to_collection", from_collection_id=SHELF, to_collection_id=WISHLIST,
+                                     book_id=str(BOOK)),
+                    RemoveFavourite(op="remove_favourite", book_id=str(BOOK)),
+                    AddFavourite(op="add_favourite", book_id=str(BOOK)))
+    removals, additions = compile_updates(USER, before, after)
+    assert removals._doc == {"$pull": {
+        "userBooks": {"_id": {"$in": [OTHER_BOOK]}},
+        "collections.$[c0].books": {"$in": [str(BOOK)]},
+    }}
+    assert removals._array_filters == [{"c0._id": SHELF}]
+    assert additions._doc == {
+        "$addToSet": {"collections.$[c1].books": {"$each": [str(BOOK)]}},
+        "$set": {"userBooks.$[b0].rating": 5},
+    }
+    assert additions._array_filters == [{"c1._id": WISHLIST}, {"b0._id": BOOK}]
+
+
+def test_removed_favourites_match_both_stored_forms():
+    document = library()
+    after = changed(document, RemoveFavourite(op="remove_favourite", book_id=str(OTHER_BOOK)))
+    [removals] = compile_updates(USER, LibraryState.from_document(document), after)
+    assert removals._doc == {"$pull": {"favourites": {"$in": [str(OTHER_BOOK), OTHER_BOOK]}}}
+
+
+def test_statements_only_match_the_library_they_were_computed_against():
+    document = library()
+    before = LibraryState.from_document(document)
+    after = changed(document, DeleteBook(op="delete_book", book_id=OTHER_BOOK),
+                    RateBook(op="rate_book", book_id=BOOK, rating=5))
+    removals, additions = compile_updates(USER, before, after, document)
+    assert removals._filter == {"_id": USER, **_unchanged(document)}
+    assert additions._filter == {"_id": USER, **_unchanged(_without_removals(document, before, after))}
+
+
+def test_unchanged_compares_the_projected_fields():
+    conditions = _unchanged(library())["$expr"]["$and"]
+    assert {"$eq": [{"$ifNull": ["$userBooks._id", []]}, [BOOK, OTHER_BOOK]]} in conditions
+    assert {"$eq": [{"$ifNull": ["$userBooks.rating", []]}, [3, 4, 1]]} in conditions
+    assert {"$eq": [{"$ifNull": ["$collections.books", []]}, [[str(BOOK)], [], ["x"]]]} in conditions
+
+
+def test_without_removals_applies_the_pull_to_the_read_document():
+    document = library()
+    after = changed(document, DeleteBook(op="delete_book", book_id=OTHER_BOOK),
+                    MoveToCollection(op="move_to_collection", from_collection_id=SHELF, to_collection_id=WISHLIST,
+                                     book_id=str(BOOK)),
+                    RemoveFavourite(op="remove_favourite", book_id=str(OTHER_BOOK)))
+    remaining = _without_removals(document, LibraryState.from_document(document), after)
+    assert remaining["userBooks"] == [{"_id": BOOK, "rating": 3}, {"rating": 1}]
+    assert [collection["books"] for collection in remaining["collections"]] == [[], [], ["x"]]
+    assert remaining["favourites"] == [ObjectId(BOOK)]
+
+
+class FixedOutcome:
+    def __init__(self, outcome):
+        self.outcome = outcome
+
+    async def execute(self, user_id, operations, transactional):
+        return self.outcome
+
+
+class RemovedBooks:
+    def __init__(self):
+        self.removed = []
+
+    def book_removed(self, user_id, book_id):
+        self.removed.append(book_id)
+
+
+@pytest.mark.parametrize("outcome, written", [
+    (BatchResult(applied=True, results=[]), True),
+    (PartialWriteError(message="part of it was written"), True),
+    (ConflictError(message="nothing was written"), False),
+])
+def test_batch_wrappers_react_to_every_batch_that_wrote(outcome, written):
+    cache = LRUCacheBackend(max_entries=10, ttl_seconds=60)
+    index = RemovedBooks()
+    bus, events = EventBus(history_size=10, max_queue=10, history_users=10), []
+    bus.add_listener(events.append)
+    repository = PublishingBatchRepository(
+        AutocompleteBatchRepository(CachedBatchRepository(FixedOutcome(outcome), cache), index), EventPublisher(bus)
+    )
+    operations = [DeleteBook(op="delete_book", book_id=BOOK), RateBook(op="rate_book", book_id=OTHER_BOOK, rating=5)]
+
+    async def scenario():
+        await cache.set(str(USER), "books", ["cached"], 0)
+        result = await repository.execute(USER, operations, False)
+        return result, await cache.get(str(USER), "books", list)
+
+    result, cached = asyncio.run(scenario())
+    assert result is outcome
+    assert (cached is None) == written
+    assert index.removed == ([BOOK] if written else [])
+    assert sorted(event.type for event in events) == (["books.changed"] if written else [])
@@ -0,0 +1,103 @@
+import asyncio
+import pickle
+from datetime import datetime
+from typing import List
+
+import pytest
+from pydantic import ValidationError
+from pydantic_core import to_json
+
+from app.server.cache.cache_backend import LRUCacheBackend, _entry_adapter
+from app.server.models.book import Book
+
+BOOK = Book.model_validate({
+    "isnb": "978-1",
+    "start_read_date": datetime(2024, 1, 1),
+    "end_read_date": datetime(2024, 2, 1),
+    "description": {"title": "Dune", "description": "", "author_name": "Frank Herbert", "publisher_name": "Chilton",
+                    "publishing_date": datetime(1965, 8, 1), "cover_url": ""},
+    "rating": 4,
+})
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_get_hands_out_the_cached_value_without_copying():
+    async def scenario():
+        cache = LRUCacheBackend(max_entries=10, ttl_seconds=60)
+        value = [BOOK]
+        await cache.set("user", "books", value, await cache.generation("user"))
+        return value, await cache.get("user", "books", List[Book])
+
+    value, cached = run(scenario())
+    assert cached is value
+
+
+def test_redis_entries_are_json_validated_against_the_value_type():
+    raw = to_json((1.5, [BOOK]))
+    assert _entry_adapter(List[Book]).validate_json(raw) == (1.5, [BOOK])
+    with pytest.raises(ValidationError):
+        _entry_adapter(List[Book]).validate_json(pickle.dumps((1.5, [BOOK])))
+
+
+def test_read_started_before_an_invalidation_is_not_cached():
+    async def scenario():
+        cache = LRUCacheBackend(max_entries=10, ttl_seconds=60)
+        generation = await cache.generation("user")
+        # a concurrent write invalidates the user while the read is in flight
+        await cache.delete("user", "books")
+        await cache.set("user", "books", ["stale"], generation)
+        stale = await cache.get("user", "books", list)
+        await cache.set("user", "books", ["fresh"], await cache.generation("user"))
+        return stale, await cache.get("user", "books", list)
+
+    assert run(scenario()) == (None, ["fresh"])
+
+
+def test_invalidating_another_user_does_not_block_sets():
+    async def scenario():
+        cache = LRUCacheBackend(max_entries=10, ttl_seconds=60)
+        generation = await cache.generation("user")
+        await cache.invalidate_user("someone else")
+        await cache.set("user", "books", ["a"], generation)
+        return await cache.get("user", "books", list)
+
+    assert run(scenario()) == ["a"]
+
+
+def test_forgotten_invalidations_still_block_older_reads():
+    async def scenario():
+        cache = LRUCacheBackend(max_entries=1, ttl_seconds=60)
+        generation = await cache.generation("user")
+        await cache.delete("user", "books")
+        # pushes the invalidation of "user" out of the bounded record
+        await cache.delete("other", "books")
+        await cache.set("user", "books", ["stale"], generation)
+        return await cache.get("user", "books", list)
+
+    assert run(scenario()) is None
+
+
+def test_expired_and_evicted_entries_are_misses():
+    async def scenario():
+        expired = LRUCacheBackend(max_entries=10, ttl_seconds=-1)
+        await expired.set("user", "books", ["a"], 0)
+        bounded = LRUCacheBackend(max_entries=1, ttl_seconds=60)
+        await bounded.set("user", "first", 1, 0)
+        await bounded.set("user", "second", 2, 0)
+        return await expired.get("user", "books", list), await bounded.get("user", "first", int), await bounded.get("user", "second", int), bounded.stats.evictions
+
+    assert run(scenario()) == (None, None, 2, 1)
+
+
+def test_delete_prefix_only_drops_matching_keys():
+    async def scenario():
+        cache = LRUCacheBackend(max_entries=10, ttl_seconds=60)
+        await cache.set("user", "quotes:1", ["q"], 0)
+        await cache.set("user", "books", ["b"], 0)
+        await cache.delete_prefix("user", "quotes:")
+        return await cache.get("user", "quotes:1", list), await cache.get("user", "books", list)
+
+    assert run(scenario()) == (None, ["b"])
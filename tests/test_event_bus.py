@@ -0,0 +1,54 @@
+from app.server.events.event_bus import EventBus
+
+
+def make_bus(history_users: int = 2) -> EventBus:
+    return EventBus(history_size=3, max_queue=10, history_users=history_users)
+
+
+def test_replay_returns_events_after_the_last_id():
+    bus = make_bus()
+    first = bus.publish("a", "books.changed")
+    second = bus.publish("a", "books.changed")
+    assert bus.replay("a", first.id) == [second]
+    assert bus.replay("a", second.id) == []
+
+
+def test_replay_of_an_id_outside_the_history_asks_to_resynchronise():
+    bus = make_bus()
+    first = bus.publish("a", "books.changed")
+    for _ in range(3):
+        bus.publish("a", "books.changed")
+    assert bus.replay("a", first.id) is None
+
+
+def test_history_is_kept_for_a_bounded_number_of_users():
+    bus = make_bus()
+    first = bus.publish("a", "books.changed")
+    bus.publish("b", "books.changed")
+    bus.publish("a", "books.changed")
+    bus.publish("c", "books.changed")
+    assert bus.replay("b", "unknown") is None
+    assert len(bus._history) == 2
+    assert bus.replay("a", first.id) is not None
+
+
+def test_history_of_subscribed_users_is_not_evicted():
+    bus = make_bus()
+    subscription = bus.subscribe("a")
+    first = bus.publish("a", "books.changed")
+    bus.publish("b", "books.changed")
+    bus.publish("c", "books.changed")
+    assert bus.replay("a", first.id) == []
+    assert set(bus._history) == {"a", "c"}
+    bus.unsubscribe(subscription)
+    bus.publish("d", "books.changed")
+    assert "a" not in bus._history
+
+
+def test_publish_reaches_subscribers_of_the_user_only():
+    bus = make_bus()
+    subscription = bus.subscribe("a")
+    other = bus.subscribe("b")
+    event = bus.publish("a", "books.changed", {"book_id": "1"})
+    assert subscription.queue.get_nowait() == event
+    assert other.queue.empty()
@@ -0,0 +1,48 @@
+import pytest
+
+from app.server.models.book import Book
+from app.server.models.fieldsets import FieldSetError, lean_model, mongo_projection, parse_fieldset
+from app.server.models.user import User
+
+
+def test_parse_fieldset_sorts_deduplicates_and_adds_the_id():
+    assert parse_fieldset(Book, " rating,isnb,rating ,description.title") == \
+        ("description.title", "id", "isnb", "rating")
+
+
+def test_parse_fieldset_rejects_unknown_and_hidden_fields():
+    with pytest.raises(FieldSetError):
+        parse_fieldset(Book, "description.nope")
+    with pytest.raises(FieldSetError):
+        parse_fieldset(Book, "rating.value")
+    with pytest.raises(FieldSetError):
+        parse_fieldset(User, "username,password", hidden=frozenset({"password"}))
+    with pytest.raises(FieldSetError):
+        parse_fieldset(Book, " , ")
+
+
+def test_mongo_projection_uses_stored_names_and_prefix():
+    fieldset = parse_fieldset(Book, "isnb,description.title,description.author_name")
+    assert mongo_projection(Book, fieldset, "userBooks.") == {
+        "userBooks._id": 1,
+        "userBooks.isnb": 1,
+        "userBooks.description.title": 1,
+        "userBooks.description.author_name": 1,
+    }
+
+
+def test_whole_field_wins_over_its_subfields():
+    fieldset = parse_fieldset(Book, "description,description.title")
+    assert mongo_projection(Book, fieldset) == {"_id": 1, "description": 1}
+
+
+def test_lean_model_keeps_only_the_selected_fields():
+    model = lean_model(Book, parse_fieldset(Book, "isnb,description.title"))
+    book = model.model_validate({"isnb": "978-1", "description": {"title": "Dune"}})
+    assert book.model_dump(exclude_none=True) == {"isnb": "978-1", "description": {"title": "Dune"}}
+    assert model.model_validate({}).isnb is None
+
+
+def test_lean_model_is_built_once_per_fieldset():
+    fieldset = parse_fieldset(Book, "rating")
+    assert lean_model(Book, fieldset) is lean_model(Book, fieldset)
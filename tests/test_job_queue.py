@@ -0,0 +1,128 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from beanie import PydanticObjectId
+
+from app.server.jobs.job_queue import JobContext, JobQueue
+from app.server.models.job import Job, JobRequest, JobStatus
+from app.server.repositories.job_repository import IJobRepository
+from app.server.repositories.repository_error import RepositoryError
+
+
+class JobsCollection(IJobRepository):
+    """
+    The jobs collection of several processes, with the same claim semantics as JobRepository.
+    """
+
+    def __init__(self):
+        self.jobs = {}
+
+    async def create_job(self, job: Job) -> Job:
+        job.id = PydanticObjectId()
+        self.jobs[job.id] = job
+        return job
+
+    async def get_job(self, job_id: PydanticObjectId) -> RepositoryError | Job:
+        return self.jobs.get(job_id) or RepositoryError(message="not found")
+
+    async def update_claimed_job(self, job_id: PydanticObjectId, attempt: int, changes: dict) -> RepositoryError | None:
+        job = self.jobs[job_id]
+        if job.status != JobStatus.running or job.attempts != attempt:
+            return RepositoryError(message="not claimed")
+        for field, value in changes.items():
+            setattr(job, field, value)
+
+    async def claim_job(self, job_id: PydanticObjectId, now: datetime, lease_until: datetime) -> Optional[Job]:
+        job = self.jobs[job_id]
+        if job.status != JobStatus.queued or (job.run_after and job.run_after > now):
+            return None
+        job.status, job.started_at, job.lease_expires_at = JobStatus.running, now, lease_until
+        job.attempts += 1
+        return job.model_copy()
+
+    async def get_queued_jobs(self, now: datetime) -> List[Job]:
+        return [job for job in self.jobs.values() if job.status == JobStatus.queued]
+
+    async def requeue_expired_jobs(self, now: datetime) -> None:
+        for job in self.jobs.values():
+            if job.status == JobStatus.running and (job.lease_expires_at is None or job.lease_expires_at < now):
+                job.status = JobStatus.queued if job.attempts < job.max_attempts else JobStatus.failed
+
+
+def make_queue(jobs: JobsCollection, runs: list) -> JobQueue:
+    queue = JobQueue(jobs, workers=2, process_workers=1, max_attempts=2, retry_base_delay=0.01,
+                     lease_seconds=30, poll_interval=0.01)
+
+    async def record(context: JobContext) -> str:
+        runs.append(context.job.id)
+        await asyncio.sleep(0.01)
+        return "done"
+
+    queue.register("record", record)
+    return queue
+
+
+async def run_processes(jobs: JobsCollection, runs: list, submit: bool = True) -> List[Job]:
+    queues = [make_queue(jobs, runs) for _ in range(3)]
+    for queue in queues:
+        await queue.start()
+    submitted = [await queues[0].submit(JobRequest(type="record")) for _ in range(5)] if submit else []
+    await asyncio.sleep(0.2)
+    for queue in queues:
+        await queue.stop()
+    return submitted
+
+
+def test_every_job_runs_once_across_processes():
+    jobs, runs = JobsCollection(), []
+    submitted = asyncio.run(run_processes(jobs, runs))
+    assert sorted(runs) == sorted(job.id for job in submitted)
+    assert all(job.status == JobStatus.succeeded and job.attempts == 1 for job in jobs.jobs.values())
+
+
+def test_running_job_with_an_expired_lease_is_taken_over():
+    jobs, runs = JobsCollection(), []
+    abandoned = Job(type="record", max_attempts=2, created_at=datetime.utcnow(), status=JobStatus.running,
+                    attempts=1, lease_expires_at=datetime.utcnow() - timedelta(seconds=1))
+    asyncio.run(jobs.create_job(abandoned))
+    asyncio.run(run_processes(jobs, runs, submit=False))
+    assert runs == [abandoned.id]
+    assert abandoned.status == JobStatus.succeeded
+
+
+def test_running_job_with_a_live_lease_is_left_alone():
+    jobs, runs = JobsCollection(), []
+    running = Job(type="record", max_attempts=2, created_at=datetime.utcnow(), status=JobStatus.running,
+                  attempts=1, lease_expires_at=datetime.utcnow() + timedelta(minutes=1))
+    asyncio.run(jobs.create_job(running))
+    asyncio.run(run_processes(jobs, runs, submit=False))
+    assert runs == []
+    assert running.status == JobStatus.running
+
+
+def test_worker_that_lost_its_claim_stops_and_leaves_the_job_alone():
+    jobs, finished = JobsCollection(), []
+    queue = JobQueue(jobs, workers=1, process_workers=1, max_attempts=3, retry_base_delay=0.01,
+                     lease_seconds=0.03, poll_interval=10)
+
+    async def slow(context: JobContext) -> str:
+        await asyncio.sleep(0.2)
+        finished.append(context.job.id)
+        return "done"
+
+    queue.register("slow", slow)
+
+    async def scenario() -> Job:
+        await queue.start()
+        job = await queue.submit(JobRequest(type="slow"))
+        await asyncio.sleep(0.005)
+        # the lease expired and another process claimed the job again
+        job.attempts += 1
+        await asyncio.sleep(0.1)
+        await queue.stop()
+        return job
+
+    job = asyncio.run(scenario())
+    assert finished == []
+    assert (job.status, job.attempts, job.result) == (JobStatus.running, 2, None)
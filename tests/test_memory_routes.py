@@ -0,0 +1,116 @@
+import asyncio
+import json
+import subprocess
+import sys
+from datetime import datetime
+
+import pytest
+from beanie import PydanticObjectId
+from fastapi.testclient import TestClient
+
+from app.server import dependencies
+from app.server.app import app
+from app.server.cache import cache
+from app.server.config import config
+from app.server.models.book import Book
+from app.server.models.user import User
+from app.server.repositories.memory_repositories import MemoryBookRepository, MemoryStore
+from app.server.repositories.repository_error import NotFoundError, RepositoryError
+from tests.conftest import ROOT
+
+BOOK = {
+    "isnb": "978-1",
+    "start_read_date": "2024-01-01T00:00:00",
+    "end_read_date": "2024-01-10T00:00:00",
+    "rating": 5,
+    "description": {
+        "title": "Dune",
+        "description": "",
+        "author_name": "Frank Herbert",
+        "publisher_name": "Chilton",
+        "publishing_date": "1965-08-01T00:00:00",
+        "cover_url": "",
+    },
+}
+
+
+def clear_singletons() -> None:
+    for module in (dependencies, cache):
+        for value in vars(module).values():
+            if hasattr(value, "cache_clear"):
+                value.cache_clear()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(config, "REPOSITORY_BACKEND", "memory")
+    clear_singletons()
+    with TestClient(app) as client:
+        yield client
+    clear_singletons()
+
+
+@pytest.fixture
+def user_id(client) -> str:
+    response = client.post("/users/signup", json={"username": "reader", "email": "reader@example.com", "password": "secret12"})
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    user = client.get("/users/", headers=headers).json()
+    return user.get("_id") or user["id"]
+
+
+def test_add_book_and_list_it(client, user_id):
+    assert client.post(f"/books/?user_id={user_id}", json=BOOK).status_code == 201
+    books = client.get(f"/books/{user_id}").json()
+    assert [book["isnb"] for book in books] == ["978-1"]
+
+
+def test_duplicate_isnb_is_rejected(client, user_id):
+    client.post(f"/books/?user_id={user_id}", json=BOOK)
+    assert client.post(f"/books/?user_id={user_id}", json=BOOK).status_code == 400
+
+
+def test_deleting_a_missing_book_is_not_found(client, user_id):
+    client.post(f"/books/?user_id={user_id}", json=BOOK)
+    assert client.delete(f"/books/?user_id={user_id}&book_id={PydanticObjectId()}").status_code == 404
+
+
+def test_listing_an_empty_library_is_not_found(client, user_id):
+    assert client.get(f"/books/{user_id}").status_code == 404
+
+
+def test_similar_books_fail_fast(client):
+    assert client.get("/books/978-1/similar").status_code == 503
+
+
+def test_mongo_only_routers_are_not_mounted_in_memory_mode():
+    script = (
+        "from app.server.config import config; config.REPOSITORY_BACKEND = 'memory'; "
+        "import json; from app.server.app import app; print(json.dumps([route.path.split('/')[1] for route in app.routes]))"
+    )
+    output = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    mounted = set(json.loads(output.splitlines()[-1]))
+    assert {"books", "users", "events"} <= mounted
+    assert not mounted & {"timeline", "batch", "jobs"}
+
+
+def test_update_rejects_the_id_of_another_book():
+    store = MemoryStore()
+    repository = MemoryBookRepository(store)
+    first, second = Book.model_validate(BOOK), Book.model_validate({**BOOK, "isnb": "978-2"})
+    user = User(username="reader", email="reader@example.com", password="secret12", created_at=datetime(2024, 1, 1),
+                userBooks=[first, second], collections=[], quotes=[], favourites=[])
+    user.id = PydanticObjectId()
+    store.put(user)
+    replacement = Book.model_validate({**BOOK, "isnb": "978-3"})
+    replacement.id = second.id
+    error = asyncio.run(repository.update_book(user.id, first.id, replacement))
+    assert isinstance(error, RepositoryError) and not isinstance(error, NotFoundError)
+    assert list(store.libraries[user.id].books) == [first.id, second.id]
+
+
+def test_add_rejects_a_client_supplied_id_already_in_the_library(client, user_id):
+    assert client.post(f"/books/?user_id={user_id}", json=BOOK).status_code == 201
+    book_id = client.get(f"/books/{user_id}").json()[0]["_id"]
+    duplicate = {**BOOK, "isnb": "978-2", "_id": book_id}
+    assert client.post(f"/books/?user_id={user_id}", json=duplicate).status_code == 400
+    assert len(client.get(f"/books/{user_id}").json()) == 1
@@ -0,0 +1,99 @@
+import asyncio
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.server.config import config
+from app.server.middlewares.profiling import ProfilingMiddleware
+from app.server.profiling.sampler import StackSampler
+from app.server.profiling.spans import finish_request_spans, span_stats, start_request_spans, timed, timed_methods
+
+
+class Shelf:
+    async def count(self) -> int:
+        return 3
+
+    async def _private(self) -> int:
+        return 0
+
+
+def test_disabled_spans_leave_functions_and_classes_unwrapped(monkeypatch):
+    monkeypatch.setattr(config, "PROFILING_SPANS_ENABLED", False)
+
+    def lookup():
+        return 1
+
+    assert timed("lookup")(lookup) is lookup
+    count = Shelf.count
+    assert timed_methods(Shelf) is Shelf and Shelf.count is count
+
+
+def test_enabled_spans_are_recorded_per_request_and_in_the_totals(monkeypatch):
+    monkeypatch.setattr(config, "PROFILING_SPANS_ENABLED", True)
+
+    @timed("test.lookup")
+    def lookup():
+        return 1
+
+    class Timed(Shelf):
+        count = Shelf.count
+        _private = Shelf._private
+
+    timed_methods(Timed)
+
+    async def request():
+        token = start_request_spans()
+        lookup()
+        await Timed().count()
+        await Timed()._private()
+        return finish_request_spans(token)
+
+    spans = asyncio.run(request())
+    assert [name for name, _ in spans] == ["test.lookup", "Timed.count"]
+    assert span_stats.as_dict()["test.lookup"]["count"] >= 1
+
+
+def spin(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_sampler_writes_folded_stacks(tmp_path):
+    sampler = StackSampler.try_start(0.001)
+    assert StackSampler.try_start(0.001) is None
+    spin(0.05)
+    sampler.stop()
+    lines = sampler.write(tmp_path / "profile.folded").read_text().splitlines()
+    assert lines
+    for line in lines:
+        stack, count = line.rsplit(" ", 1)
+        assert int(count) >= 1 and ";" in stack
+    assert any(f"{__name__}:spin:" in line for line in lines)
+
+
+def profiled_app(monkeypatch, tmp_path) -> TestClient:
+    monkeypatch.setattr(config, "PROFILING_TOKEN", "secret")
+    monkeypatch.setattr(config, "PROFILING_SAMPLE_RATE", 0.0)
+    monkeypatch.setattr(config, "PROFILING_SPANS_ENABLED", True)
+    monkeypatch.setattr(config, "PROFILING_OUTPUT_DIR", str(tmp_path))
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware)
+
+    @timed("test.route")
+    async def work() -> dict:
+        return {}
+
+    app.get("/work")(work)
+    return TestClient(app)
+
+
+def test_server_timing_is_only_sent_to_token_holders(monkeypatch, tmp_path):
+    client = profiled_app(monkeypatch, tmp_path)
+    assert "server-timing" not in client.get("/work").headers
+    assert "server-timing" not in client.get("/work", headers={"X-Profile": "wrong"}).headers
+    assert list(tmp_path.iterdir()) == []
+    response = client.get("/work", headers={"X-Profile": "secret"})
+    assert 'desc="test.route"' in response.headers["server-timing"]
+    assert len(list(tmp_path.iterdir())) == 1
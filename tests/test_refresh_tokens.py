@@ -0,0 +1,56 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from app.server.repositories.memory_repositories import MemoryRefreshTokenRepository
+from app.server.repositories.refresh_token_repository import hash_refresh_token
+from app.server.repositories.repository_error import RepositoryError
+
+
+def make_repository() -> MemoryRefreshTokenRepository:
+    return MemoryRefreshTokenRepository(lifetime=timedelta(days=1))
+
+
+def test_rotate_issues_the_next_token_of_the_family():
+    repository = make_repository()
+    first = asyncio.run(repository.issue("reader"))
+    second = asyncio.run(repository.rotate(first.refresh_token))
+    assert second.username == "reader" and second.refresh_token != first.refresh_token
+    family = {token.family_id for token in repository.tokens.values()}
+    assert len(family) == 1
+    third = asyncio.run(repository.rotate(second.refresh_token))
+    assert not isinstance(third, RepositoryError)
+
+
+def test_reusing_a_rotated_token_revokes_the_family():
+    repository = make_repository()
+    first = asyncio.run(repository.issue("reader"))
+    second = asyncio.run(repository.rotate(first.refresh_token))
+    reused = asyncio.run(repository.rotate(first.refresh_token))
+    assert isinstance(reused, RepositoryError)
+    assert isinstance(asyncio.run(repository.rotate(second.refresh_token)), RepositoryError)
+
+
+def test_other_families_survive_a_reuse():
+    repository = make_repository()
+    first = asyncio.run(repository.issue("reader"))
+    other = asyncio.run(repository.issue("reader"))
+    asyncio.run(repository.rotate(first.refresh_token))
+    asyncio.run(repository.rotate(first.refresh_token))
+    assert not isinstance(asyncio.run(repository.rotate(other.refresh_token)), RepositoryError)
+
+
+def test_unknown_and_expired_tokens_are_rejected():
+    repository = make_repository()
+    assert isinstance(asyncio.run(repository.rotate("unknown")), RepositoryError)
+    issued = asyncio.run(repository.issue("reader"))
+    repository.tokens[hash_refresh_token(issued.refresh_token)].expires_at = datetime.utcnow() - timedelta(seconds=1)
+    assert isinstance(asyncio.run(repository.rotate(issued.refresh_token)), RepositoryError)
+    assert repository.tokens == {}
+
+
+def test_revoke_ends_the_family():
+    repository = make_repository()
+    issued = asyncio.run(repository.issue("reader"))
+    assert asyncio.run(repository.revoke(issued.refresh_token)) is None
+    assert isinstance(asyncio.run(repository.rotate(issued.refresh_token)), RepositoryError)
+    assert isinstance(asyncio.run(repository.revoke("unknown")), RepositoryError)
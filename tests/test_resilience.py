@@ -0,0 +1,181 @@
+import asyncio
+import json
+from datetime import timedelta
+
+import pytest
+from beanie import PydanticObjectId
+from fastapi.testclient import TestClient
+from pymongo.errors import AutoReconnect, DuplicateKeyError, ExecutionTimeout, OperationFailure, PyMongoError
+
+from app.server.app import app, database_error_handler, duplicate_key_handler
+from app.server.dependencies import get_refresh_token_repository, get_user_repository
+from app.server.resilience import circuit_breaker, deadline
+from app.server.resilience.circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState
+from app.server.resilience.deadline import DeadlineExceeded, check_deadline, finish_deadline, start_deadline
+from app.server.repositories.job_repository import JobRepository
+from app.server.repositories.lease_repository import LeaseRepository
+from app.server.resilience.guard import database_breaker, guarded, is_request_error
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock)
+    return clock
+
+
+def make_breaker() -> CircuitBreaker:
+    return CircuitBreaker(window=4, min_calls=4, failure_rate=0.5, slow_call_seconds=1.0, slow_rate=0.75,
+                          open_seconds=10.0, half_open_probes=2)
+
+
+def test_breaker_opens_at_the_failure_rate_after_min_calls(clock):
+    breaker = make_breaker()
+    for failed in (True, True, False):
+        breaker.before_call()
+        breaker.record(failed, 0.1)
+    assert breaker.state == CircuitState.closed
+    breaker.before_call()
+    breaker.record(False, 0.1)
+    assert breaker.state == CircuitState.open
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.before_call()
+    assert error.value.retry_after == 10.0
+
+
+def test_breaker_opens_on_slow_calls(clock):
+    breaker = make_breaker()
+    for duration in (2.0, 2.0, 2.0, 0.1):
+        breaker.before_call()
+        breaker.record(False, duration)
+    assert breaker.state == CircuitState.open
+
+
+def test_half_open_probes_close_the_circuit(clock):
+    breaker = make_breaker()
+    breaker._open()
+    clock.now += 10
+    breaker.before_call()
+    breaker.before_call()
+    assert breaker.state == CircuitState.half_open
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record(False, 0.1)
+    breaker.record(False, 0.1)
+    assert breaker.state == CircuitState.closed
+    assert breaker.as_dict()["calls"] == 0
+
+
+def test_a_failed_probe_opens_the_circuit_again(clock):
+    breaker = make_breaker()
+    breaker._open()
+    clock.now += 10
+    breaker.before_call()
+    breaker.record(True, 0.1)
+    assert breaker.state == CircuitState.open
+    clock.now += 5
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.before_call()
+    assert error.value.retry_after == 5.0
+
+
+def test_check_deadline_fails_once_the_deadline_passed(monkeypatch):
+    now = [50.0]
+    monkeypatch.setattr(deadline.time, "monotonic", lambda: now[0])
+    token = start_deadline(2.0)
+    try:
+        check_deadline()
+        now[0] += 2
+        with pytest.raises(DeadlineExceeded):
+            check_deadline()
+    finally:
+        finish_deadline(token)
+    check_deadline()
+
+
+def test_guarded_turns_timeouts_into_deadline_exceeded_without_counting_a_failure():
+    @guarded
+    async def timing_out():
+        raise ExecutionTimeout("operation exceeded time limit")
+
+    from app.server.resilience.guard import database_breaker
+    failures = database_breaker.as_dict()["failures"]
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(timing_out())
+    assert database_breaker.as_dict()["failures"] == failures
+
+
+def test_database_errors_answer_503():
+    response = asyncio.run(database_error_handler(None, PyMongoError("connection refused")))
+    assert response.status_code == 503
+    assert json.loads(response.body) == {"detail": "Database unavailable"}
+
+
+def test_rejected_operations_are_told_apart_from_an_unavailable_database():
+    assert is_request_error(DuplicateKeyError("E11000 duplicate key", code=11000))
+    assert is_request_error(OperationFailure("bad value", code=2))
+    assert not is_request_error(OperationFailure("primary stepped down", code=189))
+    assert not is_request_error(AutoReconnect("connection reset"))
+    assert not is_request_error(PyMongoError("connection refused"))
+
+
+def test_rejected_operations_answer_409_or_400():
+    conflict = asyncio.run(duplicate_key_handler(None, DuplicateKeyError("E11000 duplicate key", code=11000)))
+    invalid = asyncio.run(database_error_handler(None, OperationFailure("bad value", code=2)))
+    unavailable = asyncio.run(database_error_handler(None, OperationFailure("shutting down", code=91)))
+    assert (conflict.status_code, invalid.status_code, unavailable.status_code) == (409, 400, 503)
+
+
+def test_guarded_does_not_count_rejected_operations_as_failures():
+    @guarded
+    async def duplicate():
+        raise DuplicateKeyError("E11000 duplicate key", code=11000)
+
+    failures = database_breaker.as_dict()["failures"]
+    with pytest.raises(DuplicateKeyError):
+        asyncio.run(duplicate())
+    assert database_breaker.as_dict()["failures"] == failures
+
+
+@pytest.mark.parametrize("call", [
+    lambda: JobRepository().get_job(PydanticObjectId()),
+    lambda: LeaseRepository().acquire("work", "holder", timedelta(seconds=1)),
+])
+def test_job_and_lease_repositories_are_guarded(monkeypatch, call):
+    def reject():
+        raise CircuitOpenError(retry_after=1)
+
+    monkeypatch.setattr(database_breaker, "before_call", reject)
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(call())
+
+
+class FailingUsers:
+    def __init__(self, error: Exception):
+        self.error = error
+
+    async def get_user_by_email(self, email: str):
+        raise self.error
+
+
+@pytest.mark.parametrize("error, status_code", [
+    (CircuitOpenError(retry_after=3), 503),
+    (DeadlineExceeded("Request deadline exceeded"), 504),
+    (PyMongoError("connection refused"), 503),
+])
+def test_login_reports_database_trouble_instead_of_401(error, status_code):
+    app.dependency_overrides[get_user_repository] = lambda: FailingUsers(error)
+    app.dependency_overrides[get_refresh_token_repository] = lambda: None
+    try:
+        response = TestClient(app).post("/users/login", json={"email": "reader@example.com", "password": "secret"})
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == status_code
@@ -0,0 +1,152 @@
+import asyncio
+from datetime import timedelta
+from typing import List, Optional
+
+import numpy as np
+
+from app.server.events.change_stream import FIELD_EVENTS
+from app.server.events.event_bus import LibraryEvent
+from app.server.models.recommendation import LibraryItems
+from app.server.recommendations.engine import RecommendationEngine
+from app.server.recommendations.similarity import SimilarityIndex, build_user_item_matrix, top_k_cosine
+from app.server.repositories.lease_repository import ILeaseRepository
+from app.server.repositories.library_items_repository import ILibraryItemsRepository
+
+
+def brute_force(matrix, k: int):
+    dense = matrix.toarray().astype(np.float64)
+    norms = np.linalg.norm(dense, axis=0)
+    cosine = dense.T @ dense / np.outer(np.where(norms > 0, norms, 1), np.where(norms > 0, norms, 1))
+    np.fill_diagonal(cosine, 0)
+    return [
+        sorted(((float(score), column) for column, score in enumerate(row) if score > 0), reverse=True)[:k]
+        for row in cosine
+    ]
+
+
+def test_top_k_cosine_matches_brute_force_across_blocks():
+    generator = np.random.default_rng(7)
+    user_rows = [
+        {int(item): float(generator.integers(1, 3)) for item in generator.choice(30, size=6, replace=False)}
+        for _ in range(40)
+    ]
+    matrix = build_user_item_matrix(user_rows, 32)
+    neighbours, scores = top_k_cosine(matrix, np.arange(32, dtype=np.int32), 5, block_size=7)
+    for item, expected in enumerate(brute_force(matrix, 5)):
+        found = [(float(score), int(neighbour)) for neighbour, score in zip(neighbours[item], scores[item]) if neighbour >= 0]
+        assert np.allclose([score for score, _ in found], [score for score, _ in expected], atol=1e-5)
+        assert set(neighbours[item][neighbours[item] >= 0]) <= {column for _, column in brute_force(matrix, 32)[item]}
+    # books nobody has have no neighbours
+    assert (neighbours[30:] == -1).all()
+
+
+def test_index_serves_best_first_and_round_trips(tmp_path):
+    index = SimilarityIndex(["a", "b", "c"], np.array([[1, 2], [0, -1], [-1, -1]], dtype=np.int32),
+                            np.array([[0.9, 0.5], [0.9, 0], [0, 0]], dtype=np.float32))
+    assert [book["isnb"] for book in index.similar("a", 5)] == ["b", "c"]
+    assert index.similar("a", 1) == [{"isnb": "b", "score": index.similar("a", 1)[0]["score"]}]
+    assert index.similar("c", 5) == []
+    assert index.similar("unknown", 5) is None
+    path = str(tmp_path / "index" / "similar.npz")
+    index.save(path)
+    loaded = SimilarityIndex.load(path)
+    assert loaded.items == index.items and loaded.similar("a", 5) == index.similar("a", 5)
+
+
+class Libraries(ILibraryItemsRepository):
+    def __init__(self, items: List[LibraryItems]):
+        self.items = {library.user_id: library for library in items}
+        self.reads = 0
+
+    async def get_library_items(self, user_ids: Optional[List[str]] = None) -> List[LibraryItems]:
+        self.reads += 1
+        return [library for user_id, library in self.items.items() if user_ids is None or user_id in user_ids]
+
+
+class Leases(ILeaseRepository):
+    def __init__(self):
+        self.holder = None
+        self.pending = set()
+
+    async def acquire(self, name: str, holder: str, duration: timedelta) -> bool:
+        self.holder = self.holder or holder
+        return self.holder == holder
+
+    async def release(self, name: str, holder: str) -> None:
+        if self.holder == holder:
+            self.holder = None
+
+    async def add_pending(self, name: str, items: List[str]) -> None:
+        if self.holder is not None:
+            self.pending.update(items)
+
+    async def take_pending(self, name: str, holder: str) -> List[str]:
+        if self.holder != holder:
+            return []
+        items, self.pending = sorted(self.pending), set()
+        return items
+
+
+def make_engine(libraries: Libraries, leases=None, index_path=None) -> RecommendationEngine:
+    return RecommendationEngine(libraries, top_k=3, block_size=2, refresh_interval=0.01, full_rebuild_every=0,
+                                leases=leases, lease_duration=60, index_path=index_path)
+
+
+def test_refresh_recomputes_the_books_of_changed_users():
+    libraries = Libraries([
+        LibraryItems(user_id="1", books=["a", "b"]),
+        LibraryItems(user_id="2", books=["a", "b", "c"]),
+    ])
+    engine = make_engine(libraries)
+    asyncio.run(engine.rebuild())
+    assert {book.isnb for book in engine.similar("c", 5)} == {"a", "b"}
+    libraries.items["2"] = LibraryItems(user_id="2", books=["c", "d"])
+    engine._dirty.add("2")
+    asyncio.run(engine.refresh())
+    assert [book.isnb for book in engine.similar("c", 5)] == ["d"]
+    assert engine.similar("a", 5)[0].isnb == "b"
+
+
+def test_only_the_lease_holder_reads_the_libraries(tmp_path):
+    libraries = Libraries([LibraryItems(user_id="1", books=["a", "b"])])
+    leases, path = Leases(), str(tmp_path / "similar.npz")
+    engines = [make_engine(libraries, leases, path) for _ in range(3)]
+
+    async def run():
+        for engine in engines:
+            await engine.start()
+        await asyncio.sleep(0.1)
+        for engine in engines:
+            await engine.stop()
+
+    asyncio.run(run())
+    assert libraries.reads == 1
+    assert all(engine.similar("a", 5)[0].isnb == "b" for engine in engines)
+    assert sum(engine._has_rows for engine in engines) == 1
+    assert leases.holder is None
+
+
+def test_changes_seen_by_other_processes_reach_the_leader(tmp_path):
+    libraries = Libraries([
+        LibraryItems(user_id="1", books=["a", "b"]),
+        LibraryItems(user_id="2", books=["a", "b", "c"]),
+    ])
+    leases = Leases()
+    engines = [make_engine(libraries, leases, str(tmp_path / "similar.npz")) for _ in range(2)]
+
+    async def run():
+        for engine in engines:
+            await engine.start()
+        await asyncio.sleep(0.05)
+        leader = next(engine for engine in engines if engine._leading)
+        follower = next(engine for engine in engines if engine is not leader)
+        libraries.items["2"] = LibraryItems(user_id="2", books=["c", "d"])
+        # without change streams only the process that made the write sees its event
+        follower.on_event(LibraryEvent(id="1", user_id="2", type=FIELD_EVENTS["userBooks"], at=0))
+        await asyncio.sleep(0.1)
+        for engine in engines:
+            await engine.stop()
+        return leader
+
+    leader = asyncio.run(run())
+    assert [book.isnb for book in leader.similar("c", 5)] == ["d"]
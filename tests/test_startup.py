@@ -0,0 +1,13 @@
+import json
+import subprocess
+import sys
+
+from benchmarks.startup_time import LAZY_MODULES
+from tests.conftest import ROOT
+
+
+def test_app_import_defers_crypto_and_numeric_modules():
+    script = "import json, sys\nimport app.server.app\nprint(json.dumps(sorted(sys.modules)))"
+    output = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    loaded = set(json.loads(output.splitlines()[-1]))
+    assert not loaded & set(LAZY_MODULES)
@@ -0,0 +1,128 @@
+import asyncio
+import base64
+import json
+from datetime import datetime, timedelta
+
+from beanie import PydanticObjectId
+from fastapi.testclient import TestClient
+
+from app.server.app import app
+from app.server.dependencies import get_timeline_repository
+from app.server.models.timeline import TimelineCursor, TimelineEvent, TimelineEventKind, TimelinePage
+from app.server.repositories.timeline_repository import _after_cursor, _stream_pipeline, merge_event_streams, paginate
+
+AT = datetime(2024, 1, 1)
+
+
+def event(kind: TimelineEventKind, at: datetime = AT, id: str = "") -> TimelineEvent:
+    return TimelineEvent(kind=kind, at=at, id=id, book_id="")
+
+
+async def stream(events):
+    for item in events:
+        yield item
+
+
+async def merged(*streams) -> list:
+    return [item async for item in merge_event_streams(*streams)]
+
+
+def test_cursor_round_trip():
+    cursor = TimelineCursor(at=AT, kind=TimelineEventKind.quote_added, id="", skip=2)
+    assert TimelineCursor.decode(cursor.encode()) == cursor
+
+
+def test_cursor_without_skip_decodes():
+    token = base64.urlsafe_b64encode(json.dumps([AT.isoformat(), "book_started", ""]).encode()).decode()
+    assert TimelineCursor.decode(token).skip == 0
+
+
+def test_merge_orders_by_date_then_kind():
+    later = AT + timedelta(days=1)
+    quotes = [event(TimelineEventKind.quote_added), event(TimelineEventKind.quote_added, later)]
+    started = [event(TimelineEventKind.book_started, later)]
+    finished = [event(TimelineEventKind.book_finished)]
+    result = asyncio.run(merged(stream(quotes), stream(started), stream(finished)))
+    assert [(item.at, item.kind) for item in result] == [
+        (AT, TimelineEventKind.book_finished),
+        (AT, TimelineEventKind.quote_added),
+        (later, TimelineEventKind.book_started),
+        (later, TimelineEventKind.quote_added),
+    ]
+
+
+def test_paginate_without_more_events_has_no_cursor():
+    page = paginate([event(TimelineEventKind.quote_added)], 1)
+    assert page.next_cursor is None
+
+
+def test_paginate_counts_id_less_events_at_the_last_timestamp():
+    events = [event(TimelineEventKind.quote_added) for _ in range(4)]
+    cursor = TimelineCursor.decode(paginate(events, 3).next_cursor)
+    assert (cursor.id, cursor.skip) == ("", 3)
+
+
+def test_paginate_adds_the_previous_skip():
+    previous = TimelineCursor(at=AT, kind=TimelineEventKind.quote_added, id="", skip=3)
+    events = [event(TimelineEventKind.quote_added) for _ in range(3)]
+    cursor = TimelineCursor.decode(paginate(events, 2, previous).next_cursor)
+    assert cursor.skip == 5
+
+
+def test_paginate_ending_on_an_id_has_no_skip():
+    id = str(PydanticObjectId())
+    events = [event(TimelineEventKind.quote_added), event(TimelineEventKind.quote_added, id=id),
+              event(TimelineEventKind.quote_added, AT + timedelta(days=1))]
+    cursor = TimelineCursor.decode(paginate(events, 2).next_cursor)
+    assert (cursor.id, cursor.skip) == (id, 0)
+
+
+def test_after_cursor_by_kind_order():
+    cursor = TimelineCursor(at=AT, kind=TimelineEventKind.book_finished, id="")
+    assert _after_cursor("userBooks", "start_read_date", TimelineEventKind.book_started, cursor) == \
+        {"userBooks.start_read_date": {"$gt": AT}}
+    assert _after_cursor("quotes", "created_at", TimelineEventKind.quote_added, cursor) == \
+        {"quotes.created_at": {"$gte": AT}}
+
+
+def test_after_cursor_with_id_continues_after_it_at_the_same_timestamp():
+    id = PydanticObjectId()
+    cursor = TimelineCursor(at=AT, kind=TimelineEventKind.quote_added, id=str(id))
+    assert _after_cursor("quotes", "created_at", TimelineEventKind.quote_added, cursor) == {"$or": [
+        {"quotes.created_at": {"$gt": AT}},
+        {"quotes.created_at": AT, "quotes._id": {"$gt": id}},
+    ]}
+
+
+def test_id_less_cursor_keeps_the_timestamp_and_skips_returned_entries():
+    cursor = TimelineCursor(at=AT, kind=TimelineEventKind.quote_added, id="", skip=2)
+    assert _after_cursor("quotes", "created_at", TimelineEventKind.quote_added, cursor) == \
+        {"quotes.created_at": {"$gte": AT}}
+    end = AT + timedelta(days=1)
+    pipeline = _stream_pipeline(PydanticObjectId(), "quotes", "created_at", TimelineEventKind.quote_added,
+                                AT, end, 10, cursor)
+    assert {"$skip": 2} in pipeline
+    other = _stream_pipeline(PydanticObjectId(), "userBooks", "start_read_date", TimelineEventKind.book_started,
+                             AT, end, 10, cursor)
+    assert not any("$skip" in stage for stage in other)
+
+
+class RecordingTimeline:
+    def __init__(self):
+        self.bounds = None
+
+    async def get_timeline(self, user_id, start, end, limit, cursor):
+        self.bounds = (start, end)
+        return TimelinePage(events=[], next_cursor=None)
+
+
+def test_bounds_with_and_without_offset_are_compared_as_naive_utc():
+    repository = RecordingTimeline()
+    app.dependency_overrides[get_timeline_repository] = lambda: repository
+    try:
+        response = TestClient(app).get(f"/timeline/{PydanticObjectId()}",
+                                       params={"start": "2024-03-01T02:00:00+02:00", "end": "2024-05-01T00:00:00"})
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == 200
+    assert repository.bounds == (datetime(2024, 3, 1), datetime(2024, 5, 1))